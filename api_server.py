@@ -4,21 +4,45 @@ ResumeRoaster API Server
 提供 RESTful API 接口支持移动端应用
 """
 
+import time
+
+# 记录模块导入耗时（启动时报告）
+_import_started = time.perf_counter()
+
 import os
 import sys
 import configparser
+import hashlib
+import json
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Optional
-from flask import Flask, request, jsonify
+from typing import Dict, List, Optional, Tuple
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from main import load_config, get_llm, load_resume, create_interview_chain
-
+from main import (
+    load_config, get_llm, load_resume, create_interview_chain,
+    invoke_interview, stream_interview,
+    build_resume_index, drop_resume_index, purge_resume_index, FIRST_QUESTION_PROMPT,
+    preload_dependencies, format_profile
+)
+from embeddings import get_embedding_stats, is_embedding_loaded
+from llm_pool import get_llm_pool_stats
+from pdf_extract import get_parse_stats
+from token_counter import count_tokens
+from resume_context import CONTEXT_FULL, CONTEXT_RETRIEVAL, build_full_context
+from session_db import SessionDatabase, restore_memory
+from metrics import (
+    registry as metrics_registry, observe_request, observe_stage, observe_tokens,
+    timed_stage, get_stage_stats, render_metrics
+)
 
 # Flask 应用
 app = Flask(__name__)
@@ -27,77 +51,1075 @@ app = Flask(__name__)
 api_config = {
     'port': 5000,
     'cors_enabled': True,
-    'cors_origins': '*'
+    'cors_origins': '*',
+    'ingest_workers': 2,              # 简历解析/索引线程数
+    'ingest_max_queue': 20,           # 排队中的简历数上限
+    'resume_wait_seconds': 30,        # 开始面试时等待简历处理完成的最长时间
+    'max_sessions': 10,               # 同时存在的会话数上限
+    'max_session_memory_mb': 0,       # 会话估算内存上限（MB），0 表示不限制
+    'session_idle_seconds': 120,      # 超过该时间无活动的会话在容量不足时可被淘汰
+    'session_ttl_seconds': 1800,      # 超过该时间无活动的会话会被后台线程清理
+    'reaper_interval_seconds': 60,    # 后台清理线程的运行间隔
+    'max_resumes': 100,               # 保留的简历数上限
+    'resume_ttl_seconds': 7200,       # 超过该时间未被使用（且无会话）的简历会被清理
+    'pregenerate_openers': True,      # 简历就绪后在后台预生成各风格的第一个问题
+    'opener_styles': 'critical,partner,guide',
+    'opener_workers': 2,              # 预生成第一个问题的线程数
+    'opener_wait_seconds': 10,        # 开始面试时等待正在预生成的第一个问题的最长时间
+    'persist_sessions': True,         # 会话状态保存到 SQLite，重启或换进程后可恢复
+    'session_db_path': 'cache/sessions.sqlite3',
+    'session_offload_seconds': 300,   # 超过该时间无活动的会话只保留数据库记录，释放内存中的面试链
+    'workers': 0,                     # 多进程模式（prefork_server.py）的工作进程数，0 表示 CPU 核数
+    'worker_mode': 'threaded',        # 多进程模式下每个工作进程的服务模式：threaded 或 async
+    'background_warmup': True         # 先监听端口，在后台导入重量级依赖并预热模型
 }
 
 # 全局存储
 resume_store: Dict[str, any] = {}  # resume_id -> resume data
-session_store: Dict[str, any] = {}  # session_id -> session data
+resume_hashes: Dict[str, str] = {}  # 文件内容哈希 -> resume_id（用于识别重复上传）
+resume_lock = threading.RLock()
+session_store: 'OrderedDict[str, dict]' = OrderedDict()  # session_id -> session data（按最近使用排序）
+
+# 面试轮次统计（每轮 LLM 调用次数、提示词 Token 数）
+turn_stats = {'turns': 0, 'llm_calls': 0, 'prompt_tokens': 0, 'last_prompt_tokens': 0,
+              'full_context_turns': 0, 'retrieval_turns': 0,
+              'prompt_cache_hit_tokens': 0, 'prompt_cache_miss_tokens': 0,
+              'context_tokens_raw': 0, 'context_tokens_packed': 0}
+turn_stats_lock = threading.Lock()
 
 # 创建临时目录
 TEMP_DIR = Path(__file__).parent / "temp"
 TEMP_DIR.mkdir(exist_ok=True)
 
+# 会话持久化存储（未启用时为 None）
+_session_db = None
+_session_db_lock = threading.Lock()
+
+
+def get_session_db() -> Optional[SessionDatabase]:
+    """获取会话持久化存储，未启用持久化时返回 None"""
+    global _session_db
+    if not api_config['persist_sessions']:
+        return None
+    
+    with _session_db_lock:
+        if _session_db is None:
+            db_path = Path(api_config['session_db_path'])
+            if not db_path.is_absolute():
+                db_path = Path(__file__).parent / db_path
+            _session_db = SessionDatabase(db_path)
+        return _session_db
+
 
 class SessionManager:
-    """会话管理器"""
+    """会话管理器（线程安全，按最近使用顺序淘汰空闲会话）"""
+    
+    # 每个会话的固定开销估算（链、记忆、LLM 客户端等对象），对话内容另计
+    BASE_SESSION_BYTES = 256 * 1024
+    
+    _lock = threading.RLock()
+    _restore_lock = threading.Lock()
+    evictions = 0
+    expirations = 0
+    offloaded = 0
+    restored = 0
+    
+    @staticmethod
+    def estimate_session_bytes(session: dict) -> int:
+        """估算单个会话占用的内存（向量索引按简历共享，不计入）"""
+        size = SessionManager.BASE_SESSION_BYTES
+        memory = getattr(session.get('chain'), 'memory', None)
+        if memory is None:
+            return size
+        
+        for message in memory.chat_memory.messages:
+            size += sys.getsizeof(message.content)
+        size += sys.getsizeof(getattr(memory, 'moving_summary_buffer', ''))
+        return size
+    
+    @staticmethod
+    def _over_capacity(extra_sessions: int = 0) -> bool:
+        """会话数或估算内存是否超出上限（调用方需持有锁）"""
+        if len(session_store) + extra_sessions > int(api_config['max_sessions']):
+            return True
+        
+        max_bytes = float(api_config['max_session_memory_mb']) * 1024 * 1024
+        if max_bytes <= 0:
+            return False
+        total = sum(SessionManager.estimate_session_bytes(s) for s in session_store.values())
+        return total + extra_sessions * SessionManager.BASE_SESSION_BYTES > max_bytes
     
     @staticmethod
-    def create_session(resume_id: str, chain: any) -> str:
+    def ensure_capacity() -> bool:
+        """为新会话腾出空间：按 LRU 顺序淘汰空闲会话，仍然不足时返回 False"""
+        idle_seconds = float(api_config['session_idle_seconds'])
+        now = datetime.now()
+        
+        with SessionManager._lock:
+            # session_store 按最近使用排序，最久未使用的在最前面
+            for session_id in list(session_store.keys()):
+                if not SessionManager._over_capacity(extra_sessions=1):
+                    break
+                # 直接读取，不更新最后活动时间和使用顺序
+                session = session_store[session_id]
+                if (now - session['last_activity']).total_seconds() < idle_seconds:
+                    continue
+                # 启用持久化时只释放内存中的面试链，会话可随时恢复
+                if get_session_db() is not None:
+                    SessionManager.offload_session(session_id)
+                else:
+                    SessionManager.end_session(session_id)
+                SessionManager.evictions += 1
+                print(f"会话容量已满，淘汰空闲会话：{session_id}")
+            
+            return not SessionManager._over_capacity(extra_sessions=1)
+    
+    @staticmethod
+    def create_session(resume_id: str, chain: any, interview_style: str = 'critical') -> str:
         """创建新会话"""
         session_id = str(uuid.uuid4())
-        session_store[session_id] = {
-            'resume_id': resume_id,
-            'chain': chain,
-            'created_at': datetime.now(),
-            'last_activity': datetime.now(),
-            'message_count': 0
-        }
+        with SessionManager._lock:
+            session_store[session_id] = {
+                'resume_id': resume_id,
+                'chain': chain,
+                'interview_style': interview_style,
+                'created_at': datetime.now(),
+                'last_activity': datetime.now(),
+                'message_count': 0,
+                'llm_calls': 0,
+                'prompt_tokens': [],  # 每轮提示词 Token 数
+                'version': 0          # 持久化版本号
+            }
+        SessionManager.persist(session_id)
         return session_id
     
     @staticmethod
     def get_session(session_id: str) -> Optional[dict]:
         """获取会话"""
-        if session_id not in session_store:
+        with SessionManager._lock:
+            session = session_store.get(session_id)
+            if session is None:
+                return None
+            
+            # 更新最后活动时间，并移到最近使用的位置
+            session['last_activity'] = datetime.now()
+            session_store.move_to_end(session_id)
+            return session
+    
+    @staticmethod
+    def persist(session_id: str):
+        """保存会话状态（每轮对话结束后调用），未启用持久化时不做任何事"""
+        db = get_session_db()
+        with SessionManager._lock:
+            session = session_store.get(session_id)
+        if db is None or session is None or session.get('chain') is None:
+            return
+        
+        try:
+            session['version'] = db.save_session(session_id, session)
+        except Exception as e:
+            print(f"警告：保存会话失败：{e}")
+    
+    @staticmethod
+    def load_session(session_id: str) -> Optional[dict]:
+        """获取可以继续对话的会话
+        
+        启用持久化时以数据库为准：内存中没有（已释放或由其他进程创建）或版本落后（其他进程
+        处理过后续对话）时从数据库恢复并重建面试链；数据库中已不存在时视为会话已结束。
+        """
+        session = SessionManager.get_session(session_id)
+        db = get_session_db()
+        if db is None:
+            return session
+        
+        version = db.get_version(session_id)
+        if version is None:
+            if session is not None:
+                SessionManager.offload_session(session_id)
             return None
+        if session is not None and session.get('version') == version:
+            return session
         
-        # 更新最后活动时间
-        session_store[session_id]['last_activity'] = datetime.now()
-        return session_store[session_id]
+        return SessionManager.restore_session(session_id)
     
     @staticmethod
-    def end_session(session_id: str) -> bool:
-        """结束会话"""
-        if session_id not in session_store:
+    def restore_session(session_id: str) -> Optional[dict]:
+        """从数据库恢复会话并重建面试链，失败时返回 None"""
+        db = get_session_db()
+        with SessionManager._restore_lock:
+            state = db.load_session(session_id)
+            if state is None:
+                return None
+            
+            # 等待期间其他线程可能已经恢复了同一版本
+            with SessionManager._lock:
+                session = session_store.get(session_id)
+                if session is not None and session.get('version') == state['version']:
+                    return session
+            
+            resume = ResumeManager.restore_resume(state['resume_id'])
+            if resume is None or resume['status'] != 'ready':
+                print(f"恢复会话失败：简历 {state['resume_id']} 不存在")
+                return None
+            
+            chain, error = create_session_chain(resume, state['interview_style'])
+            if error:
+                print(f"恢复会话失败：{error[0]['message']}")
+                return None
+            restore_memory(chain.memory, state['memory'])
+            
+            # 容量不足时先释放空闲会话；已存在的会话即使超出上限也允许恢复
+            SessionManager.ensure_capacity()
+            with SessionManager._lock:
+                session_store[session_id] = {
+                    'resume_id': state['resume_id'],
+                    'chain': chain,
+                    'interview_style': state['interview_style'],
+                    'created_at': datetime.fromtimestamp(state['created_at']),
+                    'last_activity': datetime.now(),
+                    'message_count': state['message_count'],
+                    'llm_calls': state['llm_calls'],
+                    'prompt_tokens': state['prompt_tokens'],
+                    'version': state['version']
+                }
+                session_store.move_to_end(session_id)
+                SessionManager.restored += 1
+                return session_store[session_id]
+    
+    @staticmethod
+    def offload_session(session_id: str) -> bool:
+        """从内存中移除会话（数据库记录保留，之后可恢复）"""
+        with SessionManager._lock:
+            session = session_store.pop(session_id, None)
+            if session is not None:
+                SessionManager.offloaded += 1
+        if session is None:
             return False
         
-        session = session_store[session_id]
+        session.pop('chain', None)
+        return True
+    
+    @staticmethod
+    def offload_idle_sessions():
+        """释放超过 session_offload_seconds 无活动的会话占用的内存（仅启用持久化时）"""
+        if get_session_db() is None:
+            return
         
-        # 清理资源
-        if 'chain' in session:
-            try:
-                del session['chain']
-            except:
-                pass
+        idle_seconds = float(api_config['session_offload_seconds'])
+        now = datetime.now()
+        with SessionManager._lock:
+            idle_sessions = [
+                session_id for session_id, session in session_store.items()
+                if (now - session['last_activity']).total_seconds() > idle_seconds
+            ]
+            for session_id in idle_sessions:
+                SessionManager.offload_session(session_id)
         
-        del session_store[session_id]
+        if idle_sessions:
+            print(f"已释放 {len(idle_sessions)} 个空闲会话的内存")
+    
+    @staticmethod
+    def get_sessions_by_resume(resume_id: str) -> List[str]:
+        """获取使用指定简历的会话ID列表"""
+        with SessionManager._lock:
+            return [
+                session_id for session_id, session in session_store.items()
+                if session.get('resume_id') == resume_id
+            ]
+    
+    @staticmethod
+    def end_session(session_id: str) -> bool:
+        """结束会话（同时删除持久化记录）"""
+        with SessionManager._lock:
+            session = session_store.pop(session_id, None)
+        
+        persisted = False
+        db = get_session_db()
+        if db is not None:
+            persisted = db.get_version(session_id) is not None
+            db.delete_session(session_id)
+        
+        if session is None:
+            return persisted
+        
+        # 清理资源
+        session.pop('chain', None)
         return True
     
     @staticmethod
     def cleanup_expired_sessions():
-        """清理过期会话（超过30分钟无活动）"""
+        """清理过期会话（超过 session_ttl_seconds 无活动）"""
+        ttl = float(api_config['session_ttl_seconds'])
         now = datetime.now()
-        expired_sessions = []
         
-        for session_id, session in session_store.items():
-            if (now - session['last_activity']).total_seconds() > 1800:  # 30分钟
-                expired_sessions.append(session_id)
+        with SessionManager._lock:
+            expired_sessions = [
+                session_id for session_id, session in session_store.items()
+                if (now - session['last_activity']).total_seconds() > ttl
+            ]
+            for session_id in expired_sessions:
+                SessionManager.end_session(session_id)
+            SessionManager.expirations += len(expired_sessions)
         
-        for session_id in expired_sessions:
-            SessionManager.end_session(session_id)
+        # 已释放内存、只保留数据库记录的会话
+        db = get_session_db()
+        if db is not None:
+            expired_records = db.delete_expired_sessions(ttl)
+            SessionManager.expirations += len(expired_records)
+            expired_sessions.extend(expired_records)
         
         if expired_sessions:
             print(f"已清理 {len(expired_sessions)} 个过期会话")
+    
+    @staticmethod
+    def get_stats() -> dict:
+        """获取会话统计"""
+        with SessionManager._lock:
+            sizes = [SessionManager.estimate_session_bytes(s) for s in session_store.values()]
+            evictions, expirations = SessionManager.evictions, SessionManager.expirations
+        
+        total = sum(sizes)
+        stats = {
+            'live': len(sizes),
+            'max_sessions': int(api_config['max_sessions']),
+            'evictions': evictions,
+            'expired': expirations,
+            'estimated_bytes': total,
+            'estimated_bytes_per_session': total // len(sizes) if sizes else 0
+        }
+        
+        db = get_session_db()
+        if db is not None:
+            stats['persistence'] = {
+                **db.get_stats(),
+                'offloaded': SessionManager.offloaded,
+                'restored': SessionManager.restored
+            }
+        return stats
+
+
+# 后台清理线程
+_reaper_thread = None
+_reaper_stop = threading.Event()
+
+
+def start_reaper():
+    """启动后台清理线程，定期清理过期会话和过期简历"""
+    global _reaper_thread
+    if _reaper_thread is not None:
+        return
+    
+    interval = float(api_config['reaper_interval_seconds'])
+    
+    def reap():
+        while not _reaper_stop.wait(interval):
+            try:
+                SessionManager.cleanup_expired_sessions()
+                SessionManager.offload_idle_sessions()
+                ResumeManager.cleanup_expired_resumes()
+            except Exception as e:
+                print(f"后台清理失败：{e}")
+    
+    _reaper_thread = threading.Thread(target=reap, name='reaper', daemon=True)
+    _reaper_thread.start()
+
+
+def stop_reaper():
+    """停止后台清理线程"""
+    _reaper_stop.set()
+
+
+def record_turn(session: dict, stats: dict):
+    """记录一轮对话的 LLM 调用次数和 Token 数"""
+    llm_calls = stats.get('llm_calls', 0)
+    prompt_tokens = stats.get('prompt_tokens', 0)
+    
+    session['llm_calls'] = session.get('llm_calls', 0) + llm_calls
+    session.setdefault('prompt_tokens', []).append(prompt_tokens)
+    
+    with turn_stats_lock:
+        turn_stats['turns'] += 1
+        turn_stats['llm_calls'] += llm_calls
+        turn_stats['prompt_tokens'] += prompt_tokens
+        turn_stats['last_prompt_tokens'] = prompt_tokens
+        if stats.get('context_mode') == CONTEXT_FULL:
+            turn_stats['full_context_turns'] += 1
+        elif stats.get('context_mode') == CONTEXT_RETRIEVAL:
+            turn_stats['retrieval_turns'] += 1
+        # 服务商返回的提示词前缀缓存命中数（不返回时不计入）
+        turn_stats['prompt_cache_hit_tokens'] += stats.get('prompt_cache_hit_tokens', 0)
+        turn_stats['prompt_cache_miss_tokens'] += stats.get('prompt_cache_miss_tokens', 0)
+        # 检索结果整理前后的简历内容 Token 数（启用整理的检索模式轮次）
+        turn_stats['context_tokens_raw'] += stats.get('context_tokens_raw', 0)
+        turn_stats['context_tokens_packed'] += stats.get('context_tokens_packed', 0)
+    
+    observe_tokens('prompt', prompt_tokens)
+    if stats.get('answer'):
+        observe_tokens('completion', count_tokens(stats['answer']))
+
+
+def resume_context_mode(resume: dict) -> Optional[str]:
+    """简历使用的上下文模式，处理完成前返回 None"""
+    if resume.get('full_context') is not None:
+        return CONTEXT_FULL
+    if resume.get('vectorstore') is not None:
+        return CONTEXT_RETRIEVAL
+    return None
+
+
+def get_turn_stats() -> dict:
+    """获取面试轮次统计"""
+    with turn_stats_lock:
+        stats = dict(turn_stats)
+    turns = stats['turns']
+    stats['llm_calls_per_turn'] = round(stats['llm_calls'] / turns, 3) if turns else 0.0
+    stats['prompt_tokens_per_turn'] = round(stats['prompt_tokens'] / turns, 1) if turns else 0.0
+    cached = stats['prompt_cache_hit_tokens'] + stats['prompt_cache_miss_tokens']
+    stats['prompt_cache_hit_rate'] = round(stats['prompt_cache_hit_tokens'] / cached, 4) if cached else 0.0
+    raw = stats['context_tokens_raw']
+    stats['context_tokens_saved_ratio'] = round(1 - stats['context_tokens_packed'] / raw, 4) if raw else 0.0
+    return stats
+
+
+class ResumeManager:
+    """简历管理器（按内容哈希去重，按 TTL 和数量上限清理）"""
+    
+    _restore_lock = threading.Lock()
+    evictions = 0
+    expirations = 0
+    dedup_hits = 0
+    
+    @staticmethod
+    def index_collection_name(resume_id: str) -> str:
+        """简历向量索引的 collection 名称（每份简历独立）"""
+        return f"resume_{resume_id}"
+    
+    @staticmethod
+    def is_known(content_hash: str) -> bool:
+        """相同内容的简历是否已登记"""
+        with resume_lock:
+            existing_id = resume_hashes.get(content_hash)
+            return existing_id is not None and existing_id in resume_store
+    
+    @staticmethod
+    def register(content_hash: str, resume_id: str, resume: dict) -> Optional[Tuple[str, dict]]:
+        """登记新简历；相同内容的简历已存在时不登记，返回 (已有的 resume_id, 持锁时读取的状态快照)
+        
+        快照包含 status 和 uploaded_at，返回后已有简历即使被清理或淘汰也能正常响应；
+        已有简历在登记前已被移除时按新简历登记
+        """
+        with resume_lock:
+            existing_id = resume_hashes.get(content_hash)
+            existing = resume_store.get(existing_id) if existing_id else None
+            
+            if existing is not None and existing['status'] != 'failed':
+                existing['last_used'] = datetime.now()
+                ResumeManager.dedup_hits += 1
+                return existing_id, {'status': existing['status'], 'uploaded_at': existing['uploaded_at']}
+            
+            # 之前处理失败的同内容简历直接替换
+            if existing is not None:
+                ResumeManager.remove_resume(existing_id)
+            
+            resume['content_hash'] = content_hash
+            resume['last_used'] = datetime.now()
+            resume_store[resume_id] = resume
+            resume_hashes[content_hash] = resume_id
+        
+        ResumeManager.publish_status(resume_id, resume)
+        return None
+    
+    @staticmethod
+    def touch(resume_id: str):
+        """更新简历最近使用时间"""
+        resume = resume_store.get(resume_id)
+        if resume is not None:
+            resume['last_used'] = datetime.now()
+    
+    @staticmethod
+    def remove_temp_file(resume: dict):
+        """删除简历的临时 PDF 文件"""
+        temp_file = Path(resume['file_path'])
+        try:
+            if temp_file.exists():
+                temp_file.unlink()
+        except OSError as e:
+            print(f"警告：删除临时文件失败：{e}")
+    
+    @staticmethod
+    def purge_orphan_temp_files():
+        """删除不属于任何简历的临时文件（如上次运行遗留的文件）"""
+        with resume_lock:
+            known = {Path(resume['file_path']).name for resume in resume_store.values()}
+        
+        removed = 0
+        for temp_file in TEMP_DIR.glob('*.pdf'):
+            if temp_file.name not in known:
+                try:
+                    temp_file.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        
+        if removed:
+            print(f"已清理 {removed} 个遗留的临时文件")
+    
+    @staticmethod
+    def _evictable(resume_id: str, resume: dict) -> bool:
+        """处理完成且没有会话在使用的简历才可以被清理"""
+        if resume['status'] not in ('ready', 'failed'):
+            return False
+        return not SessionManager.get_sessions_by_resume(resume_id)
+    
+    @staticmethod
+    def ensure_capacity() -> bool:
+        """为新简历腾出空间：按最近使用时间淘汰可清理的简历，仍然不足时返回 False"""
+        max_resumes = int(api_config['max_resumes'])
+        
+        with resume_lock:
+            while len(resume_store) >= max_resumes:
+                candidates = [
+                    (resume['last_used'], resume_id)
+                    for resume_id, resume in resume_store.items()
+                    if ResumeManager._evictable(resume_id, resume)
+                ]
+                if not candidates:
+                    return False
+                
+                _, resume_id = min(candidates)
+                ResumeManager.remove_resume(resume_id)
+                ResumeManager.evictions += 1
+                print(f"简历数量已满，淘汰最久未使用的简历：{resume_id}")
+        
+        return True
+    
+    @staticmethod
+    def cleanup_expired_resumes():
+        """清理过期简历（超过 resume_ttl_seconds 未被使用且没有会话）"""
+        ttl = float(api_config['resume_ttl_seconds'])
+        now = datetime.now()
+        
+        with resume_lock:
+            expired_resumes = [
+                resume_id for resume_id, resume in list(resume_store.items())
+                if (now - resume['last_used']).total_seconds() > ttl
+                and ResumeManager._evictable(resume_id, resume)
+            ]
+            for resume_id in expired_resumes:
+                ResumeManager.remove_resume(resume_id)
+            ResumeManager.expirations += len(expired_resumes)
+        
+        # 不在内存中、也没有会话记录引用的持久化简历（如上次运行遗留的数据）
+        db = get_session_db()
+        if db is not None:
+            with resume_lock:
+                live = list(resume_store.keys())
+            db.delete_orphan_resumes(ttl, keep=live)
+        
+        if expired_resumes:
+            print(f"已清理 {len(expired_resumes)} 份过期简历")
+    
+    @staticmethod
+    def get_stats() -> dict:
+        """获取简历统计"""
+        with resume_lock:
+            resumes = list(resume_store.values())
+        
+        by_status = {}
+        by_context_mode = {}
+        for resume in resumes:
+            by_status[resume['status']] = by_status.get(resume['status'], 0) + 1
+            mode = resume_context_mode(resume)
+            if mode is not None:
+                by_context_mode[mode] = by_context_mode.get(mode, 0) + 1
+        
+        return {
+            'count': len(resumes),
+            'max_resumes': int(api_config['max_resumes']),
+            'by_status': by_status,
+            'by_context_mode': by_context_mode,
+            'dedup_hits': ResumeManager.dedup_hits,
+            'evictions': ResumeManager.evictions,
+            'expired': ResumeManager.expirations,
+            'temp_files': len(list(TEMP_DIR.glob('*.pdf')))
+        }
+    
+    @staticmethod
+    def publish_status(resume_id: str, resume: dict):
+        """把处理状态写入持久化存储，供其他服务进程查询（未启用持久化时不做任何事）"""
+        db = get_session_db()
+        if db is None:
+            return
+        
+        try:
+            db.set_resume_status(
+                resume_id, resume['status'], resume['progress'], resume['error'],
+                chunk_count=len(resume['chunks']) if resume['chunks'] else 0
+            )
+        except Exception as e:
+            print(f"警告：保存简历状态失败：{e}")
+    
+    @staticmethod
+    def update_status(resume_id: str, status: str, progress: int):
+        """更新简历处理状态"""
+        resume = resume_store.get(resume_id)
+        if resume is not None:
+            resume['status'] = status
+            resume['progress'] = progress
+            ResumeManager.publish_status(resume_id, resume)
+    
+    @staticmethod
+    def mark_failed(resume_id: str, message: str):
+        """标记简历处理失败并删除临时文件"""
+        resume = resume_store.get(resume_id)
+        if resume is None:
+            return
+        
+        resume['status'] = 'failed'
+        resume['error'] = message
+        ResumeManager.publish_status(resume_id, resume)
+        ResumeManager.remove_temp_file(resume)
+        resume['ready_event'].set()
+    
+    @staticmethod
+    def ingest_resume(resume_id: str) -> bool:
+        """解析简历、分块并构建向量索引（在后台线程中运行）"""
+        resume = resume_store.get(resume_id)
+        if resume is None:
+            return False
+        
+        # 加载简历并分块
+        ResumeManager.update_status(resume_id, 'parsing', 10)
+        chunks = load_resume(Path(resume['file_path']))
+        if chunks is None:
+            ResumeManager.mark_failed(resume_id, '无法读取简历内容')
+            return False
+        
+        # 解析完成后不再需要原始文件
+        ResumeManager.remove_temp_file(resume)
+        
+        config = load_config()
+        if config is None:
+            ResumeManager.mark_failed(resume_id, '配置加载失败')
+            return False
+        
+        # 简历较短时直接使用完整简历作为上下文，无需构建向量索引
+        full_context = build_full_context(chunks, config)
+        vectorstore = None
+        
+        # 构建简历向量索引（每份简历只构建一次，所有会话和风格共享）
+        if full_context is None:
+            ResumeManager.update_status(resume_id, 'indexing', 50)
+            try:
+                vectorstore = build_resume_index(
+                    chunks, config,
+                    collection_name=ResumeManager.index_collection_name(resume_id)
+                )
+            except Exception as e:
+                ResumeManager.mark_failed(resume_id, f'简历索引构建失败：{str(e)}')
+                return False
+        
+        # 处理期间简历可能已被删除（此时还没有会话引用，持久化记录已一并删除，索引文件也不再需要）
+        if resume_id not in resume_store:
+            drop_resume_index(vectorstore)
+            purge_resume_index(config, ResumeManager.index_collection_name(resume_id))
+            return False
+        
+        resume['chunks'] = chunks
+        resume['full_context'] = full_context
+        resume['vectorstore'] = vectorstore
+        resume['ready_at'] = datetime.now()
+        
+        # 保存文本块，重启后或在其他进程中可据此恢复简历、重建面试链
+        db = get_session_db()
+        if db is not None:
+            try:
+                db.save_resume(resume_id, resume)
+            except Exception as e:
+                print(f"警告：保存简历数据失败：{e}")
+        
+        ResumeManager.update_status(resume_id, 'ready', 100)
+        resume['ready_event'].set()
+        return True
+    
+    @staticmethod
+    def get_remote_status(resume_id: str) -> Optional[dict]:
+        """查询不在本进程内存中的简历的处理状态（由其他进程处理或重启前上传），不存在时返回 None"""
+        db = get_session_db()
+        return db.get_resume_status(resume_id) if db is not None else None
+    
+    @staticmethod
+    def wait_until_ready(resume_id: str, timeout: float) -> Optional[dict]:
+        """等待简历处理完成，返回简历数据（不存在时返回 None）"""
+        resume = resume_store.get(resume_id)
+        if resume is None:
+            # 由其他进程处理的简历：轮询持久化的处理状态，完成后在本进程恢复
+            deadline = time.time() + timeout
+            status = ResumeManager.get_remote_status(resume_id)
+            while status is not None and status['status'] not in ('ready', 'failed') and time.time() < deadline:
+                time.sleep(0.2)
+                status = ResumeManager.get_remote_status(resume_id)
+            
+            if status is not None and status['status'] != 'ready':
+                return status
+            return ResumeManager.restore_resume(resume_id)
+        
+        if resume['status'] not in ('ready', 'failed') and timeout > 0:
+            resume['ready_event'].wait(timeout)
+        return resume
+    
+    @staticmethod
+    def restore_resume(resume_id: str) -> Optional[dict]:
+        """从持久化存储恢复简历（重启后或由其他进程上传的简历），不存在时返回 None
+        
+        完整简历模式直接可用；检索模式需要重新构建向量索引（向量缓存命中时无需重新计算 Embedding）
+        """
+        db = get_session_db()
+        if db is None:
+            return resume_store.get(resume_id)
+        
+        with ResumeManager._restore_lock:
+            resume = resume_store.get(resume_id)
+            if resume is not None:
+                return resume
+            
+            data = db.load_resume(resume_id)
+            config = load_config()
+            if data is None or config is None:
+                return None
+            
+            vectorstore = None
+            if data['full_context'] is None:
+                try:
+                    vectorstore = build_resume_index(
+                        data['chunks'], config,
+                        collection_name=ResumeManager.index_collection_name(resume_id)
+                    )
+                except Exception as e:
+                    print(f"恢复简历失败：{e}")
+                    return None
+            
+            ready_event = threading.Event()
+            ready_event.set()
+            resume = {
+                **data,
+                'file_path': str(TEMP_DIR / f"{resume_id}.pdf"),
+                'vectorstore': vectorstore,
+                'status': 'ready',
+                'progress': 100,
+                'error': None,
+                'ready_event': ready_event,
+                'uploaded_at': datetime.now(),
+                'ready_at': datetime.now(),
+                'last_used': datetime.now()
+            }
+            with resume_lock:
+                resume_store[resume_id] = resume
+                if data['content_hash'] and data['content_hash'] not in resume_hashes:
+                    resume_hashes[data['content_hash']] = resume_id
+            print(f"已从持久化存储恢复简历：{resume_id}")
+            return resume
+    
+    @staticmethod
+    def remove_resume(resume_id: str, purge: bool = False) -> bool:
+        """移除简历，同时结束相关会话并删除其向量索引和临时文件
+        
+        启用持久化时，purge 为 True（用户删除简历）会一并删除简历和会话的持久化记录；
+        否则（容量淘汰、过期清理）只释放内存，仍有会话记录引用的简历保留持久化数据以便恢复
+        """
+        db = get_session_db()
+        with resume_lock:
+            resume = resume_store.pop(resume_id, None)
+            if resume is not None and resume_hashes.get(resume.get('content_hash')) == resume_id:
+                del resume_hashes[resume['content_hash']]
+        
+        # 先释放内存中的索引；已持久化的索引文件只在用户删除简历时删除
+        # （容量淘汰和过期清理时其他工作进程可能仍在加载或使用同一目录）
+        if resume is not None:
+            drop_resume_index(resume.get('vectorstore'))
+        if purge:
+            config = load_config()
+            if config is not None:
+                purge_resume_index(config, ResumeManager.index_collection_name(resume_id))
+        
+        if db is not None:
+            persisted = db.get_resume_status(resume_id) is not None or db.load_resume(resume_id) is not None
+            if purge:
+                for session_id in db.get_session_ids(resume_id):
+                    SessionManager.end_session(session_id)
+                db.delete_resume(resume_id, with_sessions=True)
+            elif not db.get_session_ids(resume_id):
+                db.delete_resume(resume_id)
+            if resume is None:
+                return purge and persisted
+        
+        if resume is None:
+            return False
+        
+        # 结束仍在使用该简历的会话
+        for session_id in SessionManager.get_sessions_by_resume(resume_id):
+            SessionManager.end_session(session_id)
+        
+        ResumeManager.remove_temp_file(resume)
+        
+        # 唤醒仍在等待该简历处理完成或第一个问题预生成的请求
+        if 'ready_event' in resume:
+            resume['ready_event'].set()
+        for opener in resume.get('openers', {}).values():
+            opener['event'].set()
+        return True
+
+
+class IngestionPool:
+    """简历处理线程池：解析、分块和构建索引都在后台完成，不占用请求线程"""
+    
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=int(api_config['ingest_workers']),
+                    thread_name_prefix='resume-ingest'
+                )
+            return self._executor
+    
+    def submit(self, resume_id: str) -> bool:
+        """提交简历处理任务，队列已满时返回 False"""
+        with self._lock:
+            if self.queued >= int(api_config['ingest_max_queue']):
+                return False
+            self.queued += 1
+        
+        self._get_executor().submit(self._run, resume_id, time.perf_counter())
+        return True
+    
+    def _run(self, resume_id: str, submitted_at: float):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        observe_stage('ingest_queue_wait', time.perf_counter() - submitted_at)
+        
+        try:
+            with timed_stage('ingest'):
+                ok = ResumeManager.ingest_resume(resume_id)
+        except Exception as e:
+            ResumeManager.mark_failed(resume_id, f'简历处理失败：{str(e)}')
+            ok = False
+        
+        with self._lock:
+            self.running -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+        
+        if ok:
+            OpenerManager.schedule(resume_id)
+    
+    def get_stats(self) -> dict:
+        """获取队列统计"""
+        with self._lock:
+            return {
+                'workers': int(api_config['ingest_workers']),
+                'max_queue': int(api_config['ingest_max_queue']),
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed
+            }
+
+
+ingestion_pool = IngestionPool()
+
+
+class OpenerManager:
+    """第一个问题预生成
+    
+    第一个问题只取决于简历和面试官风格：简历就绪后在后台为每种风格生成一次并随简历缓存，
+    开始面试时直接使用，无需等待 LLM 生成；缓存未命中时回退到现场生成。
+    """
+    
+    _lock = threading.Lock()
+    _executor = None
+    hits = 0
+    misses = 0
+    generated = 0
+    failed = 0
+    
+    @staticmethod
+    def styles() -> List[str]:
+        return [style.strip() for style in api_config['opener_styles'].split(',') if style.strip()]
+    
+    @staticmethod
+    def _get_executor() -> ThreadPoolExecutor:
+        with OpenerManager._lock:
+            if OpenerManager._executor is None:
+                OpenerManager._executor = ThreadPoolExecutor(
+                    max_workers=int(api_config['opener_workers']),
+                    thread_name_prefix='opener'
+                )
+            return OpenerManager._executor
+    
+    @staticmethod
+    def schedule(resume_id: str):
+        """为就绪的简历提交各风格第一个问题的预生成任务"""
+        if not api_config['pregenerate_openers']:
+            return
+        
+        resume = resume_store.get(resume_id)
+        if resume is None or resume['status'] != 'ready':
+            return
+        
+        with OpenerManager._lock:
+            openers = resume.setdefault('openers', {})
+            styles = [style for style in OpenerManager.styles() if style not in openers]
+            for style in styles:
+                openers[style] = {'status': 'pending', 'event': threading.Event()}
+        
+        for style in styles:
+            OpenerManager._get_executor().submit(OpenerManager._generate, resume_id, style)
+    
+    @staticmethod
+    def _generate(resume_id: str, style: str):
+        resume = resume_store.get(resume_id)
+        if resume is None:
+            return
+        opener = resume['openers'][style]
+        
+        try:
+            config = load_config()
+            llm = get_llm(config) if config is not None else None
+            if llm is None:
+                raise RuntimeError('无法初始化语言模型')
+            
+            # 使用独立的面试链生成，不影响任何会话的对话记忆
+            chain = create_interview_chain(
+                resume['chunks'], llm, config,
+                vectorstore=resume.get('vectorstore'),
+                interview_style=style,
+                full_context=resume.get('full_context')
+            )
+            stats = {}
+            with timed_stage('opener_pregenerate'):
+                question = invoke_interview(chain, FIRST_QUESTION_PROMPT, stats)
+            if not question:
+                raise RuntimeError('LLM 返回为空')
+            
+            with OpenerManager._lock:
+                opener.update({
+                    'status': 'ready',
+                    'question': question,
+                    'llm_calls': stats.get('llm_calls', 1),
+                    'prompt_tokens': stats.get('prompt_tokens', 0),
+                    'generated_at': datetime.now().isoformat()
+                })
+                OpenerManager.generated += 1
+        except Exception as e:
+            print(f"预生成第一个问题失败（风格：{style}）：{e}")
+            with OpenerManager._lock:
+                opener['status'] = 'failed'
+                OpenerManager.failed += 1
+        finally:
+            opener['event'].set()
+    
+    @staticmethod
+    def take(resume_id: str, style: str) -> Optional[str]:
+        """获取预生成的第一个问题；正在生成时最多等待 opener_wait_seconds 秒，未命中返回 None"""
+        resume = resume_store.get(resume_id)
+        opener = (resume or {}).get('openers', {}).get(style)
+        
+        if opener is not None and opener['status'] == 'pending':
+            opener['event'].wait(float(api_config['opener_wait_seconds']))
+        
+        with OpenerManager._lock:
+            if opener is not None and opener['status'] == 'ready':
+                OpenerManager.hits += 1
+                return opener['question']
+            OpenerManager.misses += 1
+            return None
+    
+    @staticmethod
+    def apply(session: dict, question: str):
+        """把缓存的第一个问题写入会话的对话记忆，后续对话与现场生成时一致"""
+        from interview_memory import save_turn
+        save_turn(session['chain'].memory, FIRST_QUESTION_PROMPT, question)
+    
+    @staticmethod
+    def get_stats() -> dict:
+        """获取预生成统计"""
+        with OpenerManager._lock:
+            total = OpenerManager.hits + OpenerManager.misses
+            return {
+                'enabled': bool(api_config['pregenerate_openers']),
+                'styles': OpenerManager.styles(),
+                'hits': OpenerManager.hits,
+                'misses': OpenerManager.misses,
+                'hit_rate': round(OpenerManager.hits / total, 4) if total else 0.0,
+                'generated': OpenerManager.generated,
+                'failed': OpenerManager.failed
+            }
+
+
+class StartupManager:
+    """启动预热
+    
+    模块导入时只加载轻量依赖，端口尽早开始监听；LangChain、Chroma 等重量级依赖的导入和
+    Embedding 模型预热在后台线程中完成。预热期间 /api/health 正常返回（存活），
+    启用模型预加载时 /api/ready 在模型加载完成前返回 503。
+    """
+    
+    import_seconds = 0.0
+    status = 'pending'  # pending / running / done / failed
+    profile: Dict[str, float] = {}
+    warmup_seconds = 0.0
+    _thread = None
+    
+    @staticmethod
+    def start_warmup(background: bool = True):
+        """开始预热；background 为 False 时在当前线程中完成"""
+        if StartupManager.status != 'pending':
+            return
+        StartupManager.status = 'running'
+        
+        if not background:
+            StartupManager._warmup()
+            return
+        StartupManager._thread = threading.Thread(target=StartupManager._warmup, name='warmup', daemon=True)
+        StartupManager._thread.start()
+    
+    @staticmethod
+    def _warmup():
+        start = time.perf_counter()
+        try:
+            config = load_config()
+            preload = config is not None and config.getboolean('embedding', 'preload', fallback=True)
+            if preload:
+                print("\n正在预热 Embedding 模型...")
+            StartupManager.profile = preload_dependencies(config, load_embeddings=preload)
+            StartupManager.status = 'done'
+        except Exception as e:
+            print(f"警告：启动预热失败：{e}")
+            StartupManager.status = 'failed'
+        
+        StartupManager.warmup_seconds = round(time.perf_counter() - start, 3)
+        print(f"启动预热完成，耗时 {StartupManager.warmup_seconds:.2f}s（{format_profile(StartupManager.profile)}）")
+    
+    @staticmethod
+    def get_stats() -> dict:
+        """获取启动耗时（导入耗时、预热各项耗时）"""
+        return {
+            'import_seconds': StartupManager.import_seconds,
+            'warmup_status': StartupManager.status,
+            'warmup_seconds': StartupManager.warmup_seconds,
+            'profile': dict(StartupManager.profile)
+        }
 
 
 def load_api_config():
@@ -115,6 +1137,26 @@ def load_api_config():
         api_config['port'] = config.get('api', 'port', fallback='5000')
         api_config['cors_enabled'] = config.getboolean('api', 'cors_enabled', fallback=True)
         api_config['cors_origins'] = config.get('api', 'cors_origins', fallback='*')
+        api_config['ingest_workers'] = config.getint('api', 'ingest_workers', fallback=2)
+        api_config['ingest_max_queue'] = config.getint('api', 'ingest_max_queue', fallback=20)
+        api_config['resume_wait_seconds'] = config.getfloat('api', 'resume_wait_seconds', fallback=30)
+        api_config['max_sessions'] = config.getint('api', 'max_sessions', fallback=10)
+        api_config['max_session_memory_mb'] = config.getfloat('api', 'max_session_memory_mb', fallback=0)
+        api_config['session_idle_seconds'] = config.getfloat('api', 'session_idle_seconds', fallback=120)
+        api_config['session_ttl_seconds'] = config.getfloat('api', 'session_ttl_seconds', fallback=1800)
+        api_config['reaper_interval_seconds'] = config.getfloat('api', 'reaper_interval_seconds', fallback=60)
+        api_config['max_resumes'] = config.getint('api', 'max_resumes', fallback=100)
+        api_config['resume_ttl_seconds'] = config.getfloat('api', 'resume_ttl_seconds', fallback=7200)
+        api_config['pregenerate_openers'] = config.getboolean('api', 'pregenerate_openers', fallback=True)
+        api_config['opener_styles'] = config.get('api', 'opener_styles', fallback='critical,partner,guide')
+        api_config['opener_workers'] = config.getint('api', 'opener_workers', fallback=2)
+        api_config['opener_wait_seconds'] = config.getfloat('api', 'opener_wait_seconds', fallback=10)
+        api_config['persist_sessions'] = config.getboolean('api', 'persist_sessions', fallback=True)
+        api_config['session_db_path'] = config.get('api', 'session_db_path', fallback='cache/sessions.sqlite3')
+        api_config['session_offload_seconds'] = config.getfloat('api', 'session_offload_seconds', fallback=300)
+        api_config['workers'] = config.getint('api', 'workers', fallback=0)
+        api_config['worker_mode'] = config.get('api', 'worker_mode', fallback='threaded')
+        api_config['background_warmup'] = config.getboolean('api', 'background_warmup', fallback=True)
     except configparser.NoSectionError:
         print("警告：config.ini 中没有 [api] 配置段，使用默认配置")
     except Exception as e:
@@ -132,14 +1174,258 @@ def load_api_config():
         print(f"CORS 已启用，允许来源：{api_config['cors_origins']}")
 
 
+def readiness_checks() -> dict:
+    """就绪检查：配置可读取、Embedding 模型已加载（启用预加载时）、后台任务正常"""
+    config = load_config()
+    preload = config is not None and config.getboolean('embedding', 'preload', fallback=True)
+    ingestion = ingestion_pool.get_stats()
+    
+    return {
+        'config_loaded': config is not None,
+        'embedding_model_loaded': config is not None and is_embedding_loaded(config),
+        'embedding_preload': preload,
+        'reaper_running': _reaper_thread is not None and _reaper_thread.is_alive(),
+        'warmup': StartupManager.status,
+        'ingestion_queue_available': ingestion['queued'] < ingestion['max_queue']
+    }
+
+
+def health_payload() -> dict:
+    """健康检查信息（包含就绪状态）"""
+    checks = readiness_checks()
+    # 未启用预加载时模型在第一次使用时加载，不影响就绪状态
+    ready = checks['config_loaded'] and (
+        checks['embedding_model_loaded'] or not checks['embedding_preload']
+    )
+    return {
+        'status': 'healthy',
+        'ready': ready,
+        'checks': checks,
+        'timestamp': datetime.now().isoformat(),
+        'version': '1.0.0'
+    }
+
+
+def collect_server_metrics():
+    """导出 /api/metrics 时采集的会话、简历、队列、缓存和 LLM 状态指标"""
+    sessions = SessionManager.get_stats()
+    resumes = ResumeManager.get_stats()
+    ingestion = ingestion_pool.get_stats()
+    turns = get_turn_stats()
+    embeddings = get_embedding_stats()
+    llm_clients = get_llm_pool_stats()
+    
+    yield ('resume_roaster_sessions', 'gauge', '当前会话数', [({}, sessions['live'])])
+    yield ('resume_roaster_session_memory_bytes', 'gauge', '会话估算内存（字节）',
+           [({}, sessions['estimated_bytes'])])
+    yield ('resume_roaster_session_evictions_total', 'counter', '因容量不足被淘汰的会话数',
+           [({}, sessions['evictions'])])
+    yield ('resume_roaster_session_expirations_total', 'counter', '因过期被清理的会话数',
+           [({}, sessions['expired'])])
+    yield ('resume_roaster_resumes', 'gauge', '按处理状态统计的简历数',
+           [({'status': status}, count) for status, count in resumes['by_status'].items()]
+           or [({'status': 'ready'}, 0)])
+    yield ('resume_roaster_resume_dedup_hits_total', 'counter', '重复上传直接复用的次数',
+           [({}, resumes['dedup_hits'])])
+    yield ('resume_roaster_resume_evictions_total', 'counter', '因容量不足或过期被清理的简历数',
+           [({'reason': 'capacity'}, resumes['evictions']), ({'reason': 'expired'}, resumes['expired'])])
+    yield ('resume_roaster_ingestion_tasks', 'gauge', '简历处理任务数',
+           [({'state': 'queued'}, ingestion['queued']), ({'state': 'running'}, ingestion['running'])])
+    yield ('resume_roaster_ingestion_finished_total', 'counter', '已结束的简历处理任务数',
+           [({'result': 'completed'}, ingestion['completed']), ({'result': 'failed'}, ingestion['failed'])])
+    openers = OpenerManager.get_stats()
+    yield ('resume_roaster_opener_cache_total', 'counter', '开始面试时预生成第一个问题的命中情况',
+           [({'result': 'hit'}, openers['hits']), ({'result': 'miss'}, openers['misses'])])
+    yield ('resume_roaster_opener_generated_total', 'counter', '后台预生成第一个问题的次数',
+           [({'result': 'ready'}, openers['generated']), ({'result': 'failed'}, openers['failed'])])
+    yield ('resume_roaster_turns_total', 'counter', '面试对话轮数', [({}, turns['turns'])])
+    yield ('resume_roaster_context_turns_total', 'counter', '按上下文模式统计的对话轮数（full 为完整简历，retrieval 为向量检索）',
+           [({'mode': CONTEXT_FULL}, turns['full_context_turns']),
+            ({'mode': CONTEXT_RETRIEVAL}, turns['retrieval_turns'])])
+    yield ('resume_roaster_llm_calls_total', 'counter', 'LLM 调用次数（含问题改写和摘要）',
+           [({}, turns['llm_calls'])])
+    yield ('resume_roaster_embedding_models_loaded', 'gauge', '已加载的 Embedding 模型数',
+           [({}, embeddings['loaded_models'])])
+    yield ('resume_roaster_process_rss_bytes', 'gauge', '进程常驻内存（字节）',
+           [({}, embeddings['process_rss_bytes'])])
+    
+    cache = embeddings.get('cache')
+    if cache:
+        caches = cache.get('caches', [cache])
+        yield ('resume_roaster_embedding_cache_lookups_total', 'counter', 'Embedding 向量缓存查询次数',
+               [({'result': 'hit'}, sum(c['hits'] for c in caches)),
+                ({'result': 'miss'}, sum(c['misses'] for c in caches))])
+        yield ('resume_roaster_embedding_cache_entries', 'gauge', 'Embedding 向量缓存条数',
+               [({}, sum(c['entries'] for c in caches))])
+    
+    pdf = get_parse_stats()
+    yield ('resume_roaster_pdf_parses_total', 'counter', 'PDF 解析次数（cached 为命中解析缓存，parallel 为按页并行提取）',
+           [({'mode': 'cached'}, pdf['cached']), ({'mode': 'parallel'}, pdf['parallel_parses']),
+            ({'mode': 'sequential'}, pdf['parses'] - pdf['parallel_parses'])])
+    yield ('resume_roaster_pdf_pages_total', 'counter', '实际提取的 PDF 页数（不含缓存命中）', [({}, pdf['pages'])])
+    
+    yield ('resume_roaster_llm_clients', 'gauge', '复用中的 LLM 客户端数', [({}, llm_clients['clients'])])
+    yield ('resume_roaster_llm_client_reuses_total', 'counter', 'LLM 客户端复用次数',
+           [({}, llm_clients['reuses'])])
+    startup = StartupManager.get_stats()
+    yield ('resume_roaster_startup_seconds', 'gauge', '启动耗时（import 为模块导入，warmup 为后台预热）',
+           [({'phase': 'import'}, startup['import_seconds']), ({'phase': 'warmup'}, startup['warmup_seconds'])])
+    yield ('resume_roaster_ready', 'gauge', '服务是否就绪（1 为就绪）',
+           [({}, 1 if health_payload()['ready'] else 0)])
+
+
+metrics_registry.register_collector(collect_server_metrics)
+
+
+def stats_payload() -> dict:
+    """运行统计信息"""
+    return {
+        'embeddings': get_embedding_stats(),
+        'pdf': get_parse_stats(),
+        'interview': get_turn_stats(),
+        'llm_clients': get_llm_pool_stats(),
+        'ingestion': ingestion_pool.get_stats(),
+        'sessions': SessionManager.get_stats(),
+        'resumes': ResumeManager.get_stats(),
+        'openers': OpenerManager.get_stats(),
+        'startup': StartupManager.get_stats(),
+        'stages': get_stage_stats(),
+        'pid': os.getpid(),  # 多进程模式下各工作进程分别统计
+        'timestamp': datetime.now().isoformat()
+    }
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
-    }), 200
+    return jsonify(health_payload()), 200
+
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """运行统计接口"""
+    return jsonify(stats_payload()), 200
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查接口（未就绪时返回 503，供负载均衡使用）"""
+    payload = health_payload()
+    return jsonify(payload), 200 if payload['ready'] else 503
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 格式指标接口"""
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由模板记录请求耗时（流式响应在发送结束后记录）"""
+    start = g.get('request_start')
+    if start is None:
+        return response
+    
+    method = request.method
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = response.status_code
+    if response.is_streamed:
+        response.call_on_close(
+            lambda: observe_request(method, endpoint, status, time.perf_counter() - start)
+        )
+    else:
+        observe_request(method, endpoint, status, time.perf_counter() - start)
+    return response
+
+
+def accept_resume_upload(filename: str, content: bytes):
+    """校验并登记上传的简历，返回 (响应数据, 状态码)"""
+    if filename == '':
+        return {
+            'error': 'No file selected',
+            'message': '请选择文件'
+        }, 400
+    
+    # 验证文件格式
+    if not filename.lower().endswith('.pdf'):
+        return {
+            'error': 'Invalid file format',
+            'message': '仅支持 PDF 格式的简历文件'
+        }, 400
+    
+    # 验证文件大小（10MB限制）
+    file_size = len(content)
+    if file_size > 10 * 1024 * 1024:
+        return {
+            'error': 'File too large',
+            'message': '文件大小不能超过10MB'
+        }, 400
+    
+    # 按文件内容哈希去重：相同简历直接复用已解析、已索引的结果
+    content_hash = hashlib.sha256(content).hexdigest()
+    
+    # 为新简历腾出空间（重复上传不占用新位置）
+    if not ResumeManager.is_known(content_hash) and not ResumeManager.ensure_capacity():
+        return {
+            'error': 'Too many resumes',
+            'message': '服务器繁忙，请稍后再试'
+        }, 503
+    
+    resume_id = str(uuid.uuid4())
+    temp_file = TEMP_DIR / f"{resume_id}.pdf"
+    
+    # 登记简历，解析和索引交给后台线程池
+    existing = ResumeManager.register(content_hash, resume_id, {
+        'file_path': str(temp_file),
+        'file_name': filename,
+        'file_size': file_size,
+        'chunks': None,
+        'full_context': None,
+        'vectorstore': None,
+        'status': 'queued',
+        'progress': 0,
+        'error': None,
+        'ready_event': threading.Event(),
+        'uploaded_at': datetime.now()
+    })
+    
+    if existing is not None:
+        existing_id, existing = existing
+        return {
+            'success': True,
+            'resume_id': existing_id,
+            'status': 'ready' if existing['status'] == 'ready' else 'processing',
+            'deduplicated': True,
+            'filename': filename,
+            'file_size': file_size,
+            'uploaded_at': existing['uploaded_at'].isoformat()
+        }, 200
+    
+    # 保存文件到临时目录
+    temp_file.write_bytes(content)
+    
+    if not ingestion_pool.submit(resume_id):
+        ResumeManager.remove_resume(resume_id)
+        return {
+            'error': 'Too many uploads',
+            'message': '服务器繁忙，请稍后再试'
+        }, 503
+    
+    return {
+        'success': True,
+        'resume_id': resume_id,
+        'status': 'processing',
+        'deduplicated': False,
+        'filename': filename,
+        'file_size': file_size,
+        'uploaded_at': datetime.now().isoformat()
+    }, 200
 
 
 @app.route('/api/upload-resume', methods=['POST'])
@@ -154,167 +1440,362 @@ def upload_resume():
             }), 400
         
         file = request.files['file']
+        payload, status = accept_resume_upload(file.filename, file.read())
+        return jsonify(payload), status
         
-        if file.filename == '':
-            return jsonify({
-                'error': 'No file selected',
-                'message': '请选择文件'
-            }), 400
-        
-        # 验证文件格式
-        if not file.filename.lower().endswith('.pdf'):
-            return jsonify({
-                'error': 'Invalid file format',
-                'message': '仅支持 PDF 格式的简历文件'
-            }), 400
-        
-        # 验证文件大小（10MB限制）
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > 10 * 1024 * 1024:
-            return jsonify({
-                'error': 'File too large',
-                'message': '文件大小不能超过10MB'
-            }), 400
-        
-        # 保存文件到临时目录
-        resume_id = str(uuid.uuid4())
-        temp_file = TEMP_DIR / f"{resume_id}.pdf"
-        file.save(str(temp_file))
-        
-        # 加载简历并创建简历数据
-        chunks = load_resume(temp_file)
-        if chunks is None:
-            if temp_file.exists():
-                temp_file.unlink()
-            return jsonify({
-                'error': 'Failed to load resume',
-                'message': '无法读取简历内容'
-            }), 400
-        
-        # 存储简历数据
-        resume_store[resume_id] = {
-            'file_path': str(temp_file),
-            'file_name': file.filename,
-            'file_size': file_size,
-            'chunks': chunks,
-            'uploaded_at': datetime.now()
-        }
-        
+    except Exception as e:
         return jsonify({
+            'error': 'Upload failed',
+            'message': f'上传失败：{str(e)}'
+        }), 500
+
+
+def resume_status_payload(resume_id: str):
+    """简历处理状态，返回 (响应数据, 状态码)"""
+    resume = resume_store.get(resume_id)
+    if resume is None:
+        # 可能由其他服务进程处理
+        status = ResumeManager.get_remote_status(resume_id)
+        if status is None:
+            return {
+                'error': 'Resume not found',
+                'message': '简历不存在或已过期'
+            }, 404
+        
+        return {
             'success': True,
             'resume_id': resume_id,
-            'filename': file.filename,
-            'file_size': file_size,
-            'uploaded_at': datetime.now().isoformat()
-        }), 200
-        
+            **status,
+            'queue': ingestion_pool.get_stats()
+        }, 200
+    
+    return {
+        'success': True,
+        'resume_id': resume_id,
+        'status': resume['status'],
+        'progress': resume['progress'],
+        'chunk_count': len(resume['chunks']) if resume['chunks'] else 0,
+        'context_mode': resume_context_mode(resume),
+        'error': resume['error'],
+        'queue': ingestion_pool.get_stats()
+    }, 200
+
+
+def delete_resume_payload(resume_id: str):
+    """删除简历，返回 (响应数据, 状态码)"""
+    if ResumeManager.remove_resume(resume_id, purge=True):
+        return {
+            'success': True,
+            'resume_id': resume_id,
+            'message': '简历已删除',
+            'deleted_at': datetime.now().isoformat()
+        }, 200
+    
+    return {
+        'success': False,
+        'error': 'Resume not found',
+        'message': '简历不存在或已过期'
+    }, 404
+
+
+@app.route('/api/resume/<resume_id>/status', methods=['GET'])
+def resume_status(resume_id):
+    """简历处理状态接口"""
+    payload, status = resume_status_payload(resume_id)
+    return jsonify(payload), status
+
+
+@app.route('/api/resume/<resume_id>', methods=['DELETE'])
+def delete_resume(resume_id):
+    """删除简历接口"""
+    try:
+        payload, status = delete_resume_payload(resume_id)
+        return jsonify(payload), status
+            
     except Exception as e:
         return jsonify({
-            'error': 'Upload failed',
-            'message': f'上传失败：{str(e)}'
+            'error': 'Delete resume failed',
+            'message': f'删除简历失败：{str(e)}'
         }), 500
 
 
+# 风格名称映射
+STYLE_NAMES = {
+    'critical': '刁钻型',
+    'partner': '伙伴型',
+    'guide': '引导型'
+}
+
+DEFAULT_FIRST_QUESTION = '你好，我是今天的面试官。让我们开始吧，请先做个自我介绍。'
+EMPTY_REPLY = '抱歉，我没有收到回答。'
+
+
+def sse_event(event: str, data: dict) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(generator) -> Response:
+    """构造 SSE 流式响应"""
+    return Response(
+        stream_with_context(generator),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # 禁止反向代理缓冲
+        }
+    )
+
+
+def interview_started_payload(session_id: str, interview_style: str) -> dict:
+    """面试会话创建成功的公共字段"""
+    return {
+        'session_id': session_id,
+        'interview_style': interview_style,
+        'style_name': STYLE_NAMES.get(interview_style, '刁钻型'),
+        'started_at': datetime.now().isoformat()
+    }
+
+
+def prompt_cache_fields(stats: dict) -> dict:
+    """本轮的提示词缓存命中/未命中 Token 数（服务商未返回时为空）"""
+    return {key: stats[key] for key in ('prompt_cache_hit_tokens', 'prompt_cache_miss_tokens') if key in stats}
+
+
+def context_token_fields(stats: dict) -> dict:
+    """本轮检索结果整理前后的简历内容 Token 数（未整理时为空）"""
+    return {key: stats[key] for key in ('context_tokens_raw', 'context_tokens_packed') if key in stats}
+
+
+def first_question_done_payload(session_id: str, stats: dict, cached: bool = False) -> dict:
+    """流式生成第一个问题结束时的 done 事件数据（cached 表示使用了预生成的问题）"""
+    return {
+        'session_id': session_id,
+        'message': stats.get('answer', ''),
+        'opener_cached': cached,
+        'llm_calls': stats.get('llm_calls', 0),
+        'prompt_tokens': stats.get('prompt_tokens', 0),
+        **prompt_cache_fields(stats),
+        **context_token_fields(stats),
+        'context_mode': stats.get('context_mode'),
+        'ttft_ms': int(stats.get('ttft_seconds', 0) * 1000),
+        'total_ms': int(stats.get('total_seconds', 0) * 1000)
+    }
+
+
+def message_reply_payload(session_id: str, session: dict, stats: dict) -> dict:
+    """记录一轮对话并返回回答数据（stats['answer'] 为面试官回答）"""
+    session['message_count'] += 1
+    record_turn(session, stats)
+    SessionManager.persist(session_id)
+    
+    payload = {
+        'success': True,
+        'response': stats['answer'],
+        'session_id': session_id,
+        'message_count': session['message_count'],
+        'llm_calls': stats['llm_calls'],
+        'prompt_tokens': stats['prompt_tokens'],
+        **prompt_cache_fields(stats),
+        **context_token_fields(stats),
+        'context_mode': stats.get('context_mode'),
+        'timestamp': datetime.now().isoformat()
+    }
+    if 'ttft_seconds' in stats:
+        payload['ttft_ms'] = int(stats['ttft_seconds'] * 1000)
+        payload['total_ms'] = int(stats['total_seconds'] * 1000)
+    return payload
+
+
+def create_session_chain(resume: dict, interview_style: str):
+    """为会话创建面试链，返回 (chain, None)，失败时返回 (None, (错误信息, 状态码))"""
+    # 加载配置和LLM（配置按文件修改时间缓存，LLM 客户端按服务商和模型复用）
+    config = load_config()
+    if config is None:
+        return None, ({
+            'error': 'Configuration error',
+            'message': '配置加载失败'
+        }, 500)
+    
+    llm = get_llm(config)
+    if llm is None:
+        return None, ({
+            'error': 'LLM initialization failed',
+            'message': '无法初始化语言模型，请检查API配置'
+        }, 500)
+    
+    # 创建面试链
+    try:
+        with timed_stage('chain_create'):
+            chain = create_interview_chain(
+                resume['chunks'], llm, config,
+                vectorstore=resume.get('vectorstore'),
+                interview_style=interview_style,
+                full_context=resume.get('full_context')
+            )
+    except Exception as e:
+        return None, ({
+            'error': 'Failed to create interview chain',
+            'message': f'初始化面试失败：{str(e)}'
+        }, 500)
+    
+    return chain, None
+
+
+def prepare_interview(data):
+    """校验参数并创建面试会话
+    
+    返回 (session_id, interview_style, None)，失败时返回 (None, None, (错误信息, 状态码))
+    """
+    if not data:
+        return None, None, ({
+            'error': 'No data provided',
+            'message': '请提供必要的参数'
+        }, 400)
+    
+    resume_id = data.get('resume_id')
+    interview_style = data.get('interview_style', 'critical')  # 获取面试官风格，默认为刁钻型
+    
+    if not resume_id:
+        return None, None, ({
+            'error': 'Missing resume_id',
+            'message': '请提供简历ID'
+        }, 400)
+    
+    # 验证面试官风格
+    valid_styles = ['critical', 'partner', 'guide']
+    if interview_style not in valid_styles:
+        interview_style = 'critical'
+    
+    # 检查简历是否存在，仍在处理中时最多等待 wait_seconds 秒（不超过 resume_wait_seconds）
+    max_wait_seconds = float(api_config['resume_wait_seconds'])
+    try:
+        wait_seconds = float(data.get('wait_seconds', max_wait_seconds))
+    except (TypeError, ValueError):
+        wait_seconds = None
+    if wait_seconds is None or not wait_seconds >= 0:
+        return None, None, ({
+            'error': 'Invalid wait_seconds',
+            'message': 'wait_seconds 必须是非负数'
+        }, 400)
+    wait_seconds = min(wait_seconds, max_wait_seconds)
+    resume = ResumeManager.wait_until_ready(resume_id, wait_seconds)
+    if resume is None:
+        return None, None, ({
+            'error': 'Resume not found',
+            'message': '简历不存在或已过期'
+        }, 404)
+    
+    if resume['status'] == 'failed':
+        return None, None, ({
+            'error': 'Resume processing failed',
+            'message': resume['error'] or '简历处理失败'
+        }, 422)
+    
+    if resume['status'] != 'ready':
+        return None, None, ({
+            'error': 'Resume not ready',
+            'message': '简历仍在处理中，请稍后再试',
+            'status': resume['status'],
+            'progress': resume['progress']
+        }, 409)
+    
+    ResumeManager.touch(resume_id)
+    
+    # 检查会话容量，必要时淘汰最久未使用的空闲会话（防止内存溢出）
+    if not SessionManager.ensure_capacity():
+        return None, None, ({
+            'error': 'Too many sessions',
+            'message': '服务器繁忙，请稍后再试'
+        }, 503)
+    
+    chain, error = create_session_chain(resume, interview_style)
+    if error:
+        return None, None, error
+    
+    # 创建会话
+    session_id = SessionManager.create_session(resume_id, chain, interview_style)
+    
+    return session_id, interview_style, None
+
+
+def prepare_message(data):
+    """校验发送消息的参数
+    
+    返回 (session_id, session, message, None)，失败时返回 (None, None, None, (错误信息, 状态码))
+    """
+    if not data:
+        return None, None, None, ({
+            'error': 'No data provided',
+            'message': '请提供必要的参数'
+        }, 400)
+    
+    session_id = data.get('session_id')
+    message = data.get('message')
+    
+    if not session_id:
+        return None, None, None, ({
+            'error': 'Missing session_id',
+            'message': '请提供会话ID'
+        }, 400)
+    
+    if not message or not message.strip():
+        return None, None, None, ({
+            'error': 'Missing message',
+            'message': '请提供消息内容'
+        }, 400)
+    
+    # 获取会话（不在内存中时从持久化存储恢复）
+    session = SessionManager.load_session(session_id)
+    if session is None:
+        return None, None, None, ({
+            'error': 'Session not found',
+            'message': '会话不存在或已过期'
+        }, 404)
+    
+    if session.get('chain') is None:
+        return None, None, None, ({
+            'error': 'Interview chain not found',
+            'message': '面试链不存在'
+        }, 500)
+    
+    return session_id, session, message, None
+
+
 @app.route('/api/interview/start', methods=['POST'])
 def start_interview():
     """开始面试接口"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'error': 'No data provided',
-                'message': '请提供必要的参数'
-            }), 400
-        
-        resume_id = data.get('resume_id')
-        interview_style = data.get('interview_style', 'critical')  # 获取面试官风格，默认为刁钻型
-        
-        if not resume_id:
-            return jsonify({
-                'error': 'Missing resume_id',
-                'message': '请提供简历ID'
-            }), 400
-        
-        # 验证面试官风格
-        valid_styles = ['critical', 'partner', 'guide']
-        if interview_style not in valid_styles:
-            interview_style = 'critical'
-        
-        # 检查简历是否存在
-        if resume_id not in resume_store:
-            return jsonify({
-                'error': 'Resume not found',
-                'message': '简历不存在或已过期'
-            }), 404
-        
-        # 检查并发限制（防止内存溢出）
-        if len(session_store) >= 10:
-            return jsonify({
-                'error': 'Too many sessions',
-                'message': '服务器繁忙，请稍后再试'
-            }), 503
-        
-        # 加载配置和LLM
-        config = load_config()
-        if config is None:
-            return jsonify({
-                'error': 'Configuration error',
-                'message': '配置加载失败'
-            }), 500
-        
-        # 临时设置面试官风格到配置中
-        config.set('DEFAULT', 'interview_style', interview_style)
+        session_id, interview_style, error = prepare_interview(request.get_json())
+        if error:
+            return jsonify(error[0]), error[1]
         
-        llm = get_llm(config)
-        if llm is None:
-            return jsonify({
-                'error': 'LLM initialization failed',
-                'message': '无法初始化语言模型，请检查API配置'
-            }), 500
-        
-        # 创建面试链
-        try:
-            chain = create_interview_chain(resume_store[resume_id]['chunks'], llm, config)
-        except Exception as e:
-            return jsonify({
-                'error': 'Failed to create interview chain',
-                'message': f'初始化面试失败：{str(e)}'
-            }), 500
-        
-        # 创建会话
-        session_id = SessionManager.create_session(resume_id, chain)
-        
-        # 保存面试官风格到会话中
-        session_store[session_id]['interview_style'] = interview_style
-        
-        # 生成面试官的第一个问题
-        try:
-            print(f"正在生成面试官的第一个问题（风格：{interview_style}）...")
-            first_response = chain.invoke({"question": "请开始面试"})
-            first_question = first_response.get('answer', '你好，我是今天的面试官。让我们开始吧，请先做个自我介绍。')
-            print(f"第一个问题已生成：{first_question[:50]}...")
-        except Exception as e:
-            print(f"生成第一个问题失败：{str(e)}")
-            first_question = '你好，我是今天的面试官。让我们开始吧，请先做个自我介绍。'
+        session = SessionManager.get_session(session_id)
         
-        # 风格名称映射
-        style_names = {
-            'critical': '刁钻型',
-            'partner': '伙伴型',
-            'guide': '引导型'
-        }
+        # 优先使用预生成的第一个问题
+        first_question = OpenerManager.take(session['resume_id'], interview_style)
+        cached = first_question is not None
+        if cached:
+            OpenerManager.apply(session, first_question)
+        else:
+            # 生成面试官的第一个问题
+            try:
+                print(f"正在生成面试官的第一个问题（风格：{interview_style}）...")
+                stats = {}
+                first_question = invoke_interview(session['chain'], FIRST_QUESTION_PROMPT, stats) or DEFAULT_FIRST_QUESTION
+                stats['answer'] = first_question
+                record_turn(session, stats)
+                print(f"第一个问题已生成：{first_question[:50]}...")
+            except Exception as e:
+                print(f"生成第一个问题失败：{str(e)}")
+                first_question = DEFAULT_FIRST_QUESTION
+        SessionManager.persist(session_id)
         
         return jsonify({
             'success': True,
-            'session_id': session_id,
             'message': first_question,
-            'interview_style': interview_style,
-            'style_name': style_names.get(interview_style, '刁钻型'),
-            'started_at': datetime.now().isoformat()
+            'opener_cached': cached,
+            **interview_started_payload(session_id, interview_style)
         }), 200
         
     except Exception as e:
@@ -324,63 +1805,73 @@ def start_interview():
         }), 500
 
 
-@app.route('/api/interview/message', methods=['POST'])
-def send_message():
-    """发送消息接口"""
+@app.route('/api/interview/start/stream', methods=['POST'])
+def start_interview_stream():
+    """开始面试接口（SSE 流式返回第一个问题）"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'error': 'No data provided',
-                'message': '请提供必要的参数'
-            }), 400
+        session_id, interview_style, error = prepare_interview(request.get_json())
+        if error:
+            return jsonify(error[0]), error[1]
+    except Exception as e:
+        return jsonify({
+            'error': 'Start interview failed',
+            'message': f'开始面试失败：{str(e)}'
+        }), 500
+    
+    session = SessionManager.get_session(session_id)
+    chain = session['chain']
+    
+    def generate():
+        yield sse_event('session', interview_started_payload(session_id, interview_style))
         
-        session_id = data.get('session_id')
-        message = data.get('message')
+        # 预生成的第一个问题直接整段返回
+        first_question = OpenerManager.take(session['resume_id'], interview_style)
+        if first_question is not None:
+            OpenerManager.apply(session, first_question)
+            SessionManager.persist(session_id)
+            yield sse_event('token', {'text': first_question})
+            yield sse_event('done', first_question_done_payload(session_id, {'answer': first_question}, cached=True))
+            return
         
-        if not session_id:
-            return jsonify({
-                'error': 'Missing session_id',
-                'message': '请提供会话ID'
-            }), 400
+        stats = {}
+        sent = False
+        try:
+            for text in stream_interview(chain, FIRST_QUESTION_PROMPT, stats):
+                sent = True
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            print(f"生成第一个问题失败：{str(e)}")
+            if not sent:
+                yield sse_event('token', {'text': DEFAULT_FIRST_QUESTION})
+                stats['answer'] = DEFAULT_FIRST_QUESTION
         
-        if not message or not message.strip():
-            return jsonify({
-                'error': 'Missing message',
-                'message': '请提供消息内容'
-            }), 400
+        if 'llm_calls' in stats:
+            record_turn(session, stats)
+        SessionManager.persist(session_id)
         
-        # 获取会话
-        session = SessionManager.get_session(session_id)
-        if session is None:
-            return jsonify({
-                'error': 'Session not found',
-                'message': '会话不存在或已过期'
-            }), 404
+        print(f"第一个问题已生成（首字延迟 {stats.get('ttft_seconds', 0):.2f}s）")
+        yield sse_event('done', first_question_done_payload(session_id, stats))
+    
+    return sse_response(generate())
+
+
+@app.route('/api/interview/message', methods=['POST'])
+def send_message():
+    """发送消息接口"""
+    try:
+        session_id, session, message, error = prepare_message(request.get_json())
+        if error:
+            return jsonify(error[0]), error[1]
         
         # 调用面试链获取回答
-        chain = session.get('chain')
-        if chain is None:
-            return jsonify({
-                'error': 'Interview chain not found',
-                'message': '面试链不存在'
-            }), 500
+        chain = session['chain']
         
         try:
-            response = chain.invoke({"question": message})
-            answer = response.get('answer', '抱歉，我没有收到回答。')
+            stats = {}
+            stats['answer'] = invoke_interview(chain, message, stats) or EMPTY_REPLY
             
-            # 更新消息计数
-            session['message_count'] += 1
-            
-            return jsonify({
-                'success': True,
-                'response': answer,
-                'session_id': session_id,
-                'message_count': session['message_count'],
-                'timestamp': datetime.now().isoformat()
-            }), 200
+            # 更新消息计数并记录本轮统计
+            return jsonify(message_reply_payload(session_id, session, stats)), 200
             
         except Exception as e:
             return jsonify({
@@ -395,40 +1886,79 @@ def send_message():
         }), 500
 
 
+@app.route('/api/interview/message/stream', methods=['POST'])
+def send_message_stream():
+    """发送消息接口（SSE 流式返回回答）"""
+    try:
+        session_id, session, message, error = prepare_message(request.get_json())
+        if error:
+            return jsonify(error[0]), error[1]
+    except Exception as e:
+        return jsonify({
+            'error': 'Send message failed',
+            'message': f'发送消息失败：{str(e)}'
+        }), 500
+    
+    chain = session['chain']
+    
+    def generate():
+        stats = {}
+        try:
+            for text in stream_interview(chain, message, stats):
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            yield sse_event('error', {
+                'error': 'Failed to get response',
+                'message': f'获取回答失败：{str(e)}'
+            })
+            return
+        
+        # 更新消息计数并记录本轮统计
+        payload = message_reply_payload(session_id, session, stats)
+        payload.pop('success')
+        yield sse_event('done', payload)
+    
+    return sse_response(generate())
+
+
+def end_interview_payload(data):
+    """结束面试会话，返回 (响应数据, 状态码)"""
+    if not data:
+        return {
+            'error': 'No data provided',
+            'message': '请提供必要的参数'
+        }, 400
+    
+    session_id = data.get('session_id')
+    
+    if not session_id:
+        return {
+            'error': 'Missing session_id',
+            'message': '请提供会话ID'
+        }, 400
+    
+    # 结束会话
+    if SessionManager.end_session(session_id):
+        return {
+            'success': True,
+            'message': '面试已结束，感谢您的参与！',
+            'session_id': session_id,
+            'ended_at': datetime.now().isoformat()
+        }, 200
+    
+    return {
+        'success': False,
+        'error': 'Session not found',
+        'message': '会话不存在或已过期'
+    }, 404
+
+
 @app.route('/api/interview/end', methods=['POST'])
 def end_interview():
     """结束面试接口"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'error': 'No data provided',
-                'message': '请提供必要的参数'
-            }), 400
-        
-        session_id = data.get('session_id')
-        
-        if not session_id:
-            return jsonify({
-                'error': 'Missing session_id',
-                'message': '请提供会话ID'
-            }), 400
-        
-        # 结束会话
-        if SessionManager.end_session(session_id):
-            return jsonify({
-                'success': True,
-                'message': '面试已结束，感谢您的参与！',
-                'session_id': session_id,
-                'ended_at': datetime.now().isoformat()
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Session not found',
-                'message': '会话不存在或已过期'
-            }), 404
+        payload, status = end_interview_payload(request.get_json())
+        return jsonify(payload), status
             
     except Exception as e:
         return jsonify({
@@ -467,14 +1997,32 @@ def internal_error(error):
     }), 500
 
 
+def prepare_server(load_api: bool = True):
+    """启动前的准备工作（线程模式和异步模式共用）：读取配置、启动后台清理线程和预热
+    
+    load_api 为 False 时使用已读取的 [api] 配置（异步模式在创建应用时已读取）
+    """
+    # 加载配置
+    if load_api:
+        load_api_config()
+    print(f"\n模块导入耗时 {StartupManager.import_seconds:.2f}s")
+    
+    # 清理遗留临时文件，启动后台清理线程（过期会话、过期简历）
+    ResumeManager.purge_orphan_temp_files()
+    start_reaper()
+    
+    # 导入重量级依赖、预热 Embedding 模型，避免第一个面试请求承担加载耗时；
+    # 默认在后台进行，服务器无需等待即可开始监听端口
+    StartupManager.start_warmup(background=api_config['background_warmup'])
+
+
 def run_api_server():
     """启动 API 服务器"""
     print("\n" + "=" * 60)
     print("   ResumeRoaster API Server")
     print("=" * 60)
     
-    # 加载配置
-    load_api_config()
+    prepare_server()
     
     # 启动服务器
     print(f"\nAPI 服务器启动中...")
@@ -490,5 +2038,9 @@ def run_api_server():
     )
 
 
+# 模块导入耗时（含 main、Flask 等依赖和本模块的初始化）
+StartupManager.import_seconds = round(time.perf_counter() - _import_started, 3)
+
+
 if __name__ == '__main__':
     run_api_server()
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+ResumeRoaster API Server（异步模式）
+与 api_server.py 提供相同的 /api/* 接口，基于 Starlette + uvicorn 事件循环运行：
+等待 LLM 生成期间不占用线程，少量线程即可承载大量并发会话。
+简历解析、建索引、创建面试链等 CPU 密集或阻塞操作仍交给线程池执行。
+"""
+
+import sys
+import time
+import contextlib
+from datetime import datetime
+from http import HTTPStatus
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import api_server
+from api_server import (
+    api_config, SessionManager, OpenerManager, DEFAULT_FIRST_QUESTION, EMPTY_REPLY,
+    health_payload, stats_payload, accept_resume_upload,
+    resume_status_payload, delete_resume_payload, end_interview_payload,
+    interview_started_payload, first_question_done_payload, message_reply_payload,
+    prepare_interview, prepare_message, record_turn, sse_event,
+    prepare_server, stop_reaper
+)
+from main import ainvoke_interview, astream_interview, FIRST_QUESTION_PROMPT
+from metrics import observe_request, render_metrics
+
+
+async def read_json(request: Request):
+    """读取 JSON 请求体，格式错误时返回 None（与 Flask 的 get_json 行为一致）"""
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+def sse_response(generator) -> StreamingResponse:
+    """构造 SSE 流式响应"""
+    return StreamingResponse(
+        generator,
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # 禁止反向代理缓冲
+        }
+    )
+
+
+async def health_check(request: Request):
+    """健康检查接口"""
+    # 健康检查、统计和指标会查询 SQLite（会话、向量缓存、PDF 缓存），放到线程池中执行，避免阻塞事件循环
+    return JSONResponse(await run_in_threadpool(health_payload))
+
+
+async def get_stats(request: Request):
+    """运行统计接口"""
+    payload = await run_in_threadpool(stats_payload)
+    payload['server_mode'] = 'async'
+    return JSONResponse(payload)
+
+
+async def readiness_check(request: Request):
+    """就绪检查接口（未就绪时返回 503，供负载均衡使用）"""
+    payload = await run_in_threadpool(health_payload)
+    return JSONResponse(payload, status_code=200 if payload['ready'] else 503)
+
+
+async def metrics(request: Request):
+    """Prometheus 格式指标接口"""
+    body = await run_in_threadpool(render_metrics)
+    return PlainTextResponse(body, media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def upload_resume(request: Request):
+    """上传简历接口"""
+    try:
+        form = await request.form()
+        file = form.get('file')
+        if file is None or not hasattr(file, 'read'):
+            return JSONResponse({
+                'error': 'No file provided',
+                'message': '请提供简历文件'
+            }, status_code=400)
+        
+        content = await file.read()
+        payload, status = await run_in_threadpool(accept_resume_upload, file.filename or '', content)
+        return JSONResponse(payload, status_code=status)
+    
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Upload failed',
+            'message': f'上传失败：{str(e)}'
+        }, status_code=500)
+
+
+async def resume_status(request: Request):
+    """简历处理状态接口"""
+    payload, status = await run_in_threadpool(resume_status_payload, request.path_params['resume_id'])
+    return JSONResponse(payload, status_code=status)
+
+
+async def delete_resume(request: Request):
+    """删除简历接口"""
+    try:
+        payload, status = await run_in_threadpool(delete_resume_payload, request.path_params['resume_id'])
+        return JSONResponse(payload, status_code=status)
+    
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Delete resume failed',
+            'message': f'删除简历失败：{str(e)}'
+        }, status_code=500)
+
+
+async def start_interview(request: Request):
+    """开始面试接口"""
+    try:
+        # 等待简历就绪、创建面试链会阻塞，放到线程池中执行
+        session_id, interview_style, error = await run_in_threadpool(
+            prepare_interview, await read_json(request)
+        )
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+        
+        session = SessionManager.get_session(session_id)
+        
+        # 优先使用预生成的第一个问题（可能需要等待正在进行的预生成）
+        first_question = await run_in_threadpool(OpenerManager.take, session['resume_id'], interview_style)
+        cached = first_question is not None
+        if cached:
+            await run_in_threadpool(OpenerManager.apply, session, first_question)
+        else:
+            # 生成面试官的第一个问题
+            try:
+                print(f"正在生成面试官的第一个问题（风格：{interview_style}）...")
+                stats = {}
+                first_question = await ainvoke_interview(session['chain'], FIRST_QUESTION_PROMPT, stats) or DEFAULT_FIRST_QUESTION
+                stats['answer'] = first_question
+                await run_in_threadpool(record_turn, session, stats)
+                print(f"第一个问题已生成：{first_question[:50]}...")
+            except Exception as e:
+                print(f"生成第一个问题失败：{str(e)}")
+                first_question = DEFAULT_FIRST_QUESTION
+        # 保存会话会写 SQLite，放到线程池中执行，避免阻塞事件循环
+        await run_in_threadpool(SessionManager.persist, session_id)
+        
+        return JSONResponse({
+            'success': True,
+            'message': first_question,
+            'opener_cached': cached,
+            **interview_started_payload(session_id, interview_style)
+        })
+    
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Start interview failed',
+            'message': f'开始面试失败：{str(e)}'
+        }, status_code=500)
+
+
+async def start_interview_stream(request: Request):
+    """开始面试接口（SSE 流式返回第一个问题）"""
+    try:
+        session_id, interview_style, error = await run_in_threadpool(
+            prepare_interview, await read_json(request)
+        )
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Start interview failed',
+            'message': f'开始面试失败：{str(e)}'
+        }, status_code=500)
+    
+    session = SessionManager.get_session(session_id)
+    chain = session['chain']
+    
+    async def generate():
+        yield sse_event('session', interview_started_payload(session_id, interview_style))
+        
+        # 预生成的第一个问题直接整段返回
+        first_question = await run_in_threadpool(OpenerManager.take, session['resume_id'], interview_style)
+        if first_question is not None:
+            await run_in_threadpool(OpenerManager.apply, session, first_question)
+            await run_in_threadpool(SessionManager.persist, session_id)
+            yield sse_event('token', {'text': first_question})
+            yield sse_event('done', first_question_done_payload(session_id, {'answer': first_question}, cached=True))
+            return
+        
+        stats = {}
+        sent = False
+        try:
+            async for text in astream_interview(chain, FIRST_QUESTION_PROMPT, stats):
+                sent = True
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            print(f"生成第一个问题失败：{str(e)}")
+            if not sent:
+                yield sse_event('token', {'text': DEFAULT_FIRST_QUESTION})
+                stats['answer'] = DEFAULT_FIRST_QUESTION
+        
+        if 'llm_calls' in stats:
+            await run_in_threadpool(record_turn, session, stats)
+        await run_in_threadpool(SessionManager.persist, session_id)
+        
+        print(f"第一个问题已生成（首字延迟 {stats.get('ttft_seconds', 0):.2f}s）")
+        yield sse_event('done', first_question_done_payload(session_id, stats))
+    
+    return sse_response(generate())
+
+
+async def send_message(request: Request):
+    """发送消息接口"""
+    try:
+        # 会话可能需要从持久化存储恢复并重建面试链，放到线程池中执行
+        session_id, session, message, error = await run_in_threadpool(prepare_message, await read_json(request))
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+        
+        # 调用面试链获取回答
+        chain = session['chain']
+        
+        try:
+            stats = {}
+            stats['answer'] = await ainvoke_interview(chain, message, stats) or EMPTY_REPLY
+            
+            # 更新消息计数、记录本轮统计并保存会话（写 SQLite，放到线程池中执行）
+            return JSONResponse(await run_in_threadpool(message_reply_payload, session_id, session, stats))
+        
+        except Exception as e:
+            return JSONResponse({
+                'error': 'Failed to get response',
+                'message': f'获取回答失败：{str(e)}'
+            }, status_code=500)
+    
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Send message failed',
+            'message': f'发送消息失败：{str(e)}'
+        }, status_code=500)
+
+
+async def send_message_stream(request: Request):
+    """发送消息接口（SSE 流式返回回答）"""
+    try:
+        # 会话可能需要从持久化存储恢复并重建面试链，放到线程池中执行
+        session_id, session, message, error = await run_in_threadpool(prepare_message, await read_json(request))
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Send message failed',
+            'message': f'发送消息失败：{str(e)}'
+        }, status_code=500)
+    
+    chain = session['chain']
+    
+    async def generate():
+        stats = {}
+        try:
+            async for text in astream_interview(chain, message, stats):
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            yield sse_event('error', {
+                'error': 'Failed to get response',
+                'message': f'获取回答失败：{str(e)}'
+            })
+            return
+        
+        # 更新消息计数、记录本轮统计并保存会话（写 SQLite，放到线程池中执行）
+        payload = await run_in_threadpool(message_reply_payload, session_id, session, stats)
+        payload.pop('success')
+        yield sse_event('done', payload)
+    
+    return sse_response(generate())
+
+
+async def end_interview(request: Request):
+    """结束面试接口"""
+    try:
+        payload, status = await run_in_threadpool(end_interview_payload, await read_json(request))
+        return JSONResponse(payload, status_code=status)
+    
+    except Exception as e:
+        return JSONResponse({
+            'error': 'End interview failed',
+            'message': f'结束面试失败：{str(e)}'
+        }, status_code=500)
+
+
+async def http_error(request: Request, exc: HTTPException):
+    """处理 HTTP 错误，响应格式与 Flask 版本一致"""
+    if exc.status_code == 404:
+        message = '请求的资源不存在'
+    else:
+        message = exc.detail
+    return JSONResponse({
+        'error': HTTPStatus(exc.status_code).phrase,
+        'message': message,
+        'timestamp': datetime.now().isoformat()
+    }, status_code=exc.status_code)
+
+
+async def internal_error(request: Request, exc: Exception):
+    """处理 500 错误"""
+    return JSONResponse({
+        'error': 'Internal Server Error',
+        'message': str(exc),
+        'timestamp': datetime.now().isoformat()
+    }, status_code=500)
+
+
+routes = [
+    Route('/api/health', health_check, methods=['GET']),
+    Route('/api/stats', get_stats, methods=['GET']),
+    Route('/api/ready', readiness_check, methods=['GET']),
+    Route('/api/metrics', metrics, methods=['GET']),
+    Route('/api/upload-resume', upload_resume, methods=['POST']),
+    Route('/api/resume/{resume_id}/status', resume_status, methods=['GET']),
+    Route('/api/resume/{resume_id}', delete_resume, methods=['DELETE']),
+    Route('/api/interview/start', start_interview, methods=['POST']),
+    Route('/api/interview/start/stream', start_interview_stream, methods=['POST']),
+    Route('/api/interview/message', send_message, methods=['POST']),
+    Route('/api/interview/message/stream', send_message_stream, methods=['POST']),
+    Route('/api/interview/end', end_interview, methods=['POST']),
+]
+
+
+class RequestMetricsMiddleware:
+    """按路由模板记录请求耗时（流式响应统计到发送结束）"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = {'code': 500}
+        
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            endpoint = route.path if route is not None else 'unmatched'
+            observe_request(scope['method'], endpoint, status['code'], time.perf_counter() - start)
+
+
+def create_app(prepare: bool = True) -> Starlette:
+    """创建异步模式的应用
+
+    prepare 为 True 时读取 [api] 配置，并在启动阶段执行与线程模式相同的准备工作（预热模型、启动清理线程）；
+    为 False 时使用已读取的配置（多进程模式的工作进程继承主进程的配置）
+    """
+    # CORS 中间件需要在创建应用时确定，先读取 [api] 配置（只读取一次，启动阶段不再重复读取）
+    if prepare:
+        api_server.load_api_config()
+    
+    middleware = [Middleware(RequestMetricsMiddleware)]
+    if api_config['cors_enabled']:
+        middleware.append(Middleware(
+            CORSMiddleware,
+            allow_origins=[origin.strip() for origin in api_config['cors_origins'].split(',')],
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization", "X-Session-ID"]
+        ))
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if prepare:
+            await run_in_threadpool(prepare_server, load_api=False)
+        yield
+        stop_reaper()
+    
+    return Starlette(
+        routes=routes,
+        middleware=middleware,
+        exception_handlers={HTTPException: http_error, 500: internal_error},
+        lifespan=lifespan
+    )
+
+
+def run_async_server():
+    """启动异步模式 API 服务器"""
+    import uvicorn
+    
+    print("\n" + "=" * 60)
+    print("   ResumeRoaster API Server (async)")
+    print("=" * 60)
+    
+    app = create_app()
+    
+    print(f"\nAPI 服务器启动中（异步模式）...")
+    print(f"监听端口：{api_config['port']}")
+    print(f"健康检查：http://localhost:{api_config['port']}/api/health")
+    print("\n按 Ctrl+C 停止服务器\n")
+    
+    uvicorn.run(app, host='0.0.0.0', port=int(api_config['port']), log_level='warning')
+
+
+if __name__ == '__main__':
+    run_async_server()
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+批量简历筛选
+对一个目录（或通配符匹配）下的所有简历 PDF 批量生成面试官的第一个问题，结果逐行写入 JSONL：
+- 简历解析和切分在进程池中并行执行
+- 需要向量检索的简历攒够一批后统一计算 Embedding（写入向量缓存，建索引时直接命中）
+- LLM 调用并发数有上限，失败时按指数退避重试
+- 每条结果写入后立即落盘；中断后重新运行同一命令时跳过已成功的（简历内容, 风格），只处理剩余部分
+
+用法：
+    python batch_screen.py resumes/ -o results.jsonl
+    python batch_screen.py "resumes/**/*.pdf" -o results.jsonl --styles critical,guide --concurrency 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from embeddings import get_embeddings
+from main import (
+    FIRST_QUESTION_PROMPT, load_config, get_llm, parse_resume, split_resume,
+    build_resume_index, drop_resume_index, create_interview_chain, invoke_interview
+)
+from metrics import get_stage_stats
+from pdf_extract import hash_file
+from resume_context import build_full_context
+
+
+def collect_pdfs(inputs: List[str]) -> List[Path]:
+    """展开输入的目录和通配符，返回去重排序后的 PDF 路径"""
+    paths = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(p for p in path.rglob('*') if p.suffix.lower() == '.pdf')
+        elif path.is_file():
+            paths.append(path)
+        else:
+            paths.extend(Path(p) for p in glob.glob(item, recursive=True))
+    
+    return sorted({p.resolve() for p in paths if p.is_file() and p.suffix.lower() == '.pdf'})
+
+
+def load_resume_chunks(path: str):
+    """在子进程中解析并切分简历，返回 (文本块列表, 错误信息)"""
+    try:
+        # 已经按文件在多个进程中并行，不再按页拆分
+        documents = parse_resume(Path(path), parallel=False)
+        if not documents:
+            return None, '无法读取简历内容'
+        chunks = split_resume(documents)
+        if not chunks:
+            return None, '简历中没有可识别的文本'
+        return chunks, None
+    except Exception as e:
+        return None, str(e)
+
+
+class ResultWriter:
+    """JSONL 结果文件（线程安全，每条结果写入后立即落盘）"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        
+        # 上次中断时最后一行可能只写了一半，先补上换行，避免和新结果粘在一起
+        needs_newline = False
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            self._file.write('\n')
+    
+    def load_done(self) -> Set[Tuple[str, str]]:
+        """读取已成功的 (简历哈希, 风格)"""
+        done = set()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('status') == 'ok':
+                    done.add((record.get('content_hash'), record.get('style')))
+        return done
+    
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        self._file.close()
+
+
+class BatchScreener:
+    """批量生成第一个问题"""
+    
+    def __init__(self, config, llm, writer: ResultWriter, concurrency: int,
+                 max_retries: int, retry_backoff: float, embed_batch_size: int):
+        self.config = config
+        self.llm = llm
+        self.writer = writer
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.embed_batch_size = embed_batch_size
+        
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='screen')
+        self.futures = []
+        # 等待批量计算 Embedding 的简历
+        self.pending_index: List[dict] = []
+        
+        self._lock = threading.Lock()
+        self.total_jobs = 0
+        self.finished_jobs = 0
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.embedded_chunks = 0
+    
+    def add_resume(self, resume: dict):
+        """简历解析完成：短简历直接提交，需要检索的简历攒批计算 Embedding"""
+        resume['full_context'] = build_full_context(resume['chunks'], self.config)
+        if resume['full_context'] is not None:
+            self._submit(resume)
+            return
+        
+        self.pending_index.append(resume)
+        if sum(len(item['chunks']) for item in self.pending_index) >= self.embed_batch_size:
+            self.flush_index()
+    
+    def flush_index(self):
+        """为攒批的简历一次性计算 Embedding，再逐份构建索引（直接命中向量缓存）并提交"""
+        if not self.pending_index:
+            return
+        resumes, self.pending_index = self.pending_index, []
+        
+        texts = [chunk.page_content for resume in resumes for chunk in resume['chunks']]
+        try:
+            embeddings = get_embeddings(self.config)
+            for start in range(0, len(texts), self.embed_batch_size):
+                embeddings.embed_documents(texts[start:start + self.embed_batch_size])
+        except Exception as e:
+            # 这一批的简历记为失败，继续处理其余简历
+            for resume in resumes:
+                for style in resume['styles']:
+                    self.record_failure(resume, style, f"计算 Embedding 失败：{e}")
+            return
+        self.embedded_chunks += len(texts)
+        
+        for resume in resumes:
+            try:
+                resume['vectorstore'] = build_resume_index(
+                    resume['chunks'], self.config, collection_name=f"batch_{resume['content_hash'][:32]}"
+                )
+            except Exception as e:
+                for style in resume['styles']:
+                    self.record_failure(resume, style, f"构建索引失败：{e}")
+                continue
+            self._submit(resume)
+    
+    def _submit(self, resume: dict):
+        self.futures.append(self.executor.submit(self._screen, resume))
+    
+    def _screen(self, resume: dict):
+        """为一份简历依次生成各风格的第一个问题"""
+        try:
+            for style in resume['styles']:
+                self._screen_style(resume, style)
+        finally:
+            drop_resume_index(resume.pop('vectorstore', None))
+    
+    def _screen_style(self, resume: dict, style: str):
+        start = time.perf_counter()
+        last_error = None
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # 指数退避，加随机抖动避免并发任务同时重试
+                delay = self.retry_backoff * (2 ** (attempt - 1)) * (1 + random.random())
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+            
+            try:
+                chain = create_interview_chain(
+                    resume['chunks'], self.llm, self.config,
+                    vectorstore=resume.get('vectorstore'),
+                    interview_style=style,
+                    full_context=resume['full_context'],
+                    verbose=False
+                )
+                stats = {}
+                question = invoke_interview(chain, FIRST_QUESTION_PROMPT, stats)
+                if not question:
+                    raise RuntimeError('LLM 返回为空')
+            except Exception as e:
+                last_error = str(e)
+                continue
+            
+            with self._lock:
+                self.llm_calls += stats.get('llm_calls', 1)
+                self.prompt_tokens += stats.get('prompt_tokens', 0)
+            self.record(resume, style, {
+                'status': 'ok',
+                'question': question,
+                'context_mode': stats.get('context_mode'),
+                'llm_calls': stats.get('llm_calls', 1),
+                'prompt_tokens': stats.get('prompt_tokens', 0),
+                'attempts': attempt + 1,
+                'seconds': round(time.perf_counter() - start, 3)
+            })
+            return
+        
+        self.record_failure(resume, style, last_error, attempts=self.max_retries + 1,
+                            seconds=time.perf_counter() - start)
+    
+    def record_failure(self, resume: dict, style: Optional[str], error: str,
+                       attempts: int = 0, seconds: float = 0.0):
+        self.record(resume, style, {
+            'status': 'failed',
+            'error': error,
+            'attempts': attempts,
+            'seconds': round(seconds, 3)
+        })
+    
+    def record(self, resume: dict, style: Optional[str], result: dict):
+        """写入一条结果并打印进度"""
+        record = {
+            'file': resume['file'],
+            'content_hash': resume['content_hash'],
+            'style': style,
+            'chunk_count': len(resume.get('chunks') or []),
+            **result,
+            'finished_at': datetime.now().isoformat()
+        }
+        self.writer.write(record)
+        
+        with self._lock:
+            self.finished_jobs += 1
+            if result['status'] == 'ok':
+                self.ok += 1
+            else:
+                self.failed += 1
+            progress = f"[{self.finished_jobs}/{self.total_jobs}]"
+        
+        name = Path(resume['file']).name
+        if result['status'] == 'ok':
+            print(f"{progress} {name}（{style}）完成，耗时 {result['seconds']:.2f}s")
+        else:
+            print(f"{progress} {name}（{style or '-'}）失败：{result['error']}")
+    
+    def wait(self):
+        """等待所有已提交的任务完成"""
+        for future in as_completed(self.futures):
+            future.result()
+        self.executor.shutdown()
+
+
+def run_batch(inputs: List[str], output: Path, styles: List[str], parse_workers: int, concurrency: int,
+              max_retries: int, retry_backoff: float, embed_batch_size: int) -> Optional[dict]:
+    """批量处理简历，返回汇总统计"""
+    config = load_config()
+    if config is None:
+        return None
+    
+    pdfs = collect_pdfs(inputs)
+    if not pdfs:
+        print("没有找到 PDF 简历")
+        return None
+    
+    writer = ResultWriter(output)
+    done = writer.load_done()
+    
+    # 按内容去重，并跳过上次已完成的（简历, 风格）
+    resumes: Dict[str, dict] = {}
+    seen: Set[str] = set()
+    duplicates = 0
+    skipped = 0
+    for path in pdfs:
+        content_hash = hash_file(path)
+        if content_hash in seen:
+            duplicates += 1
+            continue
+        seen.add(content_hash)
+        remaining = [style for style in styles if (content_hash, style) not in done]
+        skipped += len(styles) - len(remaining)
+        if remaining:
+            resumes[content_hash] = {'file': str(path), 'content_hash': content_hash, 'styles': remaining}
+    
+    total_jobs = sum(len(resume['styles']) for resume in resumes.values())
+    print(f"共找到 {len(pdfs)} 份简历（重复 {duplicates} 份），{skipped} 项已完成，待处理 {total_jobs} 项")
+    if not resumes:
+        writer.close()
+        return {'pdfs': len(pdfs), 'ok': 0, 'failed': 0, 'skipped': skipped}
+    
+    llm = get_llm(config)
+    if llm is None:
+        writer.close()
+        return None
+    
+    screener = BatchScreener(config, llm, writer, concurrency, max_retries, retry_backoff, embed_batch_size)
+    screener.total_jobs = total_jobs
+    
+    start = time.perf_counter()
+    # 先提交全部解析任务，子进程在启动任何 LLM 线程之前创建
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        parse_futures = {
+            pool.submit(load_resume_chunks, resume['file']): resume
+            for resume in resumes.values()
+        }
+        for future in as_completed(parse_futures):
+            resume = parse_futures[future]
+            chunks, error = future.result()
+            if chunks is None:
+                for style in resume['styles']:
+                    screener.record_failure(resume, style, f"解析失败：{error}")
+                continue
+            resume['chunks'] = chunks
+            screener.add_resume(resume)
+    parse_seconds = time.perf_counter() - start
+    
+    screener.flush_index()
+    screener.wait()
+    writer.close()
+    
+    elapsed = time.perf_counter() - start
+    return {
+        'pdfs': len(pdfs),
+        'resumes': len(resumes),
+        'jobs': total_jobs,
+        'ok': screener.ok,
+        'failed': screener.failed,
+        'skipped': skipped,
+        'retries': screener.retries,
+        'llm_calls': screener.llm_calls,
+        'prompt_tokens': screener.prompt_tokens,
+        'embedded_chunks': screener.embedded_chunks,
+        'parse_seconds': round(parse_seconds, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        'resumes_per_minute': round(len(resumes) / elapsed * 60, 2) if elapsed else 0.0,
+        'jobs_per_second': round(total_jobs / elapsed, 3) if elapsed else 0.0
+    }
+
+
+def print_summary(summary: dict):
+    """打印吞吐量和各阶段耗时"""
+    print("\n" + "=" * 60)
+    print("   批量筛选完成")
+    print("=" * 60)
+    if 'jobs' not in summary:
+        print(f"全部 {summary['skipped']} 项已完成，无需处理")
+        return
+    
+    print(f"简历：{summary['resumes']} 份，任务：{summary['jobs']} 项（成功 {summary['ok']}，失败 {summary['failed']}，"
+          f"跳过已完成 {summary['skipped']}）")
+    print(f"总耗时：{summary['elapsed_seconds']:.2f}s（解析 {summary['parse_seconds']:.2f}s）")
+    print(f"吞吐量：{summary['resumes_per_minute']} 份简历/分钟，{summary['jobs_per_second']} 项/秒")
+    print(f"LLM 调用：{summary['llm_calls']} 次（重试 {summary['retries']} 次），"
+          f"提示词共 {summary['prompt_tokens']} Token；批量向量化的文本块（含缓存命中）：{summary['embedded_chunks']}")
+    
+    stages = get_stage_stats()
+    if stages:
+        print("\n阶段耗时（主进程）：")
+        for stage, stats in sorted(stages.items()):
+            print(f"  {stage:<20} {stats['count']:>6} 次  平均 {stats['mean_ms']:>9.2f}ms")
+
+
+def main():
+    # 先解析参数（--help 不需要配置文件），未指定的参数再从配置中读取
+    parser = argparse.ArgumentParser(description="批量简历筛选：为每份简历生成面试官的第一个问题")
+    parser.add_argument('inputs', nargs='+', help="简历目录、PDF 文件或通配符（如 \"resumes/**/*.pdf\"）")
+    parser.add_argument('-o', '--output', type=Path, default=Path('batch_results.jsonl'),
+                        help="结果文件（JSONL，已存在时跳过其中已成功的项）")
+    parser.add_argument('--styles', help="面试官风格，逗号分隔（默认使用配置中的风格）")
+    parser.add_argument('--parse-workers', type=int,
+                        help="解析简历的进程数（默认 [batch] parse_workers，0 表示 CPU 核数）")
+    parser.add_argument('--concurrency', type=int,
+                        help="同时进行的 LLM 调用数上限（默认 [batch] concurrency，未配置时 8）")
+    parser.add_argument('--max-retries', type=int,
+                        help="LLM 调用失败时的最大重试次数（默认 [batch] max_retries，未配置时 3）")
+    parser.add_argument('--retry-backoff', type=float,
+                        help="首次重试的等待秒数，之后每次翻倍（默认 [batch] retry_backoff_seconds，未配置时 2）")
+    parser.add_argument('--embed-batch-size', type=int,
+                        help="每批计算 Embedding 的文本块数（默认 [batch] embed_batch_size，未配置时 256）")
+    args = parser.parse_args()
+    
+    config = load_config()
+    if config is None:
+        return 1
+    
+    if args.styles is None:
+        args.styles = config.get('DEFAULT', 'interview_style', fallback='critical')
+    if args.parse_workers is None:
+        args.parse_workers = config.getint('batch', 'parse_workers', fallback=0)
+    if args.concurrency is None:
+        args.concurrency = config.getint('batch', 'concurrency', fallback=8)
+    if args.max_retries is None:
+        args.max_retries = config.getint('batch', 'max_retries', fallback=3)
+    if args.retry_backoff is None:
+        args.retry_backoff = config.getfloat('batch', 'retry_backoff_seconds', fallback=2.0)
+    if args.embed_batch_size is None:
+        args.embed_batch_size = config.getint('batch', 'embed_batch_size', fallback=256)
+    
+    styles = [style.strip() for style in args.styles.split(',') if style.strip()]
+    summary = run_batch(
+        args.inputs, args.output, styles,
+        parse_workers=args.parse_workers or os.cpu_count() or 1,
+        concurrency=max(args.concurrency, 1),
+        max_retries=max(args.max_retries, 0),
+        retry_backoff=args.retry_backoff,
+        embed_batch_size=max(args.embed_batch_size, 1)
+    )
+    if summary is None:
+        return 1
+    
+    print_summary(summary)
+    print(f"\n结果已写入：{args.output}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
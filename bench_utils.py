@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+压测公共工具
+生成示例简历 PDF、生成指向模拟 LLM 服务的配置、启动/停止子进程、采样进程资源和计算百分位数，
+供 load_compare.py 和 benchmark.py 共用。
+"""
+
+import asyncio
+import configparser
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+
+PROJECT_DIR = Path(__file__).parent
+
+SERVER_SCRIPTS = {
+    'threaded': 'api_server.py',
+    'async': 'asgi_server.py',
+    'prefork': 'prefork_server.py',
+}
+
+SAMPLE_RESUME_LINES = [
+    "Zhang San - Backend Engineer",
+    "Email: zhangsan@example.com",
+    "Experience:",
+    "2021-2024 Example Tech, Senior Backend Engineer",
+    "- Built an order service with Go and Redis serving 20k QPS",
+    "- Designed a Kafka based event pipeline for payment reconciliation",
+    "- Reduced p99 latency from 800ms to 120ms with connection pooling and caching",
+    "2019-2021 Sample Corp, Backend Engineer",
+    "- Migrated a monolith to microservices on Kubernetes",
+    "- Implemented MySQL sharding and read replicas",
+    "Skills: Go, Python, Redis, Kafka, MySQL, Kubernetes, Prometheus",
+    "Education: B.S. Computer Science, Example University, 2019",
+]
+
+
+def make_resume_pdf(path: Path, lines: List[str] = SAMPLE_RESUME_LINES, variant: int = 0, pages: int = 1):
+    """生成一份可被 PyPDFLoader 提取文本的简单英文简历 PDF
+
+    variant 不为 0 时在末尾追加一行编号，使每份简历的内容哈希不同（绕过上传去重）；
+    pages 大于 1 时每页重复同样的内容并标注页码（用于解析吞吐测试）
+    """
+    if variant:
+        lines = [*lines, f"Candidate No. {variant}"]
+    
+    streams = []
+    for page in range(pages):
+        page_lines = [*lines, f"Page {page + 1} of {pages}"] if pages > 1 else lines
+        text_ops = ["BT", "/F1 11 Tf", "14 TL", "50 780 Td"]
+        for line in page_lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            text_ops.append(f"({escaped}) Tj T*")
+        text_ops.append("ET")
+        streams.append("\n".join(text_ops).encode('latin-1'))
+    
+    # 对象编号：1 目录，2 页面树，3 字体，之后每页一个页面对象和一个内容流
+    kids = " ".join(f"{4 + 2 * page} 0 R" for page in range(pages))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page, stream in enumerate(streams):
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents " + str(5 + 2 * page).encode() + b" 0 R >>"
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n".encode()
+    output += b"0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    
+    Path(path).write_bytes(bytes(output))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def write_bench_config(path: Path, llm_url: str, port: int, max_sessions: int,
+                       cache_path: Path, overrides: Optional[Dict[str, Dict[str, str]]] = None):
+    """以 config.ini.template 为基础生成压测配置：LLM 和 Embedding 都指向模拟服务"""
+    config = configparser.ConfigParser()
+    config.read(PROJECT_DIR / "config.ini.template", encoding='utf-8')
+    
+    config['DEFAULT']['provider'] = 'deepseek'
+    config['deepseek']['api_key'] = 'mock-key'
+    config['deepseek']['base_url'] = llm_url
+    config['deepseek']['model'] = 'mock-chat'
+    config['embedding']['type'] = 'deepseek'
+    config['embedding']['model'] = 'mock-embedding'
+    config['embedding']['cache_path'] = str(cache_path)
+    config['llm']['max_connections'] = str(max(max_sessions, 20))
+    config['api']['port'] = str(port)
+    config['api']['max_sessions'] = str(max_sessions)
+    config['api']['cors_enabled'] = 'false'
+    # 会话持久化数据也放在压测临时目录中
+    config['api']['session_db_path'] = str(cache_path.with_name(f"{cache_path.stem}.sessions.sqlite3"))
+    
+    for section, values in (overrides or {}).items():
+        if not config.has_section(section) and section != 'DEFAULT':
+            config.add_section(section)
+        for key, value in values.items():
+            config[section][key] = str(value)
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+
+
+def start_process(args: List[str], env: Optional[dict] = None, log_path: Optional[Path] = None) -> subprocess.Popen:
+    """启动子进程，输出写入日志文件"""
+    log = open(log_path, 'w', encoding='utf-8') if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=str(PROJECT_DIR),
+        env={**os.environ, 'PYTHONUNBUFFERED': '1', **(env or {})},
+        stdout=log,
+        stderr=subprocess.STDOUT
+    )
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_for_http(url: str, process: subprocess.Popen, timeout: float = 120):
+    """等待服务可访问"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务进程已退出（返回码 {process.returncode}）：{url}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError(f"等待服务启动超时：{url}")
+
+
+@contextmanager
+def mock_llm(workdir: Path, ttft: float, tokens_per_second: float, reply_tokens: int,
+             prefill_tokens_per_second: float = 0.0):
+    """启动本地模拟 LLM 服务，返回其 OpenAI 兼容接口地址"""
+    port = free_port()
+    process = start_process([
+        'mock_llm_server.py', '--port', str(port),
+        '--ttft', str(ttft),
+        '--tokens-per-second', str(tokens_per_second),
+        '--reply-tokens', str(reply_tokens),
+        '--prefill-tokens-per-second', str(prefill_tokens_per_second),
+    ], log_path=Path(workdir) / "mock.log")
+    try:
+        wait_for_http(f"http://127.0.0.1:{port}/stats", process)
+        print(f"模拟 LLM：首字延迟 {ttft}s，{tokens_per_second} Token/s，每次 {reply_tokens} Token")
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        stop_process(process)
+
+
+def read_process_usage(pid: int) -> Dict[str, int]:
+    """读取进程的线程数和常驻内存"""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return {'threads': process.num_threads(), 'rss_bytes': process.memory_info().rss}
+    except ImportError:
+        pass
+    
+    usage = {'threads': 0, 'rss_bytes': 0}
+    with open(f"/proc/{pid}/status", encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                usage['threads'] = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                usage['rss_bytes'] = int(line.split()[1]) * 1024
+    return usage
+
+
+def list_child_pids(pid: int) -> List[int]:
+    """列出进程的所有子进程（多进程模式的工作进程）"""
+    try:
+        import psutil
+        return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+    except ImportError:
+        pass
+    
+    children = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding='utf-8') as f:
+            for child in f.read().split():
+                children.append(int(child))
+                children.extend(list_child_pids(int(child)))
+    except OSError:
+        pass
+    return children
+
+
+def read_process_tree_usage(pid: int) -> Dict[str, int]:
+    """读取进程及其子进程的线程数和常驻内存之和（写时复制共享的内存页会被重复计算）"""
+    usage = read_process_usage(pid)
+    for child in list_child_pids(pid):
+        try:
+            child_usage = read_process_usage(child)
+        except Exception:
+            continue
+        usage['threads'] += child_usage['threads']
+        usage['rss_bytes'] += child_usage['rss_bytes']
+    return usage
+
+
+class ProcessSampler:
+    """后台定期采样服务进程（含工作进程）的线程数和内存，记录峰值"""
+    
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_bytes = 0
+        self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                usage = read_process_tree_usage(self.pid)
+            except Exception:
+                return
+            self.peak_threads = max(self.peak_threads, usage['threads'])
+            self.peak_rss_bytes = max(self.peak_rss_bytes, usage['rss_bytes'])
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def percentile(values: List[float], p: float) -> float:
+    """按最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+async def timed_request(client: httpx.AsyncClient, latencies: Dict[str, List[float]], name: str,
+                        method: str, url: str, **kwargs) -> httpx.Response:
+    """发送请求并按接口名记录耗时"""
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    latencies.setdefault(name, []).append(time.perf_counter() - start)
+    return response
+
+
+async def upload_and_wait(client: httpx.AsyncClient, base_url: str, resume_path: Path,
+                          latencies: Dict[str, List[float]]) -> str:
+    """上传简历并等待解析、索引完成，返回 resume_id"""
+    with open(resume_path, 'rb') as f:
+        response = await timed_request(
+            client, latencies, 'upload', 'POST', f"{base_url}/api/upload-resume",
+            files={'file': (resume_path.name, f.read(), 'application/pdf')}
+        )
+    response.raise_for_status()
+    resume_id = response.json()['resume_id']
+    
+    start = time.perf_counter()
+    while True:
+        status = (await client.get(f"{base_url}/api/resume/{resume_id}/status")).json()
+        if status['status'] == 'ready':
+            latencies.setdefault('ingest', []).append(time.perf_counter() - start)
+            return resume_id
+        if status['status'] == 'failed':
+            raise RuntimeError(f"简历处理失败：{status['error']}")
+        await asyncio.sleep(0.05)
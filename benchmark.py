@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+离线基准测试
+接入本地模拟 LLM 服务（mock_llm_server.py），不调用真实 API 即可测量系统性能：
+
+1. 分阶段耗时：在本进程内依次执行 PDF 解析、分块、Embedding、建索引、检索、LLM 生成，统计每个阶段的耗时
+2. 接口压测：启动 api_server.py，以并发会话跑完 上传 -> 开始面试 -> 多轮对话 -> 结束 流程，
+   统计每个接口的 p50/p95/p99、吞吐量和服务端峰值内存
+
+用法：
+    python benchmark.py --sessions 20 --concurrency 10 --turns 3 --output bench.json
+    python benchmark.py --baseline bench.json    # 与之前的结果对比，出现性能回退时返回码为 1
+    python benchmark.py --server prefork --workers 4 --embedding local   # 多进程模式，对比吞吐随核数的变化
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from bench_utils import (
+    SERVER_SCRIPTS, ProcessSampler, free_port, make_resume_pdf, mock_llm, percentile,
+    start_process, stop_process, timed_request, upload_and_wait, wait_for_http, write_bench_config
+)
+
+
+# 模拟候选人回答
+SAMPLE_ANSWERS = [
+    "我在订单服务里用 Redis 做了缓存，写数据库后删除缓存来保证一致性。",
+    "Kafka 消费端做了幂等处理，用业务主键去重。",
+    "p99 延迟主要是连接池太小导致的排队，调整后降到了 120ms。",
+    "分库分表按用户 ID 取模，跨分片查询走异步汇总。",
+]
+
+STAGES = ['pdf_parse', 'chunking', 'embedding', 'index_build', 'retrieval', 'llm_ttft', 'llm_total']
+
+
+def summarize(values: List[float]) -> dict:
+    """汇总耗时列表（秒）为毫秒统计"""
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def profile_stages(config_path: Path, resume_path: Path, runs: int) -> Dict[str, dict]:
+    """在本进程内逐阶段执行一次完整的简历处理和问答，重复 runs 次，返回每个阶段的耗时统计"""
+    os.environ['RESUME_ROASTER_CONFIG'] = str(config_path)
+    from main import (
+        load_config, get_llm, parse_resume, split_resume,
+        build_resume_index, drop_resume_index, create_interview_chain
+    )
+    from embeddings import get_embeddings
+    
+    config = load_config()
+    llm = get_llm(config)
+    embeddings = get_embeddings(config)
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+    
+    for run in range(runs):
+        documents = timed('pdf_parse', parse_resume, resume_path)
+        chunks = timed('chunking', split_resume, documents)
+        timed('embedding', embeddings.embed_documents, [chunk.page_content for chunk in chunks])
+        vectorstore = timed('index_build', build_resume_index, chunks, config, f"benchmark_{run}")
+        
+        retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+        for answer in SAMPLE_ANSWERS:
+            timed('retrieval', retriever.invoke, answer)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            chain = create_interview_chain(chunks, llm, config, vectorstore=vectorstore)
+        prompt_value = chain.build_prompt(SAMPLE_ANSWERS[run % len(SAMPLE_ANSWERS)])
+        
+        start = time.perf_counter()
+        first_token = None
+        for chunk in llm.stream(prompt_value):
+            if first_token is None and chunk.content:
+                first_token = time.perf_counter() - start
+        timings['llm_total'].append(time.perf_counter() - start)
+        timings['llm_ttft'].append(first_token if first_token is not None else timings['llm_total'][-1])
+        
+        drop_resume_index(vectorstore)
+    
+    return {stage: summarize(values) for stage, values in timings.items()}
+
+
+async def run_session(client: httpx.AsyncClient, base_url: str, resume_path: Path, turns: int,
+                      stream: bool, latencies: Dict[str, List[float]], errors: List[str]):
+    """一位候选人的完整流程：上传简历 -> 开始面试 -> turns 轮对话 -> 结束"""
+    try:
+        resume_id = await upload_and_wait(client, base_url, resume_path, latencies)
+        
+        response = await timed_request(
+            client, latencies, 'start', 'POST', f"{base_url}/api/interview/start",
+            json={'resume_id': resume_id}
+        )
+        if response.status_code != 200:
+            errors.append(f"start {response.status_code}")
+            return
+        session_id = response.json()['session_id']
+        
+        for turn in range(turns):
+            payload = {'session_id': session_id, 'message': SAMPLE_ANSWERS[turn % len(SAMPLE_ANSWERS)]}
+            if stream:
+                await stream_message(client, base_url, payload, latencies, errors)
+                continue
+            
+            response = await timed_request(
+                client, latencies, 'message', 'POST', f"{base_url}/api/interview/message", json=payload
+            )
+            if response.status_code != 200:
+                errors.append(f"message {response.status_code}")
+                return
+        
+        await timed_request(
+            client, latencies, 'end', 'POST', f"{base_url}/api/interview/end",
+            json={'session_id': session_id}
+        )
+    except httpx.HTTPError as e:
+        errors.append(type(e).__name__)
+    except RuntimeError as e:
+        errors.append(str(e))
+
+
+async def stream_message(client: httpx.AsyncClient, base_url: str, payload: dict,
+                         latencies: Dict[str, List[float]], errors: List[str]):
+    """调用流式消息接口，分别记录首个 token 事件的延迟和总耗时"""
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream('POST', f"{base_url}/api/interview/message/stream", json=payload) as response:
+        if response.status_code != 200:
+            errors.append(f"message/stream {response.status_code}")
+            return
+        async for line in response.aiter_lines():
+            if first_token is None and line == 'event: token':
+                first_token = time.perf_counter() - start
+            elif line == 'event: error':
+                errors.append('message/stream error')
+    total = time.perf_counter() - start
+    latencies.setdefault('message_stream', []).append(total)
+    latencies.setdefault('message_stream_ttft', []).append(first_token if first_token is not None else total)
+
+
+async def run_http_load(base_url: str, pid: int, resume_paths: List[Path], concurrency: int,
+                        turns: int, stream: bool) -> dict:
+    """以最多 concurrency 个并发会话跑完所有候选人的流程，返回接口延迟和吞吐统计"""
+    latencies: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency + 10, max_keepalive_connections=concurrency + 10)
+    
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+        async def limited(resume_path):
+            async with semaphore:
+                await run_session(client, base_url, resume_path, turns, stream, latencies, errors)
+        
+        sampler = ProcessSampler(pid)
+        sampler.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(path) for path in resume_paths))
+        elapsed = time.perf_counter() - start
+        await sampler.stop()
+        
+        server_stats = (await client.get(f"{base_url}/api/stats")).json()
+    
+    # ingest 为上传后等待解析和索引完成的时间，不是独立请求
+    requests = sum(len(values) for name, values in latencies.items()
+                   if name not in ('ingest', 'message_stream_ttft'))
+    turns_done = len(latencies.get('start', [])) + len(latencies.get('message', [])) \
+        + len(latencies.get('message_stream', []))
+    return {
+        'sessions': len(resume_paths),
+        'concurrency': concurrency,
+        'turns': turns,
+        'stream': stream,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': requests,
+        'requests_per_second': round(requests / elapsed, 2) if elapsed else 0.0,
+        'turns_per_second': round(turns_done / elapsed, 2) if elapsed else 0.0,
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:5],
+        'peak_rss_mb': round(sampler.peak_rss_bytes / 1024 / 1024, 1),
+        'peak_threads': sampler.peak_threads,
+        'endpoints': {name: summarize(values) for name, values in sorted(latencies.items())},
+        'server_interview_stats': server_stats.get('interview'),
+        # 服务端各阶段耗时（/api/stats 中的 stages）
+        'server_stages': server_stats.get('stages'),
+    }
+
+
+def run_server_benchmark(args, workdir: Path, llm_url: str) -> dict:
+    """启动 API 服务器并执行接口压测"""
+    port = free_port()
+    config_path = workdir / "config.server.ini"
+    write_bench_config(
+        config_path, llm_url, port,
+        max_sessions=args.concurrency * 2,
+        cache_path=workdir / "embeddings.server.sqlite3",
+        overrides={'api': {
+            'max_resumes': args.sessions * 2,
+            'ingest_max_queue': args.sessions * 2,
+        }, 'interview': {'prompt_layout': args.prompt_layout}, **embedding_overrides(args)}
+    )
+    
+    resume_paths = []
+    for i in range(args.sessions):
+        path = workdir / f"resume_{i + 1}.pdf"
+        make_resume_pdf(path, variant=i + 1)
+        resume_paths.append(path)
+    
+    server_args = ['--workers', str(args.workers)] if args.server == 'prefork' else []
+    server = start_process(
+        [SERVER_SCRIPTS[args.server], *server_args],
+        env={'RESUME_ROASTER_CONFIG': str(config_path)},
+        log_path=workdir / "server.log"
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_http(f"{base_url}/api/health", server)
+        print(f"接口压测：{args.sessions} 位候选人，并发 {args.concurrency}，每场 {args.turns} 轮"
+              f"（{args.server} 模式{'，流式' if args.stream else ''}）...", flush=True)
+        result = asyncio.run(run_http_load(
+            base_url, server.pid, resume_paths, args.concurrency, args.turns, args.stream
+        ))
+        result['server'] = args.server
+        result['prompt_layout'] = args.prompt_layout
+        if args.server == 'prefork':
+            result['workers'] = args.workers
+        return result
+    finally:
+        stop_process(server)
+
+
+def embedding_overrides(args) -> Dict[str, Dict[str, str]]:
+    """--embedding local / onnx 时使用本地模型（onnx 为其 int8 量化版本），否则使用模拟服务"""
+    if args.embedding in ('local', 'onnx'):
+        return {'embedding': {'type': args.embedding, 'model': args.local_model}}
+    return {}
+
+
+def find_regressions(result: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """对比两次结果：延迟增加超过 tolerance 比例（且绝对值超过 min_delta_ms），或吞吐下降超过 tolerance 比例"""
+    regressions = []
+    
+    def check(label, new, old):
+        if old and new > old * (1 + tolerance) and new - old > min_delta_ms:
+            regressions.append(f"{label}: {old:.1f}ms -> {new:.1f}ms")
+    
+    for stage, stats in result.get('stages', {}).items():
+        old = baseline.get('stages', {}).get(stage)
+        if old:
+            check(f"阶段 {stage} p50", stats['p50_ms'], old['p50_ms'])
+    
+    new_http = result.get('http') or {}
+    old_http = baseline.get('http') or {}
+    for endpoint, stats in new_http.get('endpoints', {}).items():
+        old = old_http.get('endpoints', {}).get(endpoint)
+        if old:
+            check(f"接口 {endpoint} p95", stats['p95_ms'], old['p95_ms'])
+    
+    old_rps = old_http.get('requests_per_second')
+    new_rps = new_http.get('requests_per_second')
+    if old_rps and new_rps is not None and new_rps < old_rps * (1 - tolerance):
+        regressions.append(f"吞吐量: {old_rps} -> {new_rps} 请求/秒")
+    
+    return regressions
+
+
+def print_report(result: dict):
+    stages = result.get('stages')
+    if stages:
+        print("\n分阶段耗时（ms）")
+        print(f"{'阶段':<14}{'次数':>6}{'平均':>10}{'p50':>10}{'p95':>10}{'最大':>10}")
+        for stage, stats in stages.items():
+            print(f"{stage:<16}{stats['count']:>6}{stats['mean_ms']:>10}{stats['p50_ms']:>10}"
+                  f"{stats['p95_ms']:>10}{stats['max_ms']:>10}")
+    
+    http = result.get('http')
+    if http:
+        print("\n接口延迟（ms）")
+        print(f"{'接口':<20}{'次数':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}")
+        for endpoint, stats in http['endpoints'].items():
+            print(f"{endpoint:<22}{stats['count']:>6}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+                  f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+        print(f"\n吞吐量：{http['requests_per_second']} 请求/秒，{http['turns_per_second']} 轮/秒"
+              f"（共 {http['requests']} 个请求，耗时 {http['elapsed_seconds']}s）")
+        print(f"服务端峰值内存：{http['peak_rss_mb']} MB，峰值线程：{http['peak_threads']}，错误：{http['errors']}")
+        interview = http.get('server_interview_stats') or {}
+        if interview.get('prompt_cache_hit_tokens') or interview.get('prompt_cache_miss_tokens'):
+            print(f"提示词缓存（{http.get('prompt_layout')} 布局）：命中率 {interview['prompt_cache_hit_rate']:.1%}，"
+                  f"命中 {interview['prompt_cache_hit_tokens']} / 未命中 {interview['prompt_cache_miss_tokens']} Token")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试（使用本地模拟 LLM 服务）")
+    parser.add_argument('--sessions', type=int, default=20, help="候选人（会话）总数，每人上传一份不同的简历")
+    parser.add_argument('--concurrency', type=int, default=10, help="同时进行的会话数")
+    parser.add_argument('--turns', type=int, default=3, help="每场面试的对话轮数")
+    parser.add_argument('--stream', action='store_true', help="使用流式消息接口（额外统计首字延迟）")
+    parser.add_argument('--server', choices=list(SERVER_SCRIPTS), default='threaded', help="压测的服务器模式")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="prefork 模式的工作进程数")
+    parser.add_argument('--stage-runs', type=int, default=5, help="分阶段耗时的重复次数")
+    parser.add_argument('--skip-stages', action='store_true', help="跳过分阶段耗时测试")
+    parser.add_argument('--skip-http', action='store_true', help="跳过接口压测")
+    parser.add_argument('--embedding', choices=['mock', 'local', 'onnx'], default='mock',
+                        help="Embedding 使用模拟服务或本地模型（local 需已安装 sentence-transformers，onnx 需已安装 onnxruntime）")
+    parser.add_argument('--local-model', default='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+    parser.add_argument('--ttft', type=float, default=0.3, help="模拟 LLM 首字延迟（秒）")
+    parser.add_argument('--tokens-per-second', type=float, default=50, help="模拟 LLM 生成速度")
+    parser.add_argument('--reply-tokens', type=int, default=60, help="模拟 LLM 每次回答的 Token 数")
+    parser.add_argument('--prefill-tokens-per-second', type=float, default=0.0,
+                        help="模拟 LLM 处理未命中缓存的提示词的速度（Token/s），0 表示不计入首字延迟")
+    parser.add_argument('--prompt-layout', choices=['prefix', 'classic'], default='prefix',
+                        help="接口压测使用的提示词布局")
+    parser.add_argument('--resume', type=Path, help="分阶段耗时使用的简历 PDF（默认生成一份示例简历）")
+    parser.add_argument('--output', type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument('--baseline', type=Path, help="与之前保存的结果对比")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的性能波动比例")
+    parser.add_argument('--min-delta-ms', type=float, default=20.0, help="小于该绝对差值的延迟变化不视为回退")
+    args = parser.parse_args()
+    
+    result = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mock_llm': {
+            'ttft': args.ttft,
+            'tokens_per_second': args.tokens_per_second,
+            'reply_tokens': args.reply_tokens,
+            'prefill_tokens_per_second': args.prefill_tokens_per_second,
+        },
+        'embedding': args.embedding,
+    }
+    
+    with tempfile.TemporaryDirectory(prefix='resume_roaster_bench_') as tmp:
+        workdir = Path(tmp)
+        with mock_llm(workdir, args.ttft, args.tokens_per_second, args.reply_tokens,
+                      args.prefill_tokens_per_second) as llm_url:
+            if not args.skip_stages:
+                resume_path = args.resume or workdir / "sample_resume.pdf"
+                if args.resume is None:
+                    make_resume_pdf(resume_path)
+                
+                # 分阶段测试关闭向量缓存，测量真实的 Embedding 耗时
+                config_path = workdir / "config.stages.ini"
+                overrides = embedding_overrides(args)
+                overrides.setdefault('embedding', {})['cache_enabled'] = 'false'
+                overrides['interview'] = {'retrieval_mode': 'single'}
+                write_bench_config(config_path, llm_url, free_port(), max_sessions=1,
+                                   cache_path=workdir / "unused.sqlite3", overrides=overrides)
+                
+                print(f"分阶段耗时：重复 {args.stage_runs} 次...", flush=True)
+                result['stages'] = profile_stages(config_path, resume_path, args.stage_runs)
+            
+            if not args.skip_http:
+                result['http'] = run_server_benchmark(args, workdir, llm_url)
+    
+    print_report(result)
+    
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"结果已写入 {args.output}")
+    
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = find_regressions(result, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退（容差 {args.tolerance:.0%}）：")
+            for item in regressions:
+                print(f"  - {item}")
+            sys.exit(1)
+        print(f"与基线 {args.baseline} 相比未发现性能回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+面试链使用的 LangChain 组件
+完整简历检索器、检索结果整理、Embedding 包装器（计时、向量缓存）和回调（提示词 Token 数、阶段耗时）都继承自
+langchain_core 的基类。导入 langchain_core 需要较长时间，本模块只在首次构建索引或面试链时才导入，
+服务启动时不加载。
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from embedding_cache import EmbeddingCache, hash_text
+from metrics import observe_stage, registry as metrics_registry, timed_stage
+from resume_context import pack_context
+from token_counter import count_message_tokens, count_tokens
+
+
+class FullContextRetriever(BaseRetriever):
+    """始终返回完整简历的检索器（不做向量检索），供问题改写模式的链使用"""
+    
+    context: str
+    
+    @property
+    def documents(self) -> List[Document]:
+        return [Document(page_content=self.context)]
+    
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.documents
+
+
+context_tokens = metrics_registry.counter(
+    'resume_roaster_context_tokens_total',
+    '检索模式下放入提示词的简历内容 Token 数（raw 为检索结果直接拼接，packed 为整理后）',
+    ('kind',)
+)
+
+
+class PackedContextRetriever(BaseRetriever):
+    """整理检索结果的检索器：合并相邻和重叠的文本块、去掉重复内容、按简历中的位置排列并控制在 Token 预算内
+
+    返回一个包含整理后上下文的文本块，整理前后的 Token 数记录在其 metadata 中
+    """
+    
+    retriever: BaseRetriever
+    max_tokens: int = 0
+    
+    def _pack(self, docs: List[Document]) -> List[Document]:
+        context, stats = pack_context(docs, self.max_tokens)
+        context_tokens.inc(stats['context_tokens_raw'], kind='raw')
+        context_tokens.inc(stats['context_tokens_packed'], kind='packed')
+        return [Document(page_content=context, metadata=stats)] if context else []
+    
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # 内层检索器不传入回调，检索耗时只按外层统计一次
+        return self._pack(self.retriever.invoke(query))
+    
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        return self._pack(await self.retriever.ainvoke(query))
+
+
+embedded_texts = metrics_registry.counter(
+    'resume_roaster_embedded_texts_total',
+    '实际计算向量的文本数（不含缓存命中）',
+    ('kind',)
+)
+
+
+class TimedEmbeddings(Embeddings):
+    """统计向量计算耗时的 Embedding 包装器（缓存命中的文本不会经过这里）"""
+    
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with timed_stage('embedding'):
+            vectors = self.embeddings.embed_documents(texts)
+        embedded_texts.inc(len(texts), kind='document')
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        with timed_stage('query_embedding'):
+            vector = self.embeddings.embed_query(text)
+        embedded_texts.inc(kind='query')
+        return vector
+
+
+class CachedEmbeddings(Embeddings):
+    """带缓存的 Embedding 包装器，只为未见过的文本块计算向量"""
+    
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_key: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_key = model_key
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [hash_text(text) for text in texts]
+        
+        # 同一批次内的重复文本只查询、计算一次
+        unique_hashes = list(dict.fromkeys(hashes))
+        vectors = self.cache.get_many(self.model_key, unique_hashes)
+        
+        missing: Dict[str, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors and text_hash not in missing:
+                missing[text_hash] = text
+        
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), computed))
+            self.cache.put_many(self.model_key, new_items)
+            vectors.update(new_items)
+        
+        return [vectors[text_hash] for text_hash in hashes]
+    
+    def embed_query(self, text: str) -> List[float]:
+        # 查询文本（候选人回答）几乎不会重复，直接计算
+        return self.embeddings.embed_query(text)
+
+
+class PromptTokenCounter(BaseCallbackHandler):
+    """记录每次 LLM 调用的提示词 Token 数（用于无法直接拿到提示词的链）"""
+    
+    def __init__(self):
+        self.calls: List[int] = []
+    
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls.append(sum(count_tokens(prompt) for prompt in prompts))
+    
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls.append(sum(count_message_tokens(batch) for batch in messages))
+    
+    @property
+    def last(self) -> Optional[int]:
+        """最后一次调用（即生成回答的调用）的提示词 Token 数"""
+        return self.calls[-1] if self.calls else None
+
+
+class StageTimingCallback(BaseCallbackHandler):
+    """记录链内部检索和 LLM 调用耗时（用于无法逐步拆开执行的链）
+
+    检索耗时直接记入 retrieval 阶段；LLM 调用耗时按调用顺序保存在 llm_durations 中，
+    由调用方决定每次调用属于哪个阶段。
+    """
+    
+    def __init__(self):
+        self.llm_durations: List[float] = []
+        # 最后一次检索返回的文本块
+        self.documents: List[Document] = []
+        self._starts: Dict[object, float] = {}
+    
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+    
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self.documents = documents
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            observe_stage('retrieval', time.perf_counter() - start)
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.llm_durations.append(time.perf_counter() - start)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+    
+    @property
+    def last(self) -> Optional[float]:
+        """最后一次 LLM 调用（即生成回答的调用）的耗时"""
+        return self.llm_durations[-1] if self.llm_durations else None
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 微批调度
+高峰期多个请求线程（上传简历、开始会话、每轮回答）会同时各自计算几条文本的向量，
+各线程争抢 GIL 和 CPU 核，每次前向计算的批量又很小。调度器用一个后台线程收集所有线程提交的文本，
+最多等待 max_wait_ms 毫秒或攒够 max_batch_size 条后合并为一次批量计算，再把结果分发回各调用方。
+
+本项目的各个后端（本地模型、ONNX、OpenAI 兼容接口）计算查询向量和文本块向量的方式相同，
+因此查询和文本块合并在同一批中计算。
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from metrics import LATENCY_BUCKETS, registry as metrics_registry
+
+
+# 批量大小直方图的桶（条）
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+batch_size_histogram = metrics_registry.histogram(
+    'resume_roaster_embedding_batch_size',
+    '每次批量计算的文本数',
+    BATCH_SIZE_BUCKETS
+)
+batch_requests_histogram = metrics_registry.histogram(
+    'resume_roaster_embedding_batch_requests',
+    '每次批量计算合并的请求数',
+    BATCH_SIZE_BUCKETS
+)
+queue_wait_histogram = metrics_registry.histogram(
+    'resume_roaster_embedding_queue_wait_seconds',
+    'Embedding 请求从提交到开始计算的等待时间（秒）',
+    LATENCY_BUCKETS
+)
+
+
+class _Request:
+    """一次提交的文本（超过 max_batch_size 的调用会拆成多个请求）"""
+    
+    __slots__ = ('texts', 'future', 'submitted_at')
+    
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """跨请求的 Embedding 微批调度器（接口与 LangChain Embeddings 一致，可直接替换被包装的模型）
+
+    max_wait_ms 为收到第一条请求后最多等待其他请求的时间，max_batch_size 为单次计算的文本数上限；
+    单次调用的文本数超过上限时拆成多个请求，其他线程的查询可以插在中间计算，不必等整份简历算完
+    """
+    
+    def __init__(self, embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.configure(max_batch_size, max_wait_ms)
+        
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._worker_pid = None
+        
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.max_batch_texts = 0
+        self.queue_wait_seconds = 0.0
+    
+    def configure(self, max_batch_size: int, max_wait_ms: float):
+        """更新批量上限和等待时间，从下一批开始生效"""
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max(max_wait_ms, 0) / 1000
+    
+    def _get_queue(self) -> queue.Queue:
+        """请求队列；后台线程在首次使用时启动，fork 出的子进程中重新启动"""
+        if self._worker_pid != os.getpid():
+            with self._lock:
+                if self._worker_pid != os.getpid():
+                    self._queue = queue.Queue()
+                    threading.Thread(
+                        target=self._run, args=(self._queue,), name='embedding-batcher', daemon=True
+                    ).start()
+                    self._worker_pid = os.getpid()
+        return self._queue
+    
+    def _collect(self, pending: queue.Queue, first: _Request) -> Tuple[List[_Request], Optional[_Request]]:
+        """从第一条请求开始收集一批请求，返回 (本批请求, 放不下而留到下一批的请求)"""
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                return batch, request
+            batch.append(request)
+            size += len(request.texts)
+        return batch, None
+    
+    def _run(self, pending: queue.Queue):
+        carry = None
+        while True:
+            first = carry if carry is not None else pending.get()
+            batch, carry = self._collect(pending, first)
+            self._compute(batch)
+    
+    def _compute(self, batch: List[_Request]):
+        started_at = time.perf_counter()
+        texts = [text for request in batch for text in request.texts]
+        
+        waits = [started_at - request.submitted_at for request in batch]
+        for wait in waits:
+            queue_wait_histogram.observe(wait)
+        batch_size_histogram.observe(len(texts))
+        batch_requests_histogram.observe(len(batch))
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.max_batch_texts = max(self.max_batch_texts, len(texts))
+            self.queue_wait_seconds += sum(waits)
+        
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        
+        offset = 0
+        for request in batch:
+            request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        pending = self._get_queue()
+        requests = [
+            _Request(list(texts[start:start + self.max_batch_size]))
+            for start in range(0, len(texts), self.max_batch_size)
+        ]
+        for request in requests:
+            pending.put(request)
+        
+        vectors = []
+        for request in requests:
+            vectors.extend(request.future.result())
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+    
+    def get_stats(self) -> dict:
+        """返回调度统计（批数、平均批量大小、平均等待时间）"""
+        with self._lock:
+            batches, requests, texts = self.batches, self.requests, self.texts
+            max_batch_texts, queue_wait_seconds = self.max_batch_texts, self.queue_wait_seconds
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000, 2),
+            'batches': batches,
+            'requests': requests,
+            'texts': texts,
+            'mean_batch_texts': round(texts / batches, 2) if batches else 0.0,
+            'mean_batch_requests': round(requests / batches, 2) if batches else 0.0,
+            'max_batch_texts': max_batch_texts,
+            'mean_queue_wait_ms': round(queue_wait_seconds / requests * 1000, 3) if requests else 0.0
+        }
+
+
+# 进程级调度器：每个 Embedding 模型一个
+_batchers: Dict[Tuple[str, ...], EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(key: Tuple[str, ...], embeddings, max_batch_size: int = 64,
+                max_wait_ms: float = 5.0) -> EmbeddingBatcher:
+    """获取模型对应的调度器，首次使用时创建
+
+    已有调度器按传入的 max_batch_size / max_wait_ms 更新（重新加载配置后生效，沿用其后台线程和统计）
+    """
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None or batcher.embeddings is not embeddings:
+            batcher = EmbeddingBatcher(embeddings, max_batch_size, max_wait_ms)
+            _batchers[key] = batcher
+        else:
+            batcher.configure(max_batch_size, max_wait_ms)
+        return batcher
+
+
+def get_batcher_stats() -> List[dict]:
+    """全部调度器的统计信息"""
+    with _batchers_lock:
+        items = list(_batchers.items())
+    return [{'model': key[1], **batcher.get_stats()} for key, batcher in items]
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 向量缓存
+按 (Embedding 模型, 文本哈希) 将向量持久化到本地 SQLite，重复上传的简历无需重新计算
+"""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def hash_text(text: str) -> str:
+    """计算文本内容哈希"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """基于 SQLite 的 Embedding 向量缓存（线程安全）"""
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        """批量查询向量，返回 {文本哈希: 向量}，未命中的不出现在结果中"""
+        found = {}
+        if not text_hashes:
+            return found
+        
+        with self._lock:
+            # SQLite 默认最多 999 个参数，分批查询
+            for i in range(0, len(text_hashes), 500):
+                batch = text_hashes[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+            
+            self.hits += len(found)
+            self.misses += len(text_hashes) - len(found)
+        
+        return found
+    
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """批量写入向量，以 float32 存储"""
+        if not items:
+            return
+        
+        rows = [
+            (model, text_hash, len(vector), array('f', vector).tobytes())
+            for text_hash, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+    
+    def count(self) -> int:
+        """缓存中的向量条数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    def get_stats(self) -> dict:
+        """返回缓存命中统计"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'path': str(self.db_path),
+            'entries': self.count(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
+
+
+# 按缓存文件路径共享的缓存实例
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(db_path: Path) -> EmbeddingCache:
+    """获取（或创建）指定路径的缓存实例"""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = EmbeddingCache(Path(db_path))
+            _caches[key] = cache
+        return cache
+
+
+def get_cache_stats() -> Optional[dict]:
+    """返回所有缓存实例的统计，未启用缓存时返回 None"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    if not caches:
+        return None
+    if len(caches) == 1:
+        return caches[0].get_stats()
+    return {'caches': [cache.get_stats() for cache in caches]}
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 模型注册表
+同一进程内每个 Embedding 模型只加载一次，供 CLI 和 API 服务器的所有会话共享
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from embedding_batcher import get_batcher, get_batcher_stats
+from embedding_cache import get_embedding_cache, get_cache_stats
+
+
+DEFAULT_LOCAL_MODEL = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+DEFAULT_API_MODEL = 'text-embedding-3-small'
+DEFAULT_CACHE_PATH = 'cache/embeddings.sqlite3'
+
+
+def get_rss_bytes() -> int:
+    """获取当前进程常驻内存（字节），无法获取时返回 0"""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        pass
+    
+    # Linux 下直接读取 /proc
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    
+    return 0
+
+
+class EmbeddingRegistry:
+    """Embedding 模型注册表（线程安全）"""
+    
+    def __init__(self):
+        self._models: Dict[Tuple[str, ...], object] = {}
+        self._stats: Dict[Tuple[str, ...], dict] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, ...], threading.Lock] = {}
+    
+    @staticmethod
+    def make_key(config) -> Tuple[str, ...]:
+        """根据配置生成模型键：(类型, 模型名, 接口地址或 ONNX 模型精度)"""
+        embedding_type = config.get('embedding', 'type', fallback='local').lower()
+        
+        if embedding_type == 'deepseek':
+            model = config.get('embedding', 'model', fallback=DEFAULT_API_MODEL)
+            base_url = config.get('deepseek', 'base_url', fallback='')
+            return (embedding_type, model, base_url)
+        
+        model = config.get('embedding', 'model', fallback=DEFAULT_LOCAL_MODEL)
+        if embedding_type == 'onnx':
+            quantized = config.getboolean('embedding', 'onnx_quantize', fallback=True)
+            return ('onnx', model, 'int8' if quantized else 'fp32')
+        return ('local', model, '')
+    
+    def get(self, config, verbose: bool = True):
+        """获取 Embedding 模型，首次使用时加载（verbose 为 False 时不打印加载信息）"""
+        key = self.make_key(config)
+        
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._stats[key]['requests'] += 1
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        # 每个模型单独加锁，并发请求只会加载一次
+        with load_lock:
+            with self._lock:
+                model = self._models.get(key)
+                if model is not None:
+                    self._stats[key]['requests'] += 1
+                    return model
+            
+            model, stats = self._load(key, config, verbose)
+            
+            with self._lock:
+                self._models[key] = model
+                self._stats[key] = stats
+            return model
+    
+    def _load(self, key: Tuple[str, ...], config, verbose: bool = True):
+        """加载模型并记录耗时和内存增量"""
+        embedding_type, model_name, variant = key
+        log = print if verbose else (lambda *args, **kwargs: None)
+        rss_before = get_rss_bytes()
+        start = time.perf_counter()
+        
+        if embedding_type == 'deepseek':
+            # 使用 DeepSeek 兼容的 Embedding（实际调用 OpenAI 兼容接口）
+            from langchain_openai import OpenAIEmbeddings
+            log("正在连接 DeepSeek Embedding API...")
+            model = OpenAIEmbeddings(
+                model=model_name,
+                openai_api_key=config.get('deepseek', 'api_key'),
+                openai_api_base=variant,
+                # 兼容接口只接受文本输入，不做 tiktoken 分词（也避免离线环境下载编码文件）
+                check_embedding_ctx_length=False
+            )
+        elif embedding_type == 'onnx':
+            # 本地模型的 ONNX 版本（onnxruntime 推理，不加载 torch）
+            from onnx_embeddings import load_onnx_embeddings
+            log(f"正在加载 ONNX Embedding 模型（{variant}）...")
+            model = load_onnx_embeddings(config, model_name, verbose)
+        else:
+            # 使用本地 Embedding 模型（免费，无需 API）
+            from langchain_huggingface import HuggingFaceEmbeddings
+            log("正在加载本地 Embedding 模型（首次需下载约400MB）...")
+            model = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs={'device': 'cpu'}
+            )
+        
+        load_seconds = time.perf_counter() - start
+        rss_delta = max(get_rss_bytes() - rss_before, 0)
+        log(f"Embedding 模型已加载：{model_name}，"
+              f"耗时 {load_seconds:.2f}s，内存增加约 {rss_delta / 1024 / 1024:.1f}MB")
+        
+        stats = {
+            'type': f"{embedding_type}-{variant}" if embedding_type == 'onnx' else embedding_type,
+            'model': model_name,
+            'load_seconds': round(load_seconds, 3),
+            'rss_delta_bytes': rss_delta,
+            'loaded_at': datetime.now().isoformat(),
+            'requests': 1
+        }
+        return model, stats
+    
+    def is_loaded(self, config) -> bool:
+        """模型是否已加载"""
+        with self._lock:
+            return self.make_key(config) in self._models
+    
+    def get_stats(self) -> dict:
+        """返回已加载模型的统计信息"""
+        with self._lock:
+            models = [dict(stats) for stats in self._stats.values()]
+        
+        # 每个模型只加载了一次，其余请求都是复用，节省的加载时间按首次耗时估算
+        for stats in models:
+            reused = stats['requests'] - 1
+            stats['reused'] = reused
+            stats['saved_load_seconds'] = round(reused * stats['load_seconds'], 3)
+        
+        return {
+            'loaded_models': len(models),
+            'process_rss_bytes': get_rss_bytes(),
+            'models': models
+        }
+
+
+# 进程级共享注册表
+registry = EmbeddingRegistry()
+
+
+def get_model_key(config) -> str:
+    """向量缓存和持久化索引使用的模型标识；不同后端（及 ONNX 的不同精度）算出的向量不同，需要区分"""
+    embedding_type, model_name, variant = registry.make_key(config)
+    model_key = f"{embedding_type}:{model_name}"
+    if embedding_type == 'onnx':
+        model_key += f":{variant}"
+    return model_key
+
+
+def get_embeddings(config):
+    """获取共享的 Embedding 模型，启用微批调度和缓存时包装为相应的版本"""
+    from chain_components import CachedEmbeddings, TimedEmbeddings
+    
+    model = registry.get(config)
+    if config.getboolean('embedding', 'batch_enabled', fallback=True):
+        # 各请求线程的向量计算合并为批量计算
+        model = get_batcher(
+            registry.make_key(config),
+            model,
+            max_batch_size=config.getint('embedding', 'batch_max_size', fallback=64),
+            max_wait_ms=config.getfloat('embedding', 'batch_max_wait_ms', fallback=5.0)
+        )
+    embeddings = TimedEmbeddings(model)
+    
+    if not config.getboolean('embedding', 'cache_enabled', fallback=True):
+        return embeddings
+    
+    cache_path = Path(config.get('embedding', 'cache_path', fallback=DEFAULT_CACHE_PATH))
+    if not cache_path.is_absolute():
+        cache_path = Path(__file__).parent / cache_path
+    
+    return CachedEmbeddings(
+        embeddings,
+        get_embedding_cache(cache_path),
+        model_key=get_model_key(config)
+    )
+
+
+def warmup_embeddings(config, verbose: bool = True) -> Optional[dict]:
+    """预热 Embedding 模型（服务器启动时调用），失败时返回 None"""
+    try:
+        registry.get(config, verbose)
+    except Exception as e:
+        print(f"警告：Embedding 模型预热失败：{e}")
+        return None
+    return registry.get_stats()
+
+
+def is_embedding_loaded(config) -> bool:
+    """配置中的 Embedding 模型是否已加载"""
+    return registry.is_loaded(config)
+
+
+def get_embedding_stats() -> dict:
+    """获取 Embedding 模型、微批调度及向量缓存统计信息"""
+    stats = registry.get_stats()
+    stats['batching'] = get_batcher_stats()
+    stats['cache'] = get_cache_stats()
+    return stats
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+单次调用面试问答链
+每轮只调用一次 LLM：检索直接使用候选人回答（结合上一轮面试官提问），不再让 LLM 改写问题；
+简历较短时直接使用完整简历，不做检索。
+提示词支持两种布局：classic 把简历内容、对话历史和候选人回答填入同一段文本；prefix 使用固定的系统消息，
+对话历史按消息追加在其后，每轮只有最后一条消息变化，便于命中服务商的提示词前缀缓存
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Iterator, List, Optional
+
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from langchain_core.messages import AIMessage
+
+from interview_memory import save_turn
+from metrics import observe_stage, timed_stage
+from prompt_cache import apply_cache_stats, capture_usage
+from resume_context import apply_context_stats, get_context_mode, is_full_context
+from token_counter import count_tokens
+
+
+# 提示词布局
+PROMPT_LAYOUT_CLASSIC = 'classic'
+PROMPT_LAYOUT_PREFIX = 'prefix'
+
+
+class InterviewChain:
+    """单次 LLM 调用的面试问答链，接口与 ConversationalRetrievalChain 的 invoke 保持一致"""
+    
+    # 每轮 LLM 调用次数
+    llm_calls_per_turn = 1
+    
+    def __init__(self, llm, retriever, prompt, memory, history_query_chars: int = 200,
+                 prompt_layout: str = PROMPT_LAYOUT_CLASSIC):
+        self.llm = llm
+        self.retriever = retriever
+        self.prompt = prompt
+        self.memory = memory
+        # 检索查询中拼接的上一轮面试官提问的最大字数，0 表示只用候选人回答检索
+        self.history_query_chars = history_query_chars
+        self.prompt_layout = prompt_layout
+    
+    def _load_history(self) -> List:
+        return self.memory.load_memory_variables({})[self.memory.memory_key]
+    
+    def build_query(self, question: str, chat_history: List) -> str:
+        """在本地构造检索查询：上一轮面试官提问 + 候选人回答"""
+        if not self.history_query_chars:
+            return question
+        
+        for message in reversed(chat_history):
+            if isinstance(message, AIMessage):
+                last_question = message.content[-self.history_query_chars:]
+                return f"{last_question}\n{question}"
+        
+        return question
+    
+    @property
+    def context_mode(self) -> str:
+        return get_context_mode(self)
+    
+    def _format_prompt(self, question: str, chat_history: List, context: str):
+        if self.prompt_layout == PROMPT_LAYOUT_PREFIX:
+            # 对话历史按消息原样传入；完整简历已在系统消息中，context 只在检索模式的模板中使用
+            return self.prompt.format_prompt(context=context, chat_history=chat_history, question=question)
+        return self.prompt.format_prompt(
+            context=context,
+            chat_history=_get_chat_history(chat_history),
+            question=question
+        )
+    
+    def build_prompt(self, question: str, stats: Optional[dict] = None):
+        """检索简历内容并填充提示词（完整简历模式直接使用缓存的简历文本）
+
+        传入 stats 时记录检索结果整理前后的 Token 数（启用上下文整理时）
+        """
+        chat_history = self._load_history()
+        if is_full_context(self.retriever):
+            return self._format_prompt(question, chat_history, self.retriever.context)
+        
+        with timed_stage('retrieval'):
+            docs = self.retriever.invoke(self.build_query(question, chat_history))
+        if stats is not None:
+            apply_context_stats(stats, docs)
+        return self._format_prompt(question, chat_history, "\n\n".join(doc.page_content for doc in docs))
+    
+    async def abuild_prompt(self, question: str, stats: Optional[dict] = None):
+        """build_prompt 的异步版本"""
+        chat_history = self._load_history()
+        if is_full_context(self.retriever):
+            return self._format_prompt(question, chat_history, self.retriever.context)
+        
+        with timed_stage('retrieval'):
+            docs = await self.retriever.ainvoke(self.build_query(question, chat_history))
+        if stats is not None:
+            apply_context_stats(stats, docs)
+        return self._format_prompt(question, chat_history, "\n\n".join(doc.page_content for doc in docs))
+    
+    async def _asave_turn(self, question: str, answer: str) -> int:
+        # 滚动摘要可能触发一次同步 LLM 调用，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, save_turn, self.memory, question, answer)
+    
+    def invoke(self, inputs: dict) -> dict:
+        """生成面试官回答，同时返回本轮 LLM 调用次数、提示词 Token 数和上下文模式"""
+        question = inputs["question"]
+        context_stats = {}
+        prompt_value = self.build_prompt(question, context_stats)
+        with timed_stage('llm_generation'), capture_usage() as usages:
+            response = self.llm.invoke(prompt_value)
+        answer = response.content if hasattr(response, 'content') else str(response)
+        
+        summary_calls = save_turn(self.memory, question, answer)
+        result = {
+            "question": question,
+            "answer": answer,
+            "llm_calls": self.llm_calls_per_turn + summary_calls,
+            "prompt_tokens": count_tokens(prompt_value.to_string()),
+            "context_mode": self.context_mode,
+            **context_stats
+        }
+        apply_cache_stats(result, usages)
+        return result
+    
+    def stream(self, question: str, stats: Optional[dict] = None) -> Iterator[str]:
+        """流式生成面试官回答，传入 stats 时记录首字延迟、总耗时、LLM 调用次数和提示词 Token 数"""
+        start = time.perf_counter()
+        prompt_value = self.build_prompt(question, stats)
+        
+        parts = []
+        ttft = None
+        generation_start = time.perf_counter()
+        with capture_usage() as usages:
+            for chunk in self.llm.stream(prompt_value):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if not text:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    observe_stage('llm_ttft', time.perf_counter() - generation_start)
+                parts.append(text)
+                yield text
+        observe_stage('llm_generation', time.perf_counter() - generation_start)
+        
+        answer = "".join(parts)
+        summary_calls = save_turn(self.memory, question, answer)
+        
+        if stats is not None:
+            stats['answer'] = answer
+            stats['llm_calls'] = self.llm_calls_per_turn + summary_calls
+            stats['prompt_tokens'] = count_tokens(prompt_value.to_string())
+            stats['context_mode'] = self.context_mode
+            apply_cache_stats(stats, usages)
+            stats['ttft_seconds'] = round(ttft if ttft is not None else time.perf_counter() - start, 3)
+            stats['total_seconds'] = round(time.perf_counter() - start, 3)
+    
+    async def ainvoke(self, inputs: dict) -> dict:
+        """invoke 的异步版本，等待 LLM 响应期间不占用线程"""
+        question = inputs["question"]
+        context_stats = {}
+        prompt_value = await self.abuild_prompt(question, context_stats)
+        with timed_stage('llm_generation'), capture_usage() as usages:
+            response = await self.llm.ainvoke(prompt_value)
+        answer = response.content if hasattr(response, 'content') else str(response)
+        
+        summary_calls = await self._asave_turn(question, answer)
+        result = {
+            "question": question,
+            "answer": answer,
+            "llm_calls": self.llm_calls_per_turn + summary_calls,
+            "prompt_tokens": count_tokens(prompt_value.to_string()),
+            "context_mode": self.context_mode,
+            **context_stats
+        }
+        apply_cache_stats(result, usages)
+        return result
+    
+    async def astream(self, question: str, stats: Optional[dict] = None) -> AsyncIterator[str]:
+        """stream 的异步版本"""
+        start = time.perf_counter()
+        prompt_value = await self.abuild_prompt(question, stats)
+        
+        parts = []
+        ttft = None
+        generation_start = time.perf_counter()
+        with capture_usage() as usages:
+            async for chunk in self.llm.astream(prompt_value):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if not text:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    observe_stage('llm_ttft', time.perf_counter() - generation_start)
+                parts.append(text)
+                yield text
+        observe_stage('llm_generation', time.perf_counter() - generation_start)
+        
+        answer = "".join(parts)
+        summary_calls = await self._asave_turn(question, answer)
+        
+        if stats is not None:
+            stats['answer'] = answer
+            stats['llm_calls'] = self.llm_calls_per_turn + summary_calls
+            stats['prompt_tokens'] = count_tokens(prompt_value.to_string())
+            stats['context_mode'] = self.context_mode
+            apply_cache_stats(stats, usages)
+            stats['ttft_seconds'] = round(ttft if ttft is not None else time.perf_counter() - start, 3)
+            stats['total_seconds'] = round(time.perf_counter() - start, 3)
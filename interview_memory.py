@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+有界对话记忆
+最近 N 轮对话原文保留，更早的对话增量合并进滚动摘要，提示词长度不再随面试轮数线性增长
+"""
+
+from langchain.memory import ConversationBufferMemory, ConversationSummaryBufferMemory
+from langchain.prompts import PromptTemplate
+
+from metrics import timed_stage
+from token_counter import count_message_tokens
+
+
+SUMMARY_TEMPLATE = """请将下面新增的面试对话合并进已有的面试摘要，输出新的摘要。
+摘要需保留：候选人已回答过的项目和技术点、回答中的关键事实和薄弱环节、面试官已经追问过的问题。
+摘要使用中文，简洁客观，不超过 300 字。
+
+已有摘要：
+{summary}
+
+新增对话：
+{new_lines}
+
+新的摘要："""
+
+SUMMARY_PROMPT = PromptTemplate(
+    template=SUMMARY_TEMPLATE,
+    input_variables=["summary", "new_lines"]
+)
+
+
+class RollingSummaryMemory(ConversationSummaryBufferMemory):
+    """保留最近若干轮原文、其余折叠为滚动摘要的对话记忆
+
+    超过 max_turns 轮或 max_token_limit 个 Token 时，一次性把较早的若干轮合并进摘要
+    （保留 max_turns 的一半），避免每轮都额外调用一次 LLM。
+    """
+    
+    max_turns: int = 6
+    # 生成摘要的 LLM 调用累计次数
+    summary_calls: int = 0
+    
+    def prune(self) -> None:
+        buffer = self.chat_memory.messages
+        over_turns = len(buffer) > self.max_turns * 2
+        if not over_turns and count_message_tokens(buffer) <= self.max_token_limit:
+            return
+        
+        keep_messages = max(self.max_turns // 2, 1) * 2
+        pruned_memory = []
+        while len(buffer) > 2 and (
+            len(buffer) > keep_messages
+            or count_message_tokens(buffer) > self.max_token_limit
+        ):
+            # 按轮（提问 + 回答）折叠
+            pruned_memory.extend(buffer[:2])
+            del buffer[:2]
+        
+        if pruned_memory:
+            with timed_stage('summary'):
+                self.moving_summary_buffer = self.predict_new_summary(
+                    pruned_memory, self.moving_summary_buffer
+                )
+            self.summary_calls += 1
+
+
+def save_turn(memory, question: str, answer: str) -> int:
+    """写入一轮对话，返回写入过程中额外产生的 LLM 调用次数（生成摘要）"""
+    summary_calls = getattr(memory, 'summary_calls', 0)
+    memory.save_context({"question": question}, {"answer": answer})
+    return getattr(memory, 'summary_calls', 0) - summary_calls
+
+
+def create_memory(llm, config):
+    """根据配置创建对话记忆：buffer（完整记录）或 summary（滚动摘要）"""
+    memory_type = config.get('memory', 'type', fallback='buffer').lower()
+    
+    if memory_type == 'summary':
+        return RollingSummaryMemory(
+            llm=llm,
+            prompt=SUMMARY_PROMPT,
+            max_turns=config.getint('memory', 'max_turns', fallback=6),
+            max_token_limit=config.getint('memory', 'max_token_limit', fallback=1500),
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="answer"
+        )
+    
+    return ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="answer"
+    )
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 客户端池
+按 (服务商, 模型, 温度) 复用 LLM 客户端，所有会话共享同一组保持连接的 HTTP 连接池
+"""
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Tuple
+
+
+class LLMClientPool:
+    """LLM 客户端池（线程安全）"""
+    
+    def __init__(self):
+        self._clients: Dict[Tuple, object] = {}
+        self._stats: Dict[Tuple, dict] = {}
+        self._http_clients: Dict[Tuple, object] = {}
+        self._lock = threading.RLock()
+    
+    def get(self, key: Tuple, factory: Callable[[], object]):
+        """获取客户端，不存在时调用 factory 创建"""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats[key]['reuses'] += 1
+                return client
+            
+            # 客户端构造只是创建对象，不发起网络请求，可以在锁内完成
+            client = factory()
+            self._clients[key] = client
+            self._stats[key] = {
+                'provider': key[0],
+                'model': key[1],
+                'temperature': key[2],
+                'created_at': datetime.now().isoformat(),
+                'reuses': 0
+            }
+            return client
+    
+    def get_http_client(self, base_url: str, max_connections: int, timeout: float,
+                        asynchronous: bool = False):
+        """获取指定服务地址共享的 HTTP 客户端（保持连接，复用 TLS 会话）
+        
+        asynchronous 为 True 时返回 httpx.AsyncClient，供异步服务模式的 ainvoke/astream 使用；
+        响应钩子会读取聊天补全响应中的 usage，统计提示词前缀缓存命中（见 prompt_cache）
+        """
+        import httpx
+        
+        from prompt_cache import usage_event_hooks
+        
+        key = (base_url, max_connections, timeout, asynchronous)
+        with self._lock:
+            http_client = self._http_clients.get(key)
+            if http_client is None:
+                client_class = httpx.AsyncClient if asynchronous else httpx.Client
+                http_client = client_class(
+                    timeout=timeout,
+                    event_hooks=usage_event_hooks(asynchronous),
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections
+                    )
+                )
+                self._http_clients[key] = http_client
+            return http_client
+    
+    def get_stats(self) -> dict:
+        """获取客户端复用统计"""
+        with self._lock:
+            clients = [dict(stats) for stats in self._stats.values()]
+            http_pools = len(self._http_clients)
+        
+        return {
+            'clients': len(clients),
+            'http_pools': http_pools,
+            'reuses': sum(client['reuses'] for client in clients),
+            'details': clients
+        }
+
+
+# 进程级共享客户端池
+llm_pool = LLMClientPool()
+
+
+def get_llm_pool_stats() -> dict:
+    """获取 LLM 客户端池统计"""
+    return llm_pool.get_stats()
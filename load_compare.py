@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+线程模式与异步模式负载对比
+分别启动 api_server.py（Flask 线程模式）和 asgi_server.py（异步模式），都接入本地模拟 LLM 服务，
+以相同的并发会话数跑完 上传 -> 开始面试 -> 多轮对话 -> 结束 流程，对比吞吐、延迟、服务端线程数和内存。
+
+用法：
+    python load_compare.py --concurrency 10 50 100 --turns 3 --ttft 0.5 --tokens-per-second 40
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from bench_utils import (
+    SERVER_SCRIPTS, ProcessSampler, free_port, make_resume_pdf, mock_llm, percentile,
+    start_process, stop_process, timed_request, upload_and_wait, wait_for_http, write_bench_config
+)
+
+
+async def run_session(client: httpx.AsyncClient, base_url: str, resume_id: str, turns: int,
+                      latencies: Dict[str, List[float]], errors: List[str]):
+    """跑完一场面试：开始 -> turns 轮对话 -> 结束"""
+    try:
+        response = await timed_request(
+            client, latencies, 'start', 'POST', f"{base_url}/api/interview/start",
+            json={'resume_id': resume_id}
+        )
+        if response.status_code != 200:
+            errors.append(f"start {response.status_code}")
+            return
+        session_id = response.json()['session_id']
+        
+        for turn in range(turns):
+            response = await timed_request(
+                client, latencies, 'message', 'POST', f"{base_url}/api/interview/message",
+                json={'session_id': session_id, 'message': f"第 {turn + 1} 轮回答：我负责了缓存和消息队列的设计。"}
+            )
+            if response.status_code != 200:
+                errors.append(f"message {response.status_code}")
+                return
+        
+        await timed_request(
+            client, latencies, 'end', 'POST', f"{base_url}/api/interview/end",
+            json={'session_id': session_id}
+        )
+    except httpx.HTTPError as e:
+        errors.append(type(e).__name__)
+
+
+async def run_load(base_url: str, pid: int, resume_path: Path, concurrency: int, turns: int) -> dict:
+    """以 concurrency 个并发会话压测一次，返回结果汇总"""
+    latencies: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=concurrency + 10, max_keepalive_connections=concurrency + 10)
+    
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+        resume_id = await upload_and_wait(client, base_url, resume_path, latencies)
+        
+        sampler = ProcessSampler(pid)
+        sampler.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_session(client, base_url, resume_id, turns, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        await sampler.stop()
+    
+    turn_latencies = latencies.get('start', []) + latencies.get('message', [])
+    return {
+        'concurrency': concurrency,
+        'turns': turns,
+        'elapsed_seconds': round(elapsed, 2),
+        'completed_turns': len(turn_latencies),
+        'turns_per_second': round(len(turn_latencies) / elapsed, 2) if elapsed else 0.0,
+        'message_p50_ms': int(percentile(latencies.get('message', []), 50) * 1000),
+        'message_p95_ms': int(percentile(latencies.get('message', []), 95) * 1000),
+        'start_p50_ms': int(percentile(latencies.get('start', []), 50) * 1000),
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:5],
+        'peak_threads': sampler.peak_threads,
+        'peak_rss_mb': round(sampler.peak_rss_bytes / 1024 / 1024, 1),
+    }
+
+
+def run_mode(mode: str, workdir: Path, llm_url: str, resume_path: Path,
+             concurrency_levels: List[int], turns: int) -> List[dict]:
+    """启动指定模式的服务器并依次跑完各并发级别"""
+    port = free_port()
+    config_path = workdir / f"config.{mode}.ini"
+    write_bench_config(
+        config_path, llm_url, port,
+        max_sessions=max(concurrency_levels) * 2,
+        cache_path=workdir / f"embeddings.{mode}.sqlite3"
+    )
+    
+    server = start_process(
+        [SERVER_SCRIPTS[mode]],
+        env={'RESUME_ROASTER_CONFIG': str(config_path)},
+        log_path=workdir / f"server.{mode}.log"
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_http(f"{base_url}/api/health", server)
+        results = []
+        for concurrency in concurrency_levels:
+            print(f"  [{mode}] 并发会话 {concurrency} ...", flush=True)
+            result = asyncio.run(run_load(base_url, server.pid, resume_path, concurrency, turns))
+            result['mode'] = mode
+            results.append(result)
+        return results
+    finally:
+        stop_process(server)
+
+
+def print_results(results: List[dict]):
+    columns = [
+        ('mode', '模式'), ('concurrency', '并发'), ('turns_per_second', '轮/秒'),
+        ('message_p50_ms', '消息p50(ms)'), ('message_p95_ms', '消息p95(ms)'),
+        ('start_p50_ms', '开始p50(ms)'), ('peak_threads', '峰值线程'),
+        ('peak_rss_mb', '峰值内存(MB)'), ('errors', '错误'),
+    ]
+    print("\n" + "  ".join(f"{title:>12}" for _, title in columns))
+    for result in results:
+        print("  ".join(f"{str(result[key]):>12}" for key, _ in columns))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="线程模式与异步模式负载对比（使用本地模拟 LLM 服务）")
+    parser.add_argument('--modes', nargs='+', choices=list(SERVER_SCRIPTS), default=list(SERVER_SCRIPTS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[10, 50, 100], help="并发会话数")
+    parser.add_argument('--turns', type=int, default=3, help="每场面试的对话轮数")
+    parser.add_argument('--ttft', type=float, default=0.5, help="模拟 LLM 首字延迟（秒）")
+    parser.add_argument('--tokens-per-second', type=float, default=40, help="模拟 LLM 生成速度")
+    parser.add_argument('--reply-tokens', type=int, default=60, help="模拟 LLM 每次回答的 Token 数")
+    parser.add_argument('--resume', type=Path, help="使用指定的简历 PDF（默认生成一份示例简历）")
+    parser.add_argument('--output', type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix='resume_roaster_bench_') as tmp:
+        workdir = Path(tmp)
+        resume_path = args.resume or workdir / "sample_resume.pdf"
+        if args.resume is None:
+            make_resume_pdf(resume_path)
+        
+        with mock_llm(workdir, args.ttft, args.tokens_per_second, args.reply_tokens) as llm_url:
+            results = []
+            for mode in args.modes:
+                results.extend(run_mode(mode, workdir, llm_url, resume_path, args.concurrency, args.turns))
+    
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,28 +8,115 @@
 import os
 import sys
 import configparser
+import asyncio
+import importlib
+import threading
+import time
 from pathlib import Path
-
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, Optional
+
+# LangChain、Chroma 等重量级依赖在首次使用时才导入（见各函数内的 import），
+# 命令行和 API 服务器启动时不需要等待它们加载
+from embeddings import get_embeddings, get_model_key, warmup_embeddings
+from llm_pool import llm_pool
+from metrics import observe_stage, timed_stage
+from pdf_extract import extract_pdf_pages
+from resume_context import apply_context_stats, build_full_context, get_context_mode, is_full_context
+from token_counter import count_tokens
+
+if TYPE_CHECKING:
+    from chain_components import StageTimingCallback
+
+
+# 让面试官提出第一个问题时发送的消息
+FIRST_QUESTION_PROMPT = "请开始面试"
+
+# 首次使用前需要导入的重量级模块（按依赖顺序），启动后在后台预先导入
+HEAVY_MODULES = [
+    'langchain_core',
+    'chain_components',
+    'langchain.chains',
+    'langchain.memory',
+    'langchain_text_splitters',
+    'interview_memory',
+    'interview_chain',
+]
+# 各向量索引后端对应的模块
+VECTOR_STORE_MODULES = {
+    'chroma': ['langchain_community.vectorstores.chroma', 'chromadb'],
+    'numpy': ['numpy_vector_store'],
+}
+# 各 LLM 服务商对应的客户端模块
+PROVIDER_MODULES = {
+    'deepseek': 'langchain_openai',
+    'google': 'langchain_google_genai',
+}
+
+# 配置文件缓存：只有文件修改后才重新读取
+_config_cache = {'mtime': None, 'config': None}
+_config_lock = threading.Lock()
 
 
 def load_config():
-    """加载配置文件"""
-    config = configparser.ConfigParser()
-    config_path = Path(__file__).parent / "config.ini"
+    """加载配置文件（按修改时间缓存，返回的配置对象为共享实例，请勿修改）
+    
+    默认读取项目目录下的 config.ini，可通过环境变量 RESUME_ROASTER_CONFIG 指定其他配置文件
+    """
+    config_path = Path(os.environ.get('RESUME_ROASTER_CONFIG') or Path(__file__).parent / "config.ini")
     
     if not config_path.exists():
         print("错误：找不到 config.ini 配置文件！")
         return None
     
-    config.read(config_path, encoding='utf-8')
-    return config
+    mtime = config_path.stat().st_mtime_ns
+    with _config_lock:
+        if _config_cache['config'] is not None and _config_cache['mtime'] == mtime:
+            return _config_cache['config']
+        
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding='utf-8')
+        _config_cache['mtime'] = mtime
+        _config_cache['config'] = config
+        return config
+
+
+def preload_dependencies(config=None, load_embeddings: bool = True, verbose: bool = True) -> Dict[str, float]:
+    """导入重量级依赖并预热 Embedding 模型，返回各项耗时（秒），未安装的模块记为 -1
+    
+    已导入的模块耗时接近 0；与首次请求并发执行也是安全的（导入和模型加载都有锁）
+    """
+    modules = list(HEAVY_MODULES)
+    if config is not None:
+        modules.extend(VECTOR_STORE_MODULES.get(get_vector_store_backend(config), []))
+        provider_module = PROVIDER_MODULES.get(config.get('DEFAULT', 'provider', fallback='').lower())
+        if provider_module:
+            modules.append(provider_module)
+    
+    profile = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            if verbose:
+                print(f"警告：预加载模块 {name} 失败：{e}")
+            profile[name] = -1
+            continue
+        profile[name] = round(time.perf_counter() - start, 3)
+    
+    if config is not None and load_embeddings:
+        start = time.perf_counter()
+        warmup_embeddings(config, verbose)
+        profile['embedding_model'] = round(time.perf_counter() - start, 3)
+    
+    return profile
+
+
+def format_profile(profile: Dict[str, float], limit: int = 5) -> str:
+    """按耗时从高到低列出前 limit 项"""
+    items = sorted(((name, seconds) for name, seconds in profile.items() if seconds >= 0),
+                   key=lambda item: item[1], reverse=True)
+    return "，".join(f"{name} {seconds:.2f}s" for name, seconds in items[:limit])
 
 
 def print_banner(style='critical'):
@@ -48,8 +135,9 @@ def print_banner(style='critical'):
 
 
 def get_llm(config):
-    """根据配置创建 LLM"""
+    """根据配置获取 LLM（按服务商、模型和温度复用客户端）"""
     provider = config.get('DEFAULT', 'provider').lower()
+    temperature = config.getfloat('llm', 'temperature', fallback=0.7)
     
     if provider == 'deepseek':
         from langchain_openai import ChatOpenAI
@@ -62,13 +150,24 @@ def get_llm(config):
             print("申请地址：https://platform.deepseek.com/api_keys")
             return None
         
-        print(f"使用 DeepSeek API，模型：{model}")
-        return ChatOpenAI(
-            model_name=model,
-            openai_api_key=api_key,
-            openai_api_base=base_url,
-            temperature=0.7
-        )
+        def create():
+            print(f"使用 DeepSeek API，模型：{model}")
+            max_connections = config.getint('llm', 'max_connections', fallback=20)
+            timeout = config.getfloat('llm', 'timeout', fallback=120)
+            return ChatOpenAI(
+                model_name=model,
+                openai_api_key=api_key,
+                openai_api_base=base_url,
+                temperature=temperature,
+                # 流式响应也返回 usage（含提示词缓存命中数）
+                stream_usage=True,
+                http_client=llm_pool.get_http_client(base_url, max_connections, timeout),
+                http_async_client=llm_pool.get_http_client(
+                    base_url, max_connections, timeout, asynchronous=True
+                )
+            )
+        
+        return llm_pool.get((provider, model, temperature, base_url, api_key), create)
     
     elif provider == 'google':
         from langchain_google_genai import ChatGoogleGenerativeAI
@@ -80,13 +179,16 @@ def get_llm(config):
             print("申请地址：https://aistudio.google.com/apikey")
             return None
         
-        print(f"使用 Google Gemini API，模型：{model}")
-        return ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=api_key,
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
+        def create():
+            print(f"使用 Google Gemini API，模型：{model}")
+            return ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=temperature,
+                convert_system_message_to_human=True
+            )
+        
+        return llm_pool.get((provider, model, temperature, '', api_key), create)
     
     else:
         print(f"错误：不支持的 API 提供商 '{provider}'")
@@ -115,52 +217,67 @@ def get_resume_path():
     return path
 
 
+def parse_resume(pdf_path: Path, parallel: bool = True):
+    """解析简历 PDF，返回按页划分的文档列表（元数据与 PyPDFLoader 一致）
+
+    提取后端、按页并行和解析缓存见 [pdf] 配置；parallel 为 False 时不使用按页提取的进程池
+    """
+    from langchain_core.documents import Document
+    
+    with timed_stage('pdf_parse'):
+        pages = extract_pdf_pages(pdf_path, load_config(), parallel=parallel)
+        return [
+            Document(page_content=text, metadata={'source': str(pdf_path), 'page': page})
+            for page, text in enumerate(pages)
+        ]
+
+
+def split_resume(documents):
+    """将简历文档切分为文本块"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    
+    with timed_stage('chunking'):
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=500,
+            chunk_overlap=50,
+            separators=["\n\n", "\n", "。", "；", " ", ""],
+            add_start_index=True  # 用于在完整简历模式下还原原文
+        )
+        return text_splitter.split_documents(documents)
+
+
 def load_resume(pdf_path: Path):
     """加载并处理简历"""
     print(f"\n正在加载简历：{pdf_path.name}")
     
-    loader = PyPDFLoader(str(pdf_path))
-    documents = loader.load()
+    documents = parse_resume(pdf_path)
     
     if not documents:
         print("无法读取简历内容")
         return None
     
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-        separators=["\n\n", "\n", "。", "；", " ", ""]
-    )
-    chunks = text_splitter.split_documents(documents)
+    chunks = split_resume(documents)
     
     print(f"简历已加载，共 {len(chunks)} 个文本块")
     return chunks
 
 
-def get_interview_style_prompt(style: str) -> str:
-    """根据风格返回对应的面试官提示词"""
-    
-    styles = {
-        'critical': """你是一位经验丰富且极其刁钻的技术面试官。你的任务是根据候选人的简历内容，进行深入的技术面试。
+# 各风格面试官的角色设定和收尾指令（两种提示词布局共用）
+INTERVIEW_STYLES = {
+    'critical': {
+        'persona': """你是一位经验丰富且极其刁钻的技术面试官。你的任务是根据候选人的简历内容，进行深入的技术面试。
 
 面试风格：
 1. 针对简历中的具体项目和技术栈提问，不要泛泛而谈
 2. 追问细节，比如"你说用了Redis，那缓存穿透怎么处理的？"
 3. 适当施压，但保持专业和尊重
 4. 如果候选人回答模糊，继续追问直到得到具体答案
-5. 偶尔给予肯定，但不要轻易放过
-
-简历内容：
-{context}
-
-对话历史：
-{chat_history}
-
-候选人回答：{question}
-
-请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先简单介绍自己，然后根据简历提出第一个问题。""",
-        
-        'partner': """你是一位充满激情和共情能力的伙伴型面试官。你的任务是根据候选人的简历内容，进行有温度、有参与感的技术面试。
+5. 偶尔给予肯定，但不要轻易放过""",
+        'instruction': "请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先简单介绍自己，然后根据简历提出第一个问题。"
+    },
+    
+    'partner': {
+        'persona': """你是一位充满激情和共情能力的伙伴型面试官。你的任务是根据候选人的简历内容，进行有温度、有参与感的技术面试。
 
 面试风格：
 1. 以平等的伙伴姿态交流，营造轻松但专业的氛围
@@ -168,19 +285,12 @@ def get_interview_style_prompt(style: str) -> str:
 3. 善于捕捉候选人话语中的亮点，给予及时的肯定和鼓励
 4. 用共情的方式理解候选人遇到的困难，比如"我能理解这种情况，当时压力一定很大吧？"
 5. 通过分享自己的经验或见解，引发候选人更深入的思考和分享
-6. 保持热情和参与感，让候选人感受到你真的在倾听和理解
-
-简历内容：
-{context}
-
-对话历史：
-{chat_history}
-
-候选人回答：{question}
-
-请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先热情地介绍自己，然后以伙伴的姿态开始对话。""",
-        
-        'guide': """你是一位冷静理智、内心宽和的引导型面试官。你的任务是根据候选人的简历内容，通过巧妙的引导帮助候选人展现最佳状态。
+6. 保持热情和参与感，让候选人感受到你真的在倾听和理解""",
+        'instruction': "请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先热情地介绍自己，然后以伙伴的姿态开始对话。"
+    },
+    
+    'guide': {
+        'persona': """你是一位冷静理智、内心宽和的引导型面试官。你的任务是根据候选人的简历内容，通过巧妙的引导帮助候选人展现最佳状态。
 
 面试风格：
 1. 保持冷静、理智、审慎的专业态度，给人以可靠和值得信赖的感觉
@@ -188,96 +298,475 @@ def get_interview_style_prompt(style: str) -> str:
 3. 当候选人回答不够清晰时，不是直接质疑，而是提供思路提示，比如"你可以从技术选型、实现难点、优化方案这几个角度来谈谈"
 4. 用开放式问题激发候选人的思考，给予充分的表达空间
 5. 内心宽和，对候选人的不足保持理解和包容，但会温和地指出改进方向
-6. 善于总结和提炼候选人的观点，帮助其理清思路
+6. 善于总结和提炼候选人的观点，帮助其理清思路""",
+        'instruction': "请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先沉稳地介绍自己，然后以引导的方式开启对话。"
+    }
+}
 
-简历内容：
-{context}
 
-对话历史：
-{chat_history}
+def get_interview_style_prompt(style: str) -> str:
+    """根据风格返回对应的面试官提示词（classic 布局：简历内容、对话历史和候选人回答都填入同一段文本）"""
+    parts = INTERVIEW_STYLES.get(style, INTERVIEW_STYLES['critical'])
+    return (
+        f"{parts['persona']}\n\n"
+        "简历内容：\n{context}\n\n"
+        "对话历史：\n{chat_history}\n\n"
+        "候选人回答：{question}\n\n"
+        f"{parts['instruction']}"
+    )
 
-候选人回答：{question}
 
-请根据简历内容和对话历史，继续面试。如果是面试刚开始，请先沉稳地介绍自己，然后以引导的方式开启对话。"""
-    }
+def build_prefix_prompt(style: str, full_context: Optional[str] = None):
+    """构建前缀稳定的面试官提示词（prefix 布局）
+
+    系统消息（角色设定、完整简历）在整场面试中不变，对话历史按消息依次追加在其后，
+    只有最后一条消息（检索到的简历片段和候选人回答）每轮变化，
+    服务商的提示词前缀缓存可以命中系统消息和全部历史对话。
+    """
+    from langchain_core.messages import SystemMessage
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
     
-    return styles.get(style, styles['critical'])
+    parts = INTERVIEW_STYLES.get(style, INTERVIEW_STYLES['critical'])
+    if full_context is not None:
+        system = f"{parts['persona']}\n\n简历内容：\n{full_context}\n\n{parts['instruction']}"
+        human = "{question}"
+    else:
+        system = (
+            f"{parts['persona']}\n\n每轮候选人回答之前附有与回答相关的简历内容，请结合这些内容提问。"
+            f"\n\n{parts['instruction']}"
+        )
+        human = "相关简历内容：\n{context}\n\n候选人回答：{question}"
+    
+    # 系统消息直接作为消息对象传入，简历中的花括号不会被当作模板变量
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=system),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", human)
+    ])
+
+
+# 进程内共享的 Chroma 客户端：多个线程同时创建默认客户端会竞争初始化（default_tenant 连接失败）
+_chroma_client = None
+_chroma_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """获取进程内共享的 Chroma 客户端（首次调用时创建）"""
+    global _chroma_client
+    with _chroma_lock:
+        if _chroma_client is None:
+            import chromadb
+            _chroma_client = chromadb.EphemeralClient()
+        return _chroma_client
 
 
-def create_interview_chain(chunks, llm, config):
-    """创建面试问答链"""
-    print("正在初始化面试官大脑...")
+def get_vector_store_backend(config) -> str:
+    """向量索引后端：chroma 或 numpy
+
+    配置中没有 [vector_store] 段时沿用 chroma（按 L2 距离排序），避免已有部署的检索结果悄然变化
+    """
+    return config.get('vector_store', 'backend', fallback='chroma').lower()
+
+
+def build_resume_index(chunks, config, collection_name: str = "resume"):
+    """为简历文本块构建向量索引（每份简历使用独立的 collection）"""
+    # 获取进程内共享的 Embedding 模型（首次使用时加载）
+    embeddings = get_embeddings(config)
     
-    # 获取 Embedding 配置
-    embedding_type = config.get('embedding', 'type', fallback='local')
+    if get_vector_store_backend(config) == 'numpy':
+        from numpy_vector_store import build_numpy_index
+        with timed_stage('index_build'):
+            return build_numpy_index(chunks, embeddings, config, collection_name, model_key=get_model_key(config))
     
-    if embedding_type == 'deepseek':
-        # 使用 DeepSeek 兼容的 Embedding（实际调用 OpenAI 兼容接口）
-        from langchain_openai import OpenAIEmbeddings
-        print("正在连接 DeepSeek Embedding API...")
-        embeddings = OpenAIEmbeddings(
-            model=config.get('embedding', 'model', fallback='text-embedding-3-small'),
-            openai_api_key=config.get('deepseek', 'api_key'),
-            openai_api_base=config.get('deepseek', 'base_url')
-        )
-    else:
-        # 使用本地 Embedding 模型（免费，无需 API）
-        print("正在加载本地 Embedding 模型（首次需下载约400MB）...")
-        embeddings = HuggingFaceEmbeddings(
-            model_name=config.get('embedding', 'model', fallback='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'),
-            model_kwargs={'device': 'cpu'}
+    from langchain_community.vectorstores import Chroma
+    with timed_stage('index_build'):
+        return Chroma.from_documents(
+            documents=chunks,
+            embedding=embeddings,
+            collection_name=collection_name,
+            client=get_chroma_client()
         )
+
+
+def drop_resume_index(vectorstore):
+    """删除简历向量索引，释放 collection"""
+    if vectorstore is None:
+        return
     
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name="resume"
-    )
+    try:
+        vectorstore.delete_collection()
+    except Exception as e:
+        print(f"警告：删除简历索引失败：{e}")
+
+
+def purge_resume_index(config, collection_name: str):
+    """删除简历已持久化的向量索引文件（numpy 后端启用持久化时），只在简历被删除时调用"""
+    if get_vector_store_backend(config) != 'numpy':
+        return
     
-    # 对话记忆
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="answer"
-    )
+    from numpy_vector_store import delete_persisted_index
+    try:
+        delete_persisted_index(config, collection_name)
+    except Exception as e:
+        print(f"警告：删除简历索引文件失败：{e}")
+
+
+def create_interview_chain(chunks, llm, config, vectorstore=None, interview_style: Optional[str] = None,
+                           full_context: Optional[str] = None, verbose: bool = True):
+    """创建面试问答链
+    
+    full_context 为预先拼好的完整简历时直接作为上下文，不做检索；vectorstore 为已构建好的
+    简历索引时直接复用；两者都未提供时按 [interview] context_mode 决定，需要检索时现场构建索引。
+    interview_style 未指定时使用配置中的面试官风格；verbose 为 False 时不打印初始化信息（批量处理使用）
+    """
+    from langchain.chains import ConversationalRetrievalChain
+    from langchain.prompts import PromptTemplate
+    from chain_components import FullContextRetriever, PackedContextRetriever
+    from interview_chain import PROMPT_LAYOUT_CLASSIC, PROMPT_LAYOUT_PREFIX, InterviewChain
+    from interview_memory import create_memory
+    
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log("正在初始化面试官大脑...")
+    
+    if full_context is None and vectorstore is None:
+        full_context = build_full_context(chunks, config)
+    if full_context is None and vectorstore is None:
+        vectorstore = build_resume_index(chunks, config)
+    
+    # 对话记忆（完整记录或滚动摘要）
+    memory = create_memory(llm, config)
     
     # 获取面试官风格
-    interview_style = config.get('DEFAULT', 'interview_style', fallback='critical')
+    if interview_style is None:
+        interview_style = config.get('DEFAULT', 'interview_style', fallback='critical')
     style_names = {
         'critical': '刁钻型',
         'partner': '伙伴型',
         'guide': '引导型'
     }
-    print(f"面试官风格：{style_names.get(interview_style, '刁钻型')}")
+    log(f"面试官风格：{style_names.get(interview_style, '刁钻型')}")
+    
+    if full_context is not None:
+        log(f"上下文模式：完整简历（约 {count_tokens(full_context)} Token）")
+        retriever = FullContextRetriever(context=full_context)
+    else:
+        log("上下文模式：向量检索")
+        retriever = vectorstore.as_retriever(
+            search_kwargs={"k": config.getint('interview', 'retrieval_k', fallback=3)}
+        )
+        if config.getboolean('interview', 'context_packing', fallback=False):
+            # 合并相邻和重叠的文本块、去掉重复内容，控制在 Token 预算内
+            max_tokens = config.getint('interview', 'context_max_tokens', fallback=0)
+            log(f"检索结果整理：开启（{f'预算 {max_tokens} Token' if max_tokens > 0 else '不限预算'}）")
+            retriever = PackedContextRetriever(retriever=retriever, max_tokens=max_tokens)
+    
+    # 检索模式：single 每轮只调用一次 LLM；condense 先让 LLM 结合历史改写问题再检索（每轮两次调用）
+    retrieval_mode = config.get('interview', 'retrieval_mode', fallback='condense').lower()
+    # 提示词布局：classic 所有内容填入同一段文本；prefix 固定前缀 + 逐条追加的对话消息（仅 single 模式支持）
+    prompt_layout = config.get('interview', 'prompt_layout', fallback=PROMPT_LAYOUT_CLASSIC).lower()
+    if prompt_layout == PROMPT_LAYOUT_PREFIX and retrieval_mode != 'single':
+        log("提示：问题改写模式每轮的提示词都不同，prompt_layout = prefix 仅在 single 模式下生效")
     
     # 获取对应风格的面试官系统提示
-    system_template = get_interview_style_prompt(interview_style)
-
-    chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),
-        memory=memory,
-        return_source_documents=False,
-        combine_docs_chain_kwargs={
-            "prompt": PromptTemplate(
-                template=system_template,
-                input_variables=["context", "chat_history", "question"]
-            )
-        }
-    )
+    if prompt_layout == PROMPT_LAYOUT_PREFIX and retrieval_mode == 'single':
+        log("提示词布局：固定前缀（可命中服务商的提示词缓存）")
+        prompt = build_prefix_prompt(interview_style, full_context)
+    else:
+        prompt_layout = PROMPT_LAYOUT_CLASSIC
+        prompt = PromptTemplate(
+            template=get_interview_style_prompt(interview_style),
+            input_variables=["context", "chat_history", "question"]
+        )
+    
+    if retrieval_mode == 'single':
+        log("检索模式：单次调用")
+        chain = InterviewChain(
+            llm=llm,
+            retriever=retriever,
+            prompt=prompt,
+            memory=memory,
+            history_query_chars=config.getint('interview', 'history_query_chars', fallback=200),
+            prompt_layout=prompt_layout
+        )
+    else:
+        log("检索模式：问题改写")
+        chain = ConversationalRetrievalChain.from_llm(
+            llm=llm,
+            retriever=retriever,
+            memory=memory,
+            return_source_documents=False,
+            combine_docs_chain_kwargs={"prompt": prompt}
+        )
     
-    print("面试官已就绪！\n")
+    log("面试官已就绪！\n")
     return chain
 
 
+def _load_condense_history(chain):
+    """读取 ConversationalRetrievalChain 的对话历史，返回 (原始历史, 格式化后的历史文本)"""
+    from langchain.chains.conversational_retrieval.base import _get_chat_history
+    
+    memory = chain.memory
+    chat_history = memory.load_memory_variables({})[memory.memory_key]
+    get_chat_history = chain.get_chat_history or _get_chat_history
+    return chat_history, get_chat_history(chat_history)
+
+
+def _format_condense_prompt(chain, question: str, new_question: str, chat_history_str: str, docs):
+    """按 StuffDocumentsChain 的方式拼接简历内容并填充提示词"""
+    from langchain_core.prompts import format_document
+    
+    doc_chain = chain.combine_docs_chain
+    context = doc_chain.document_separator.join(
+        format_document(doc, doc_chain.document_prompt) for doc in docs
+    )
+    return doc_chain.llm_chain.prompt.format_prompt(**{
+        doc_chain.document_variable_name: context,
+        "question": new_question if chain.rephrase_question else question,
+        "chat_history": chat_history_str
+    })
+
+
+def is_single_call_chain(chain) -> bool:
+    """是否为单次调用面试链（InterviewChain），否则为问题改写模式的 ConversationalRetrievalChain"""
+    from interview_chain import InterviewChain
+    return isinstance(chain, InterviewChain)
+
+
+def stream_interview(chain, question: str, stats: Optional[dict] = None) -> Iterator[str]:
+    """流式生成面试官回答，逐段返回文本
+    
+    与 chain.invoke 走相同的流程（问题改写 -> 检索 -> 生成），但最后一次 LLM 调用
+    使用 stream 边生成边返回。结束后写入对话记忆；传入 stats 时记录首字延迟、总耗时
+    和本轮 LLM 调用次数。
+    """
+    if is_single_call_chain(chain):
+        yield from chain.stream(question, stats)
+        return
+    
+    from prompt_cache import apply_cache_stats, capture_usage
+    
+    start = time.perf_counter()
+    memory = chain.memory
+    
+    # 对话历史
+    chat_history, chat_history_str = _load_condense_history(chain)
+    
+    # 有历史时先结合历史改写问题，再用改写后的问题检索
+    usages = []
+    if chat_history:
+        question_generator = chain.question_generator
+        with timed_stage('condense_question'), capture_usage() as usages:
+            new_question = question_generator.invoke({
+                "question": question,
+                "chat_history": chat_history_str
+            })[question_generator.output_key]
+    else:
+        new_question = question
+    
+    if is_full_context(chain.retriever):
+        docs = chain.retriever.documents
+    else:
+        with timed_stage('retrieval'):
+            docs = chain.retriever.invoke(new_question)
+    prompt_value = _format_condense_prompt(chain, question, new_question, chat_history_str, docs)
+    
+    parts = []
+    ttft = None
+    generation_start = time.perf_counter()
+    with capture_usage() as generation_usages:
+        for chunk in chain.combine_docs_chain.llm_chain.llm.stream(prompt_value):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if not text:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+                observe_stage('llm_ttft', time.perf_counter() - generation_start)
+            parts.append(text)
+            yield text
+    observe_stage('llm_generation', time.perf_counter() - generation_start)
+    
+    answer = "".join(parts)
+    from interview_memory import save_turn
+    summary_calls = save_turn(memory, question, answer)
+    
+    if stats is not None:
+        stats['answer'] = answer
+        stats['llm_calls'] = (2 if chat_history else 1) + summary_calls
+        stats['prompt_tokens'] = count_tokens(prompt_value.to_string())
+        stats['context_mode'] = get_context_mode(chain)
+        apply_context_stats(stats, docs)
+        apply_cache_stats(stats, usages + generation_usages)
+        stats['ttft_seconds'] = round(ttft if ttft is not None else time.perf_counter() - start, 3)
+        stats['total_seconds'] = round(time.perf_counter() - start, 3)
+
+
+async def astream_interview(chain, question: str, stats: Optional[dict] = None) -> AsyncIterator[str]:
+    """stream_interview 的异步版本（异步服务模式使用），等待 LLM 期间不占用线程"""
+    if is_single_call_chain(chain):
+        async for text in chain.astream(question, stats):
+            yield text
+        return
+    
+    from prompt_cache import apply_cache_stats, capture_usage
+    
+    start = time.perf_counter()
+    memory = chain.memory
+    chat_history, chat_history_str = _load_condense_history(chain)
+    
+    usages = []
+    if chat_history:
+        question_generator = chain.question_generator
+        with timed_stage('condense_question'), capture_usage() as usages:
+            new_question = (await question_generator.ainvoke({
+                "question": question,
+                "chat_history": chat_history_str
+            }))[question_generator.output_key]
+    else:
+        new_question = question
+    
+    if is_full_context(chain.retriever):
+        docs = chain.retriever.documents
+    else:
+        with timed_stage('retrieval'):
+            docs = await chain.retriever.ainvoke(new_question)
+    prompt_value = _format_condense_prompt(chain, question, new_question, chat_history_str, docs)
+    
+    parts = []
+    ttft = None
+    generation_start = time.perf_counter()
+    with capture_usage() as generation_usages:
+        async for chunk in chain.combine_docs_chain.llm_chain.llm.astream(prompt_value):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if not text:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+                observe_stage('llm_ttft', time.perf_counter() - generation_start)
+            parts.append(text)
+            yield text
+    observe_stage('llm_generation', time.perf_counter() - generation_start)
+    
+    answer = "".join(parts)
+    # 滚动摘要可能触发同步 LLM 调用，放到线程池中执行
+    loop = asyncio.get_running_loop()
+    from interview_memory import save_turn
+    summary_calls = await loop.run_in_executor(None, save_turn, memory, question, answer)
+    
+    if stats is not None:
+        stats['answer'] = answer
+        stats['llm_calls'] = (2 if chat_history else 1) + summary_calls
+        stats['prompt_tokens'] = count_tokens(prompt_value.to_string())
+        stats['context_mode'] = get_context_mode(chain)
+        apply_context_stats(stats, docs)
+        apply_cache_stats(stats, usages + generation_usages)
+        stats['ttft_seconds'] = round(ttft if ttft is not None else time.perf_counter() - start, 3)
+        stats['total_seconds'] = round(time.perf_counter() - start, 3)
+
+
+def record_llm_stages(timer: 'StageTimingCallback', has_history: bool):
+    """将 ConversationalRetrievalChain 内部的 LLM 调用耗时记入对应阶段（有历史时第一次调用为问题改写）"""
+    durations = timer.llm_durations
+    if has_history and len(durations) > 1:
+        observe_stage('condense_question', durations[0])
+    if durations:
+        observe_stage('llm_generation', durations[-1])
+
+
+def invoke_interview(chain, question: str, stats: Optional[dict] = None) -> str:
+    """生成面试官回答（非流式），传入 stats 时记录本轮 LLM 调用次数、提示词 Token 数和上下文模式"""
+    if is_single_call_chain(chain):
+        response = chain.invoke({"question": question})
+        if stats is not None:
+            stats['llm_calls'] = response['llm_calls']
+            stats['prompt_tokens'] = response['prompt_tokens']
+            stats['context_mode'] = response['context_mode']
+            stats.update({key: value for key, value in response.items()
+                          if key.startswith(('prompt_cache_', 'context_tokens_'))})
+        return response['answer']
+    
+    # 有对话历史时 ConversationalRetrievalChain 会先额外调用一次 LLM 改写问题
+    memory = chain.memory
+    has_history = bool(memory.load_memory_variables({})[memory.memory_key])
+    summary_calls = getattr(memory, 'summary_calls', 0)
+    
+    from chain_components import PromptTokenCounter, StageTimingCallback
+    from prompt_cache import apply_cache_stats, capture_usage
+    
+    counter = PromptTokenCounter()
+    timer = StageTimingCallback()
+    with capture_usage() as usages:
+        response = chain.invoke({"question": question}, config={"callbacks": [counter, timer]})
+    record_llm_stages(timer, has_history)
+    
+    if stats is not None:
+        stats['llm_calls'] = (2 if has_history else 1) + getattr(memory, 'summary_calls', 0) - summary_calls
+        stats['prompt_tokens'] = counter.last or 0
+        stats['context_mode'] = get_context_mode(chain)
+        apply_context_stats(stats, timer.documents)
+        apply_cache_stats(stats, usages)
+    return response['answer']
+
+
+async def ainvoke_interview(chain, question: str, stats: Optional[dict] = None) -> str:
+    """invoke_interview 的异步版本（异步服务模式使用）"""
+    if is_single_call_chain(chain):
+        response = await chain.ainvoke({"question": question})
+        if stats is not None:
+            stats['llm_calls'] = response['llm_calls']
+            stats['prompt_tokens'] = response['prompt_tokens']
+            stats['context_mode'] = response['context_mode']
+            stats.update({key: value for key, value in response.items()
+                          if key.startswith(('prompt_cache_', 'context_tokens_'))})
+        return response['answer']
+    
+    memory = chain.memory
+    has_history = bool(memory.load_memory_variables({})[memory.memory_key])
+    summary_calls = getattr(memory, 'summary_calls', 0)
+    
+    from chain_components import PromptTokenCounter, StageTimingCallback
+    from prompt_cache import apply_cache_stats, capture_usage
+    
+    counter = PromptTokenCounter()
+    timer = StageTimingCallback()
+    with capture_usage() as usages:
+        response = await chain.ainvoke({"question": question}, config={"callbacks": [counter, timer]})
+    record_llm_stages(timer, has_history)
+    
+    if stats is not None:
+        stats['llm_calls'] = (2 if has_history else 1) + getattr(memory, 'summary_calls', 0) - summary_calls
+        stats['prompt_tokens'] = counter.last or 0
+        stats['context_mode'] = get_context_mode(chain)
+        apply_context_stats(stats, timer.documents)
+        apply_cache_stats(stats, usages)
+    return response['answer']
+
+
+def print_streamed_answer(chain, question: str):
+    """在命令行中逐字打印面试官回答，并显示首字延迟
+    
+    服务商返回缓存信息时同时显示提示词缓存命中数，整理检索结果时显示简历内容整理前后的 Token 数
+    """
+    stats = {}
+    print("[面试官]：", end="", flush=True)
+    for text in stream_interview(chain, question, stats):
+        print(text, end="", flush=True)
+    cache = ""
+    if 'prompt_cache_hit_tokens' in stats:
+        hit = stats['prompt_cache_hit_tokens']
+        cache = f"，提示词缓存命中 {hit}/{hit + stats['prompt_cache_miss_tokens']} Token"
+    if 'context_tokens_packed' in stats:
+        cache += f"，简历内容 {stats['context_tokens_raw']} -> {stats['context_tokens_packed']} Token"
+    print(f"\n（首字延迟 {stats['ttft_seconds']:.2f}s，总耗时 {stats['total_seconds']:.2f}s{cache}）\n")
+
+
 def run_interview(chain):
     """运行面试对话"""
     print("-" * 50)
     print("提示：输入 'quit' 或 'exit' 结束面试")
     print("-" * 50 + "\n")
     
-    response = chain.invoke({"question": "请开始面试"})
-    print(f"[面试官]：{response['answer']}\n")
+    print_streamed_answer(chain, FIRST_QUESTION_PROMPT)
     
     while True:
         user_input = input("[你]：").strip()
@@ -290,8 +779,8 @@ def run_interview(chain):
             break
         
         try:
-            response = chain.invoke({"question": user_input})
-            print(f"\n[面试官]：{response['answer']}\n")
+            print()
+            print_streamed_answer(chain, user_input)
         except Exception as e:
             print(f"\n出错了：{e}\n")
 
@@ -309,6 +798,12 @@ def main():
     # 打印横幅
     print_banner(interview_style)
     
+    # 用户输入简历路径期间在后台导入 LangChain 并加载 Embedding 模型
+    threading.Thread(
+        target=preload_dependencies, args=(config,), kwargs={'verbose': False},
+        name='preload', daemon=True
+    ).start()
+    
     # 获取简历路径
     resume_path = get_resume_path()
     if not resume_path:
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标
+进程内的计数器和直方图（各处理阶段耗时、Token 数、接口延迟），以及按需采集的状态指标，
+按 Prometheus 文本格式导出（/api/metrics）
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+# 耗时直方图的桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Token 数直方图的桶
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    """单调递增计数器"""
+    
+    metric_type = 'counter'
+    
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple((name, str(labels.get(name, ''))) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """累计分桶直方图（与 Prometheus histogram 语义一致）"""
+    
+    metric_type = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float],
+                 label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.label_names = label_names
+        # 标签 -> [各桶计数, 总和, 次数]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = tuple((name, str(labels.get(name, ''))) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        samples = []
+        with self._lock:
+            series_items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series_items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (('le', _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+    
+    def summary(self) -> Dict[str, dict]:
+        """按第一个标签汇总次数和平均值（用于 /api/stats）"""
+        with self._lock:
+            series_items = [(key, total, count) for key, (_, total, count) in self._series.items()]
+        result = {}
+        for key, total, count in series_items:
+            name = ','.join(value for _, value in key) or self.name
+            result[name] = {
+                'count': count,
+                'total_seconds': round(total, 3),
+                'mean_ms': round(total / count * 1000, 2) if count else 0.0
+            }
+        return result
+
+
+class MetricsRegistry:
+    """指标注册表：进程内指标 + 导出时调用的采集函数"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+        self._lock = threading.Lock()
+    
+    def _get_or_create(self, name: str, factory: Callable[[], object]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+    
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help_text, label_names))
+    
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float],
+                  label_names: Tuple[str, ...] = ()) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help_text, buckets, label_names))
+    
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        """注册采集函数，导出时调用
+
+        采集函数返回 (指标名, 类型 gauge/counter, 说明, [(标签字典, 数值), ...]) 的序列
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f"# 采集失败：{e}")
+                continue
+            for name, metric_type, help_text, values in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in values:
+                    label_items = tuple(sorted((labels or {}).items()))
+                    lines.append(f"{name}{_format_labels(label_items)} {_format_value(value or 0)}")
+        
+        return "\n".join(lines) + "\n"
+
+
+# 进程级共享注册表
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'resume_roaster_stage_seconds',
+    '各处理阶段耗时（秒）',
+    LATENCY_BUCKETS,
+    ('stage',)
+)
+token_count = registry.histogram(
+    'resume_roaster_tokens',
+    '每轮对话的 Token 数（prompt 为生成回答时的提示词，completion 为回答）',
+    TOKEN_BUCKETS,
+    ('kind',)
+)
+http_request_seconds = registry.histogram(
+    'resume_roaster_http_request_seconds',
+    'API 请求耗时（秒，流式接口统计到响应结束）',
+    LATENCY_BUCKETS,
+    ('method', 'endpoint', 'status')
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    """记录一次阶段耗时"""
+    stage_seconds.observe(seconds, stage=stage)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """统计代码块耗时（异常时同样记录）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+
+def observe_tokens(kind: str, count: int):
+    """记录一次 Token 数"""
+    token_count.observe(count, kind=kind)
+
+
+def observe_request(method: str, endpoint: str, status: int, seconds: float):
+    """记录一次 API 请求耗时"""
+    http_request_seconds.observe(seconds, method=method, endpoint=endpoint, status=status)
+
+
+def get_stage_stats() -> Dict[str, dict]:
+    """各阶段耗时汇总"""
+    return stage_seconds.summary()
+
+
+def render_metrics() -> str:
+    """导出全部指标（Prometheus 文本格式）"""
+    return registry.render()
+
+
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟 LLM 服务（OpenAI 兼容接口）
+提供 /v1/chat/completions（支持流式）和 /v1/embeddings，按配置的首字延迟和生成速度返回，
+用于在不调用真实 DeepSeek API 的情况下压测和对比 API 服务器。
+与 DeepSeek 一样模拟提示词前缀缓存：按 64 Token 的块缓存出现过的提示词前缀，usage 中返回命中数；
+设置 --prefill-tokens-per-second 后未命中缓存的提示词 Token 会额外增加首字延迟。
+
+用法：
+    python mock_llm_server.py --port 8900 --ttft 0.5 --tokens-per-second 40
+然后在 config.ini 中设置 [deepseek] base_url = http://127.0.0.1:8900/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+# 模拟回答的文本片段，每个片段作为一个 Token 返回
+REPLY_TOKENS = [
+    "你", "提到", "在", "项目", "中", "使用", "了", " Redis", "，",
+    "请", "具体", "说明", "缓存", "与", "数据库", "如何", "保证", "一致性", "？",
+    "如果", "出现", "缓存", "击穿", "，", "你", "会", "怎么", "处理", "？"
+]
+
+mock_config = {
+    'ttft': 0.5,                 # 首个 Token 前的等待时间（秒）
+    'tokens_per_second': 40.0,   # 生成速度
+    'reply_tokens': 60,          # 每次回答的 Token 数
+    'embedding_dim': 384,        # Embedding 向量维度
+    'embedding_latency': 0.02,   # 每次 Embedding 请求的等待时间（秒）
+    'prefill_tokens_per_second': 0.0,  # 未命中缓存的提示词 Token 的处理速度，0 表示不计入首字延迟
+}
+
+mock_stats = {'chat_requests': 0, 'stream_requests': 0, 'embedding_requests': 0, 'embedded_texts': 0,
+              'prompt_tokens': 0, 'prompt_cache_hit_tokens': 0}
+
+# 前缀缓存的块大小（Token）和最多缓存的块数
+PREFIX_CACHE_BLOCK = 64
+PREFIX_CACHE_MAX_BLOCKS = 200000
+prefix_cache = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 Token 数（与 token_counter 的估算方式一致）"""
+    cjk = sum(1 for ch in text if '\u3400' <= ch <= '\u9fff')
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def prompt_text(body: dict) -> str:
+    return "\n".join(str(message.get('content', '')) for message in body.get('messages', []))
+
+
+def reply_tokens():
+    count = mock_config['reply_tokens']
+    return [REPLY_TOKENS[i % len(REPLY_TOKENS)] for i in range(count)]
+
+
+def cache_prefix(prompt: str) -> int:
+    """模拟前缀缓存：返回命中缓存的 Token 数，并缓存本次提示词的各个前缀块"""
+    keys = []
+    digest = hashlib.sha256()
+    tokens = 0
+    block_start = 0
+    for i, ch in enumerate(prompt):
+        tokens += 4 if '\u3400' <= ch <= '\u9fff' else 1
+        # 按 estimate_tokens 的口径（中文字符 1 Token，其他字符 1/4 Token）每满一块记录一个前缀
+        if tokens >= PREFIX_CACHE_BLOCK * 4 * (len(keys) + 1):
+            digest.update(prompt[block_start:i + 1].encode('utf-8'))
+            keys.append(digest.hexdigest())
+            block_start = i + 1
+    
+    hit_blocks = 0
+    for key in keys:
+        if key not in prefix_cache:
+            break
+        hit_blocks += 1
+    
+    if len(prefix_cache) > PREFIX_CACHE_MAX_BLOCKS:
+        prefix_cache.clear()
+    prefix_cache.update(keys)
+    return hit_blocks * PREFIX_CACHE_BLOCK
+
+
+def usage(prompt: str, completion_tokens: int) -> dict:
+    """与 DeepSeek 相同格式的 usage（含提示词缓存命中/未命中 Token 数）"""
+    prompt_tokens = estimate_tokens(prompt)
+    hit_tokens = min(cache_prefix(prompt), prompt_tokens)
+    mock_stats['prompt_tokens'] += prompt_tokens
+    mock_stats['prompt_cache_hit_tokens'] += hit_tokens
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_cache_hit_tokens': hit_tokens,
+        'prompt_cache_miss_tokens': prompt_tokens - hit_tokens,
+        'prompt_tokens_details': {'cached_tokens': hit_tokens}
+    }
+
+
+def prefill_delay(usage_data: dict) -> float:
+    """未命中缓存的提示词 Token 的处理时间"""
+    speed = mock_config['prefill_tokens_per_second']
+    return usage_data['prompt_cache_miss_tokens'] / speed if speed > 0 else 0.0
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get('model', 'mock-chat')
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    tokens = reply_tokens()
+    interval = 1.0 / mock_config['tokens_per_second'] if mock_config['tokens_per_second'] > 0 else 0
+    usage_data = usage(prompt_text(body), len(tokens))
+    ttft = mock_config['ttft'] + prefill_delay(usage_data)
+    
+    if not body.get('stream'):
+        mock_stats['chat_requests'] += 1
+        await asyncio.sleep(ttft + interval * len(tokens))
+        return JSONResponse({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': "".join(tokens)},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage_data
+        })
+    
+    mock_stats['stream_requests'] += 1
+    include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+    
+    def chunk(delta: dict, finish_reason=None) -> str:
+        data = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    async def generate():
+        await asyncio.sleep(ttft)
+        yield chunk({'role': 'assistant', 'content': ''})
+        for token in tokens:
+            yield chunk({'content': token})
+            await asyncio.sleep(interval)
+        yield chunk({}, finish_reason='stop')
+        if include_usage:
+            data = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                    'model': model, 'choices': [], 'usage': usage_data}
+            yield f"data: {json.dumps(data)}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(generate(), media_type='text/event-stream')
+
+
+def fake_vector(text: str, dim: int):
+    """由文本哈希生成确定性的单位向量（相同文本得到相同向量）"""
+    values = []
+    seed = hashlib.sha256(text.encode('utf-8')).digest()
+    while len(values) < dim:
+        seed = hashlib.sha256(seed).digest()
+        values.extend((byte - 127.5) / 127.5 for byte in seed)
+    values = values[:dim]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get('input', [])
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    
+    mock_stats['embedding_requests'] += 1
+    mock_stats['embedded_texts'] += len(inputs)
+    await asyncio.sleep(mock_config['embedding_latency'])
+    
+    dim = mock_config['embedding_dim']
+    return JSONResponse({
+        'object': 'list',
+        'model': body.get('model', 'mock-embedding'),
+        'data': [
+            {'object': 'embedding', 'index': i, 'embedding': fake_vector(str(text), dim)}
+            for i, text in enumerate(inputs)
+        ],
+        'usage': {'prompt_tokens': 0, 'total_tokens': 0}
+    })
+
+
+async def stats(request: Request):
+    return JSONResponse({'config': mock_config, 'stats': mock_stats})
+
+
+app = Starlette(routes=[
+    Route('/v1/chat/completions', chat_completions, methods=['POST']),
+    Route('/v1/embeddings', embeddings, methods=['POST']),
+    Route('/stats', stats, methods=['GET']),
+])
+
+
+def main():
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="本地模拟 LLM 服务（OpenAI 兼容接口）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--ttft', type=float, default=mock_config['ttft'], help="首字延迟（秒）")
+    parser.add_argument('--tokens-per-second', type=float, default=mock_config['tokens_per_second'], help="生成速度")
+    parser.add_argument('--reply-tokens', type=int, default=mock_config['reply_tokens'], help="每次回答的 Token 数")
+    parser.add_argument('--embedding-dim', type=int, default=mock_config['embedding_dim'])
+    parser.add_argument('--embedding-latency', type=float, default=mock_config['embedding_latency'])
+    parser.add_argument('--prefill-tokens-per-second', type=float, default=mock_config['prefill_tokens_per_second'],
+                        help="未命中缓存的提示词处理速度（Token/s），0 表示不模拟")
+    args = parser.parse_args()
+    
+    mock_config.update({
+        'ttft': args.ttft,
+        'tokens_per_second': args.tokens_per_second,
+        'reply_tokens': args.reply_tokens,
+        'embedding_dim': args.embedding_dim,
+        'embedding_latency': args.embedding_latency,
+        'prefill_tokens_per_second': args.prefill_tokens_per_second,
+    })
+    
+    print(f"模拟 LLM 服务：http://{args.host}:{args.port}/v1 "
+          f"（首字延迟 {args.ttft}s，{args.tokens_per_second} Token/s，每次 {args.reply_tokens} Token）")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy 内存向量索引
+一份简历只有几个到几十个文本块，Chroma 的 SQLite 客户端、collection 管理和每次调用的开销远大于检索本身。
+这里把每份简历的向量（归一化后）保存在一个连续的 float32 / float16 矩阵中，检索时直接做矩阵乘法取余弦相似度 top-k。
+实现了 LangChain VectorStore 接口，as_retriever() 等用法与 Chroma 一致。
+
+可选持久化：索引保存为 vectors.npy + index.json，加载时以内存映射方式打开；多进程部署时各工作进程
+读取同一份简历的索引共享操作系统页缓存，重启后也无需重新查询向量缓存。
+"""
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+
+DEFAULT_PERSIST_PATH = 'cache/vector_index'
+VECTORS_FILE = 'vectors.npy'
+INDEX_FILE = 'index.json'
+SUPPORTED_DTYPES = ('float32', 'float16')
+
+
+def _normalize(vectors) -> np.ndarray:
+    """转为 float32 并按行归一化（零向量保持为零）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class NumpyVectorStore(VectorStore):
+    """基于 NumPy 矩阵的暴力检索向量索引（按余弦相似度排序）
+
+    写入时整体替换矩阵，检索只读取当前矩阵的引用，多个会话线程可以同时检索
+    """
+    
+    def __init__(self, embedding, dtype: str = 'float32', collection_name: str = 'resume'):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"不支持的向量精度：{dtype}（可选 {', '.join(SUPPORTED_DTYPES)}）")
+        self._embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self.collection_name = collection_name
+        
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((0, 0), dtype=self.dtype)
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._ids: List[str] = []
+    
+    @property
+    def embeddings(self):
+        return self._embedding
+    
+    def __len__(self) -> int:
+        return len(self._texts)
+    
+    @property
+    def nbytes(self) -> int:
+        """向量矩阵占用的字节数"""
+        return self._matrix.nbytes
+    
+    def add_vectors(self, vectors, texts: List[str], metadatas: Optional[List[dict]] = None,
+                    ids: Optional[List[str]] = None) -> List[str]:
+        """直接写入已算好的向量"""
+        vectors = _normalize(vectors).astype(self.dtype)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        
+        with self._lock:
+            matrix = vectors if not len(self._texts) else np.vstack([self._matrix, vectors])
+            self._texts = self._texts + list(texts)
+            self._metadatas = self._metadatas + metadatas
+            self._ids = self._ids + ids
+            self._matrix = np.ascontiguousarray(matrix)
+        return ids
+    
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(self._embedding.embed_documents(texts), texts, metadatas, ids)
+    
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """按向量检索，返回 (文本块, 余弦相似度)，相似度从高到低"""
+        with self._lock:
+            matrix, texts, metadatas = self._matrix, self._texts, self._metadatas
+        if not texts or k <= 0:
+            return []
+        
+        query = _normalize(embedding)[0]
+        scores = np.asarray(matrix @ query, dtype=np.float32)
+        k = min(k, len(texts))
+        if k < len(texts):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            top = np.argsort(-scores, kind='stable')
+        return [
+            (Document(page_content=texts[i], metadata=dict(metadatas[i])), float(scores[i]))
+            for i in top
+        ]
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+    
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+    
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+    
+    def _select_relevance_score_fn(self):
+        # 余弦相似度 [-1, 1] 映射到 [0, 1]
+        return lambda score: (score + 1) / 2
+    
+    def delete_collection(self):
+        """清空内存中的索引
+
+        已持久化的文件保留：多进程部署时其他工作进程可能正在加载或使用同一目录，删除简历时由
+        delete_persisted_index 删除
+        """
+        with self._lock:
+            self._matrix = np.zeros((0, 0), dtype=self.dtype)
+            self._texts, self._metadatas, self._ids = [], [], []
+    
+    def save(self, path: Path, fingerprint: str = ''):
+        """保存索引（vectors.npy + index.json）；fingerprint 用于加载时判断索引是否与当前文本块和模型一致"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            matrix, texts, metadatas, ids = self._matrix, self._texts, self._metadatas, self._ids
+        
+        # 先写临时文件再替换，其他进程不会读到写了一半的文件；index.json 最后写入
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(path / (VECTORS_FILE + suffix), 'wb') as f:
+            np.save(f, matrix)
+        os.replace(path / (VECTORS_FILE + suffix), path / VECTORS_FILE)
+        index = {
+            'fingerprint': fingerprint,
+            'dtype': self.dtype.name,
+            'count': len(texts),
+            'texts': texts,
+            'metadatas': metadatas,
+            'ids': ids
+        }
+        (path / (INDEX_FILE + suffix)).write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+        os.replace(path / (INDEX_FILE + suffix), path / INDEX_FILE)
+    
+    @classmethod
+    def load(cls, path: Path, embedding, fingerprint: Optional[str] = None, mmap: bool = True,
+             collection_name: str = 'resume') -> Optional['NumpyVectorStore']:
+        """加载已保存的索引（mmap 为 True 时以只读内存映射方式打开向量文件）
+
+        文件不存在、不完整或 fingerprint 不一致时返回 None
+        """
+        path = Path(path)
+        try:
+            index = json.loads((path / INDEX_FILE).read_text(encoding='utf-8'))
+            matrix = np.load(path / VECTORS_FILE, mmap_mode='r' if mmap else None)
+        except (OSError, ValueError):
+            return None
+        if fingerprint is not None and index.get('fingerprint') != fingerprint:
+            return None
+        if matrix.ndim != 2 or len(matrix) != index.get('count') or matrix.dtype.name != index.get('dtype'):
+            return None
+        
+        store = cls(embedding, dtype=index['dtype'], collection_name=collection_name)
+        store._matrix = matrix
+        store._texts = index['texts']
+        store._metadatas = index['metadatas']
+        store._ids = index['ids']
+        return store
+    
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, dtype: str = 'float32', collection_name: str = 'resume',
+                   **kwargs) -> 'NumpyVectorStore':
+        store = cls(embedding, dtype=dtype, collection_name=collection_name)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def get_persist_dir(config, collection_name: str) -> Path:
+    """简历索引的持久化目录（[vector_store] persist_path 下按 collection 名称区分）"""
+    root = Path(config.get('vector_store', 'persist_path', fallback=DEFAULT_PERSIST_PATH))
+    if not root.is_absolute():
+        root = Path(__file__).parent / root
+    return root / collection_name
+
+
+def delete_persisted_index(config, collection_name: str):
+    """删除简历已持久化的索引文件（不存在时不做任何事）"""
+    shutil.rmtree(get_persist_dir(config, collection_name), ignore_errors=True)
+
+
+def build_numpy_index(chunks: List[Document], embeddings, config, collection_name: str,
+                      model_key: str = '') -> NumpyVectorStore:
+    """按 [vector_store] 配置构建简历索引；启用持久化时优先加载已保存的索引，否则构建后保存"""
+    from embedding_cache import hash_text
+    
+    dtype = config.get('vector_store', 'dtype', fallback='float32').lower()
+    if not config.getboolean('vector_store', 'persist', fallback=False):
+        return NumpyVectorStore.from_documents(chunks, embeddings, dtype=dtype, collection_name=collection_name)
+    
+    path = get_persist_dir(config, collection_name)
+    # 文本块、模型或精度变化后已保存的索引失效
+    fingerprint = hash_text('\0'.join([model_key, dtype] + [chunk.page_content for chunk in chunks]))
+    
+    store = NumpyVectorStore.load(path, embeddings, fingerprint=fingerprint, collection_name=collection_name)
+    if store is None:
+        store = NumpyVectorStore.from_documents(chunks, embeddings, dtype=dtype, collection_name=collection_name)
+        store.save(path, fingerprint=fingerprint)
+    return store
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+ONNX Embedding 后端
+把本地 sentence-transformers 模型导出为 ONNX 并做 int8 动态量化，推理只依赖 onnxruntime 和 tokenizers，
+不加载 torch：CPU 上比 PyTorch 全精度推理快，内存占用也小得多。
+
+导出只需执行一次（需要 torch、transformers 和 onnx），[embedding] type = onnx 首次加载时会自动导出，
+也可以在部署前手动导出：
+    python onnx_embeddings.py --model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2
+导出目录中包含 model.onnx（全精度）、model.int8.onnx（量化）、tokenizer.json 和 embedding_config.json。
+"""
+
+import argparse
+import inspect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+
+DEFAULT_EXPORT_DIR = 'cache/onnx'
+MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model.int8.onnx'
+CONFIG_FILE = 'embedding_config.json'
+TOKENIZER_FILE = 'tokenizer.json'
+
+# 未指定线程数（threads 为 0）的模型在本进程中使用的推理线程数，0 表示由 onnxruntime 按 CPU 核数决定
+_default_threads = 0
+
+
+def get_export_dir(model_name: str, export_root: Optional[str] = None) -> Path:
+    """模型的导出目录（export_root 下按模型名区分）"""
+    root = Path(export_root or DEFAULT_EXPORT_DIR)
+    if not root.is_absolute():
+        root = Path(__file__).parent / root
+    return root / model_name.replace('/', '__')
+
+
+def is_exported(export_dir: Path, quantized: bool = True) -> bool:
+    """导出目录中是否已有可用的模型文件"""
+    model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+    return all((export_dir / name).exists() for name in (model_file, TOKENIZER_FILE, CONFIG_FILE))
+
+
+def _read_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def _read_pooling(model_dir: Path) -> dict:
+    """读取 sentence-transformers 的池化方式、是否归一化和最大长度（兼容新旧两种配置格式）"""
+    modules = _read_json(model_dir / 'modules.json')
+    if isinstance(modules, dict):
+        modules = []
+    pooling_path = next((m['path'] for m in modules if m.get('type', '').endswith('Pooling')), '1_Pooling')
+    pooling = _read_json(model_dir / pooling_path / 'config.json')
+    
+    mode = pooling.get('pooling_mode')
+    if mode is None:
+        if pooling.get('pooling_mode_cls_token'):
+            mode = 'cls'
+        elif pooling.get('pooling_mode_max_tokens'):
+            mode = 'max'
+        else:
+            mode = 'mean'
+    
+    return {
+        'pooling': mode,
+        'normalize': any(m.get('type', '').endswith('Normalize') for m in modules),
+        'max_seq_length': _read_json(model_dir / 'sentence_bert_config.json').get('max_seq_length', 128)
+    }
+
+
+def export_onnx_model(model_name: str, export_dir: Path, quantize: bool = True, verbose: bool = True) -> Path:
+    """下载（或读取本地目录中的）sentence-transformers 模型，导出 ONNX 并做 int8 动态量化"""
+    import torch
+    from huggingface_hub import snapshot_download
+    from transformers import AutoModel, AutoTokenizer
+    
+    log = print if verbose else (lambda *args, **kwargs: None)
+    start = time.perf_counter()
+    model_dir = Path(model_name) if Path(model_name).is_dir() else Path(snapshot_download(model_name))
+    export_dir.mkdir(parents=True, exist_ok=True)
+    
+    log(f"正在导出 ONNX 模型：{model_name} -> {export_dir}")
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"模型 {model_name} 没有快速分词器（tokenizer.json），无法用于 ONNX 后端")
+    tokenizer.save_pretrained(str(export_dir))
+    
+    model = AutoModel.from_pretrained(str(model_dir), attn_implementation='eager')
+    model.eval()
+    sample = tokenizer(["示例文本 sample text"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    
+    class HiddenStates(torch.nn.Module):
+        """按输入名调用模型，只输出最后一层隐藏状态（池化在推理时用 numpy 完成）"""
+        
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+        
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+    
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    export_kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # 新版本 torch 默认使用 dynamo 导出器，需要额外依赖；使用 TorchScript 导出器
+        export_kwargs['dynamo'] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(model),
+            tuple(sample[name] for name in input_names),
+            str(export_dir / MODEL_FILE),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **export_kwargs
+        )
+    
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            str(export_dir / MODEL_FILE),
+            str(export_dir / QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+    
+    config = {
+        'model': model_name,
+        'input_names': input_names,
+        'pad_token_id': tokenizer.pad_token_id,
+        'pad_token': tokenizer.pad_token,
+        **_read_pooling(model_dir)
+    }
+    (export_dir / CONFIG_FILE).write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding='utf-8')
+    log(f"ONNX 模型导出完成，耗时 {time.perf_counter() - start:.1f}s")
+    return export_dir
+
+
+def set_default_threads(threads: int):
+    """设置未指定线程数的模型在本进程中的推理线程数（多进程部署时由工作进程在 fork 后调用）
+
+    已创建的推理会话不受影响；fork 出的子进程首次推理时重新创建会话，按该线程数生效
+    """
+    global _default_threads
+    _default_threads = max(threads, 0)
+
+
+class OnnxEmbeddings:
+    """基于 onnxruntime 的 Embedding 模型（接口与 LangChain Embeddings 一致）
+
+    threads 为单次推理使用的线程数（0 表示使用 set_default_threads 的设置，未设置时由 onnxruntime 按 CPU 核数决定）；
+    批量计算时按文本长度排序后分批推理，长度相近的文本放在一起，减少填充
+    """
+    
+    def __init__(self, export_dir: Path, quantized: bool = True, threads: int = 0, batch_size: int = 32):
+        from tokenizers import Tokenizer
+        
+        self.export_dir = Path(export_dir)
+        self.config = _read_json(self.export_dir / CONFIG_FILE)
+        self.threads = max(threads, 0)
+        self.batch_size = max(batch_size, 1)
+        self.model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+        
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+        self._create_session()
+        
+        self.tokenizer = Tokenizer.from_file(str(self.export_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config.get('max_seq_length', 128))
+        self.tokenizer.enable_padding(
+            pad_id=self.config.get('pad_token_id') or 0,
+            pad_token=self.config.get('pad_token') or '[PAD]'
+        )
+    
+    def _create_session(self):
+        import onnxruntime
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads or _default_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 推理线程空闲时不自旋等待，避免服务进程中空占 CPU
+        options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+        self._session = onnxruntime.InferenceSession(
+            str(self.export_dir / self.model_file), options, providers=['CPUExecutionProvider']
+        )
+        self._session_pid = os.getpid()
+        self.input_names = [item.name for item in self._session.get_inputs()]
+    
+    @property
+    def session(self):
+        """推理会话；多进程部署时 fork 出的子进程不能沿用父进程的线程池，首次使用时重新创建"""
+        if self._session_pid != os.getpid():
+            with self._lock:
+                if self._session_pid != os.getpid():
+                    self._create_session()
+        return self._session
+    
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.config.get('pooling', 'mean')
+        if mode == 'cls':
+            vectors = hidden[:, 0]
+        elif mode == 'max':
+            vectors = np.where(mask[..., None] > 0, hidden, -1e9).max(axis=1)
+        else:
+            weights = mask[..., None].astype(np.float32)
+            vectors = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        
+        if self.config.get('normalize'):
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+    
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """计算一批文本的向量，返回 float32 数组（顺序与输入一致）"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in batch])
+            arrays = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: arrays[name] for name in self.input_names})[0]
+            for i, vector in zip(batch, self._pool(hidden, arrays['attention_mask'])):
+                vectors[i] = vector
+        
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(vectors, dtype=np.float32)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def load_onnx_embeddings(config, model_name: str, verbose: bool = True) -> OnnxEmbeddings:
+    """按配置加载 ONNX Embedding 模型，尚未导出时先自动导出"""
+    quantized = config.getboolean('embedding', 'onnx_quantize', fallback=True)
+    export_dir = get_export_dir(model_name, config.get('embedding', 'onnx_path', fallback=DEFAULT_EXPORT_DIR))
+    if not is_exported(export_dir, quantized):
+        if verbose:
+            print("首次使用 ONNX 后端，需要导出模型（需安装 torch、transformers 和 onnx，导出后可不再依赖）...")
+        export_onnx_model(model_name, export_dir, quantize=quantized, verbose=verbose)
+    
+    return OnnxEmbeddings(
+        export_dir,
+        quantized=quantized,
+        threads=config.getint('embedding', 'onnx_threads', fallback=0),
+        batch_size=config.getint('embedding', 'onnx_batch_size', fallback=32)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 sentence-transformers 模型导出为 ONNX 并量化为 int8")
+    parser.add_argument('--model', default='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+                        help="模型名或本地模型目录")
+    parser.add_argument('--output', help=f"导出目录（默认 {DEFAULT_EXPORT_DIR}/<模型名>）")
+    parser.add_argument('--no-quantize', action='store_true', help="只导出全精度模型")
+    args = parser.parse_args()
+    
+    export_dir = Path(args.output) if args.output else get_export_dir(args.model)
+    export_onnx_model(args.model, export_dir, quantize=not args.no_quantize)
+    for name in (MODEL_FILE, QUANTIZED_MODEL_FILE):
+        path = export_dir / name
+        if path.exists():
+            print(f"  {name}：{os.path.getsize(path) / 1024 / 1024:.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
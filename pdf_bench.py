@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 解析吞吐基准测试
+生成若干份多页简历 PDF，分别测量各提取后端顺序提取、按页并行提取和缓存命中时的吞吐量。
+
+用法：
+    python pdf_bench.py --files 4 --pages 40 --runs 3 --workers 4
+    python pdf_bench.py --resume my_resume.pdf --runs 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_utils import make_resume_pdf
+from pdf_extract import (
+    PdfExtractor, available_backends, count_pages, get_page_pool, get_text_cache, shutdown_page_pool
+)
+
+
+def measure(extractor: PdfExtractor, paths: List[Path], runs: int, parallel: bool) -> dict:
+    """多次提取全部文件，返回耗时和吞吐量"""
+    pages = sum(count_pages(str(path), extractor.backend) for path in paths)
+    start = time.perf_counter()
+    for _ in range(runs):
+        for path in paths:
+            extractor.extract(path, parallel=parallel)
+    elapsed = time.perf_counter() - start
+    return {
+        'seconds': round(elapsed, 4),
+        'files_per_second': round(len(paths) * runs / elapsed, 2),
+        'pages_per_second': round(pages * runs / elapsed, 1),
+        'ms_per_file': round(elapsed / (len(paths) * runs) * 1000, 2)
+    }
+
+
+def run_benchmark(paths: List[Path], runs: int, workers: int, workdir: Path) -> dict:
+    result = {'files': len(paths), 'runs': runs, 'workers': workers, 'backends': {}}
+    
+    for backend in available_backends():
+        print(f"\n后端：{backend}")
+        stats = {}
+        
+        sequential = PdfExtractor(backend=backend, page_workers=1)
+        stats['sequential'] = measure(sequential, paths, runs, parallel=False)
+        print(f"  顺序提取：{stats['sequential']['pages_per_second']} 页/秒")
+        
+        if workers > 1:
+            parallel = PdfExtractor(backend=backend, page_workers=workers, parallel_min_pages=2)
+            # 进程池启动时间单独统计，不计入吞吐
+            start = time.perf_counter()
+            pool = get_page_pool(workers)
+            list(pool.map(abs, range(workers)))
+            stats['pool_startup_seconds'] = round(time.perf_counter() - start, 3)
+            stats['parallel'] = measure(parallel, paths, runs, parallel=True)
+            print(f"  按页并行（{workers} 进程）：{stats['parallel']['pages_per_second']} 页/秒"
+                  f"（进程池启动 {stats['pool_startup_seconds']}s）")
+        
+        cached = PdfExtractor(backend=backend, page_workers=1, cache=get_text_cache(workdir / f"{backend}.sqlite3"))
+        for path in paths:
+            cached.extract(path, parallel=False)
+        stats['cached'] = measure(cached, paths, runs, parallel=False)
+        print(f"  缓存命中：{stats['cached']['files_per_second']} 份/秒（每份 {stats['cached']['ms_per_file']}ms）")
+        
+        result['backends'][backend] = stats
+    
+    shutdown_page_pool()
+    return result
+
+
+def print_report(result: dict):
+    print("\n" + "=" * 72)
+    print(f"   PDF 解析吞吐（{result['files']} 份 × {result['runs']} 次，每份 {result['pages_per_file']} 页）")
+    print("=" * 72)
+    print(f"{'后端':<10}{'模式':<14}{'页/秒':>12}{'份/秒':>12}{'每份耗时(ms)':>16}")
+    labels = {'sequential': '顺序', 'parallel': f"并行×{result['workers']}", 'cached': '缓存命中'}
+    for backend, stats in result['backends'].items():
+        for mode in ('sequential', 'parallel', 'cached'):
+            if mode not in stats:
+                continue
+            row = stats[mode]
+            print(f"{backend:<10}{labels[mode]:<14}{row['pages_per_second']:>12}{row['files_per_second']:>12}"
+                  f"{row['ms_per_file']:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 解析吞吐基准测试")
+    parser.add_argument('--files', type=int, default=4, help="生成的简历份数")
+    parser.add_argument('--pages', type=int, default=40, help="每份简历的页数")
+    parser.add_argument('--runs', type=int, default=3, help="每种模式重复提取的次数")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="按页并行的进程数")
+    parser.add_argument('--resume', type=Path, help="使用指定的简历 PDF（不再生成示例简历）")
+    parser.add_argument('--output', type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix='pdf_bench_') as tmp:
+        workdir = Path(tmp)
+        if args.resume:
+            paths = [args.resume]
+        else:
+            paths = []
+            for i in range(args.files):
+                path = workdir / f"resume_{i}.pdf"
+                make_resume_pdf(path, variant=i + 1, pages=args.pages)
+                paths.append(path)
+        
+        result = run_benchmark(paths, args.runs, args.workers, workdir)
+        result['pages_per_file'] = count_pages(str(paths[0]), 'pypdf')
+    
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\n结果已写入：{args.output}")
+
+
+if __name__ == '__main__':
+    main()
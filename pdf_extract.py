@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 文本提取
+load_resume 背后的可插拔提取层：
+- 提取后端：pypdf（默认依赖）或 pymupdf（可选安装，C 实现，速度快很多），auto 时优先使用 pymupdf
+- 页数较多的简历按页拆分，在进程池中并行提取（pypdf 为纯 Python 实现，多线程无法并行）
+- 提取结果按 (文件内容哈希, 后端) 缓存到本地 SQLite，重复上传的简历完全跳过解析
+
+本模块只依赖标准库和 PDF 库，进程池的子进程只导入本模块，启动很快。
+"""
+
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+BACKEND_PYPDF = 'pypdf'
+BACKEND_PYMUPDF = 'pymupdf'
+DEFAULT_CACHE_PATH = 'cache/pdf_text.sqlite3'
+
+
+@functools.lru_cache(maxsize=None)
+def _import_pymupdf():
+    """导入 PyMuPDF（新版本包名为 pymupdf，旧版本为 fitz），未安装时返回 None"""
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        pass
+    try:
+        import fitz
+        return fitz
+    except ImportError:
+        return None
+
+
+def available_backends() -> List[str]:
+    """当前环境可用的提取后端"""
+    backends = [BACKEND_PYPDF]
+    if _import_pymupdf() is not None:
+        backends.append(BACKEND_PYMUPDF)
+    return backends
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_backend(name: str) -> str:
+    """将配置的后端名解析为实际可用的后端（auto 优先 pymupdf，不可用时回退到 pypdf，每种配置只提示一次）"""
+    name = (name or 'auto').lower()
+    if name in ('auto', BACKEND_PYMUPDF) and _import_pymupdf() is not None:
+        return BACKEND_PYMUPDF
+    if name == BACKEND_PYMUPDF:
+        print("警告：未安装 pymupdf，PDF 提取回退到 pypdf（pip install pymupdf）")
+    elif name not in ('auto', BACKEND_PYPDF):
+        print(f"警告：不支持的 PDF 提取后端 '{name}'，使用 pypdf")
+    return BACKEND_PYPDF
+
+
+def count_pages(path: str, backend: str) -> int:
+    """PDF 页数"""
+    if backend == BACKEND_PYMUPDF:
+        with _import_pymupdf().open(path) as doc:
+            return doc.page_count
+    
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def extract_page_range(path: str, backend: str, start: int, end: int) -> List[str]:
+    """提取 [start, end) 页的文本（在进程池子进程中执行）"""
+    if backend == BACKEND_PYMUPDF:
+        with _import_pymupdf().open(path) as doc:
+            return [doc[i].get_text() for i in range(start, end)]
+    
+    # 与 PyPDFLoader 的默认提取方式一致
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+def hash_file(path: Path) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfTextCache:
+    """基于 SQLite 的 PDF 提取结果缓存（线程安全）"""
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_text ("
+            " file_hash TEXT NOT NULL,"
+            " backend TEXT NOT NULL,"
+            " pages TEXT NOT NULL,"
+            " saved_at REAL NOT NULL,"
+            " PRIMARY KEY (file_hash, backend))"
+        )
+        self._conn.commit()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, file_hash: str, backend: str) -> Optional[List[str]]:
+        """读取各页文本，未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM pdf_text WHERE file_hash = ? AND backend = ?",
+                (file_hash, backend)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, file_hash: str, backend: str, pages: List[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_text (file_hash, backend, pages, saved_at) VALUES (?, ?, ?, ?)",
+                (file_hash, backend, json.dumps(pages, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+    
+    def get_stats(self) -> dict:
+        """返回缓存命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM pdf_text").fetchone()[0]
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'path': str(self.db_path),
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
+
+
+# 按缓存文件路径共享的缓存实例
+_caches: Dict[str, PdfTextCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_text_cache(db_path: Path) -> PdfTextCache:
+    """获取（或创建）指定路径的缓存实例"""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = PdfTextCache(Path(db_path))
+            _caches[key] = cache
+        return cache
+
+
+# 进程内共享的按页提取进程池（首次并行提取时创建）
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_page_pool(workers: int) -> ProcessPoolExecutor:
+    """获取按页提取的进程池
+
+    服务进程中有多个线程，直接 fork 不安全；使用 forkserver（不支持时用 spawn），
+    子进程只预加载本模块，不会重新导入服务主程序
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_page_pool():
+    """关闭按页提取的进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+# 进程内提取统计
+_stats = {'parses': 0, 'pages': 0, 'parallel_parses': 0, 'parallel_fallbacks': 0, 'cached': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, delta in deltas.items():
+            _stats[key] += delta
+
+
+class PdfExtractor:
+    """PDF 文本提取器"""
+    
+    def __init__(self, backend: str = 'auto', page_workers: int = 1, parallel_min_pages: int = 8,
+                 cache: Optional[PdfTextCache] = None):
+        self.backend = resolve_backend(backend)
+        self.page_workers = max(page_workers, 1)
+        self.parallel_min_pages = max(parallel_min_pages, 1)
+        self.cache = cache
+    
+    def extract(self, pdf_path: Path, parallel: bool = True) -> List[str]:
+        """提取各页文本；parallel 为 False 时不使用进程池（调用方自己已在子进程中并行时使用）"""
+        path = str(pdf_path)
+        
+        file_hash = None
+        if self.cache is not None:
+            file_hash = hash_file(pdf_path)
+            pages = self.cache.get(file_hash, self.backend)
+            if pages is not None:
+                _count(cached=1)
+                return pages
+        
+        page_count = count_pages(path, self.backend)
+        if parallel and self.page_workers > 1 and page_count >= self.parallel_min_pages:
+            pages = self._extract_parallel(path, page_count)
+        else:
+            pages = extract_page_range(path, self.backend, 0, page_count)
+        _count(parses=1, pages=page_count)
+        
+        if self.cache is not None:
+            self.cache.put(file_hash, self.backend, pages)
+        return pages
+    
+    def _extract_parallel(self, path: str, page_count: int) -> List[str]:
+        """按页拆成连续区间，在进程池中并行提取；进程池不可用时回退到顺序提取"""
+        workers = min(self.page_workers, page_count)
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        try:
+            pool = get_page_pool(self.page_workers)
+            futures = [pool.submit(extract_page_range, path, self.backend, start, end) for start, end in ranges]
+            pages = [text for future in futures for text in future.result()]
+        except Exception as e:
+            # 解析错误同样会在顺序提取时抛出，这里只回退进程池本身的故障
+            print(f"警告：并行提取 PDF 失败，改为顺序提取：{e}")
+            _count(parallel_fallbacks=1)
+            return extract_page_range(path, self.backend, 0, page_count)
+        
+        _count(parallel_parses=1)
+        return pages
+
+
+def create_extractor(config) -> PdfExtractor:
+    """按配置（[pdf] 部分）创建提取器"""
+    def option(key, fallback, getter='get'):
+        if config is None:
+            return fallback
+        return getattr(config, getter)('pdf', key, fallback=fallback)
+    
+    cache = None
+    if option('cache_enabled', True, 'getboolean'):
+        cache_path = Path(option('cache_path', DEFAULT_CACHE_PATH))
+        if not cache_path.is_absolute():
+            cache_path = Path(__file__).parent / cache_path
+        cache = get_text_cache(cache_path)
+    
+    return PdfExtractor(
+        backend=option('backend', 'auto'),
+        page_workers=option('page_workers', 0, 'getint') or os.cpu_count() or 1,
+        parallel_min_pages=option('parallel_min_pages', 8, 'getint'),
+        cache=cache
+    )
+
+
+def extract_pdf_pages(pdf_path: Path, config, parallel: bool = True) -> List[str]:
+    """按配置提取 PDF 各页文本"""
+    return create_extractor(config).extract(pdf_path, parallel=parallel)
+
+
+def get_parse_stats() -> dict:
+    """返回提取统计和缓存统计"""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _caches_lock:
+        caches = list(_caches.values())
+    stats['backends'] = available_backends()
+    stats['cache'] = caches[0].get_stats() if len(caches) == 1 else (
+        {'caches': [cache.get_stats() for cache in caches]} if caches else None
+    )
+    return stats
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+ResumeRoaster API Server（多进程模式）
+本地 Embedding 和 PDF 解析受 GIL 限制，单个进程只能用满一个 CPU 核。多进程模式下主进程先读取配置、
+加载 Embedding 模型并创建监听端口，再 fork 出多个工作进程共同处理请求：
+- 模型在 fork 之前加载，各工作进程通过写时复制共享模型内存
+- 会话和简历数据保存在共享的 SQLite（会话持久化）中，向量保存在共享的向量缓存中，
+  任一工作进程都能处理任一会话，需要时在本进程内按缓存的向量重建索引
+- 工作进程异常退出时由主进程重新拉起
+
+用法：
+    python prefork_server.py --workers 4 [--mode threaded|async]
+仅支持提供 fork 的系统（Linux / macOS）。
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import api_server
+from api_server import api_config, load_api_config, start_reaper, ResumeManager, StartupManager
+
+
+def create_listen_socket(host: str, port: int) -> socket.socket:
+    """创建由所有工作进程共享的监听端口"""
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def limit_compute_threads(workers: int):
+    """限制每个工作进程的 Embedding 计算线程数（PyTorch 和 ONNX），避免多个进程争抢 CPU"""
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(threads)
+    
+    # 未指定 onnx_threads 的 ONNX 模型在工作进程中首次推理时按该线程数重新创建推理会话
+    import onnx_embeddings
+    onnx_embeddings.set_default_threads(threads)
+
+
+def run_worker(sock: socket.socket, mode: str, workers: int):
+    """工作进程：在共享的监听端口上运行 API 服务"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    limit_compute_threads(workers)
+    
+    # 后台线程不会被 fork 继承，每个工作进程各自启动
+    start_reaper()
+    
+    if mode == 'async':
+        import uvicorn
+        from asgi_server import create_app
+        
+        config = uvicorn.Config(create_app(prepare=False), log_level='warning')
+        uvicorn.Server(config).run(sockets=[sock])
+    else:
+        from werkzeug.serving import make_server
+        
+        host, port = sock.getsockname()[:2]
+        server = make_server(host, port, api_server.app, threaded=True, fd=sock.fileno())
+        server.serve_forever()
+
+
+def spawn_worker(sock: socket.socket, mode: str, workers: int) -> int:
+    """fork 一个工作进程，返回其 pid"""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, mode, workers)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"工作进程 {os.getpid()} 异常退出：{e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def prepare_master():
+    """fork 之前的准备工作：检查配置、导入重量级依赖并加载 Embedding 模型、清理遗留临时文件"""
+    if not api_config['persist_sessions']:
+        print("错误：多进程模式需要启用会话持久化（[api] persist_sessions = true），否则会话只存在于单个工作进程中")
+        sys.exit(1)
+    
+    # 在 fork 之前（同步）导入依赖并加载模型，工作进程通过写时复制共享这部分内存
+    StartupManager.start_warmup(background=False)
+    
+    ResumeManager.purge_orphan_temp_files()
+    
+    # 已加载的对象移出垃圾回收的扫描范围，避免工作进程中的 GC 写入导致共享内存页被复制
+    gc.collect()
+    gc.freeze()
+
+
+def run_prefork_server(workers: int, mode: str, host: str = '0.0.0.0'):
+    """启动多进程 API 服务器（调用前需已读取 [api] 配置）"""
+    if not hasattr(os, 'fork'):
+        print("错误：当前系统不支持 fork，请使用 api_server.py 或 asgi_server.py")
+        sys.exit(1)
+    
+    print("\n" + "=" * 60)
+    print("   ResumeRoaster API Server (prefork)")
+    print("=" * 60)
+    
+    prepare_master()
+    
+    sock = create_listen_socket(host, int(api_config['port']))
+    children = {spawn_worker(sock, mode, workers) for _ in range(workers)}
+    
+    print(f"\nAPI 服务器已启动（多进程模式，{workers} 个{'异步' if mode == 'async' else '线程'}模式工作进程）")
+    print(f"监听端口：{api_config['port']}")
+    print(f"健康检查：http://localhost:{api_config['port']}/api/health")
+    print("\n按 Ctrl+C 停止服务器\n")
+    
+    stopping = False
+    
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    # 监控工作进程，异常退出时重新拉起
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.5)
+            continue
+        
+        children.discard(pid)
+        if not stopping:
+            print(f"工作进程 {pid} 已退出（状态 {status}），正在重新启动...")
+            children.add(spawn_worker(sock, mode, workers))
+    
+    print("\n正在停止工作进程...")
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    
+    deadline = time.time() + 10
+    while children and time.time() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.1)
+        else:
+            children.discard(pid)
+    
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResumeRoaster API Server（多进程模式）")
+    parser.add_argument('--workers', type=int, default=0, help="工作进程数（默认使用 [api] workers，0 表示 CPU 核数）")
+    parser.add_argument('--mode', choices=['threaded', 'async'], help="工作进程的服务模式（默认使用 [api] worker_mode）")
+    args = parser.parse_args()
+    
+    # 只读取一次配置（每次读取都会打印配置并注册 CORS）
+    load_api_config()
+    workers = args.workers or int(api_config['workers']) or os.cpu_count() or 1
+    mode = args.mode or api_config['worker_mode']
+    run_prefork_server(workers, mode)
+
+
+if __name__ == '__main__':
+    main()
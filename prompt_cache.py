@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+提示词前缀缓存统计
+DeepSeek 等服务商会缓存请求之间相同的提示词前缀，命中部分的 Token 计费更低、首字延迟更短，
+命中数随响应的 usage 返回。LangChain 只保留 usage 中的标准字段（流式响应中完全丢弃），
+因此在共享的 HTTP 客户端上读取原始响应中的 usage，按调用方所在的上下文记录下来。
+
+用法：
+    with capture_usage() as usages:
+        llm.invoke(prompt)
+    cache = summarize_cache_usage(usages)
+"""
+
+import contextvars
+import json
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import httpx
+
+from metrics import registry as metrics_registry
+
+
+prompt_cache_tokens = metrics_registry.counter(
+    'resume_roaster_prompt_cache_tokens_total',
+    '服务商返回的提示词前缀缓存命中/未命中 Token 数',
+    ('kind',)
+)
+
+# 当前上下文（线程或协程）中正在收集的 usage 列表，未在 capture_usage 中时为 None
+_current_usages: contextvars.ContextVar[Optional[List[dict]]] = contextvars.ContextVar(
+    'llm_usages', default=None
+)
+
+
+def extract_cache_usage(usage: dict) -> Optional[dict]:
+    """从原始 usage 中取出缓存命中/未命中 Token 数，服务商未返回时为 None
+
+    DeepSeek 返回 prompt_cache_hit_tokens / prompt_cache_miss_tokens，
+    OpenAI 兼容服务返回 prompt_tokens_details.cached_tokens
+    """
+    if not usage:
+        return None
+    
+    hit = usage.get('prompt_cache_hit_tokens')
+    miss = usage.get('prompt_cache_miss_tokens')
+    if hit is not None or miss is not None:
+        return {'hit': hit or 0, 'miss': miss or 0}
+    
+    details = usage.get('prompt_tokens_details') or {}
+    cached = details.get('cached_tokens')
+    if cached is not None:
+        return {'hit': cached, 'miss': max(usage.get('prompt_tokens', 0) - cached, 0)}
+    return None
+
+
+def record_usage(usage: dict):
+    """记录一次 LLM 调用的原始 usage（不在 capture_usage 中时只更新全局指标）"""
+    cache = extract_cache_usage(usage)
+    if cache is not None:
+        prompt_cache_tokens.inc(cache['hit'], kind='hit')
+        prompt_cache_tokens.inc(cache['miss'], kind='miss')
+    
+    usages = _current_usages.get()
+    if usages is not None:
+        usages.append(usage)
+
+
+@contextmanager
+def capture_usage() -> Iterator[List[dict]]:
+    """收集代码块内本线程（或本协程）发起的 LLM 调用的原始 usage"""
+    usages: List[dict] = []
+    token = _current_usages.set(usages)
+    try:
+        yield usages
+    finally:
+        try:
+            _current_usages.reset(token)
+        except ValueError:
+            # 流式生成器在另一个上下文中被关闭（如客户端断开后）时无法还原，原上下文不受影响
+            pass
+
+
+def summarize_cache_usage(usages: List[dict]) -> Optional[dict]:
+    """合计多次调用的缓存命中情况，返回 {'hit', 'miss'}；服务商未返回缓存信息时为 None"""
+    caches = [cache for cache in map(extract_cache_usage, usages) if cache is not None]
+    if not caches:
+        return None
+    return {
+        'hit': sum(cache['hit'] for cache in caches),
+        'miss': sum(cache['miss'] for cache in caches)
+    }
+
+
+def apply_cache_stats(stats: dict, usages: List[dict]):
+    """把本轮的缓存命中 Token 数写入 stats（prompt_cache_hit_tokens / prompt_cache_miss_tokens）"""
+    cache = summarize_cache_usage(usages)
+    if cache is not None:
+        stats['prompt_cache_hit_tokens'] = cache['hit']
+        stats['prompt_cache_miss_tokens'] = cache['miss']
+
+
+class _UsageScanner:
+    """扫描响应体，取出其中的 usage
+
+    SSE 流式响应逐行扫描（usage 在最后一个事件中）；普通 JSON 响应可能跨多行（格式化输出），读完后整体解析
+    """
+    
+    def __init__(self, streaming: bool):
+        self.streaming = streaming
+        self._buffer = b''
+    
+    def feed(self, chunk: bytes):
+        self._buffer += chunk
+        if not self.streaming:
+            return
+        *lines, self._buffer = self._buffer.split(b'\n')
+        for line in lines:
+            self._scan(line)
+    
+    def close(self):
+        if self._buffer:
+            self._scan(self._buffer)
+            self._buffer = b''
+    
+    @staticmethod
+    def _scan(data: bytes):
+        if b'"usage"' not in data:
+            return
+        data = data.strip()
+        if data.startswith(b'data:'):
+            data = data[5:].strip()
+        try:
+            usage = json.loads(data).get('usage')
+        except (ValueError, AttributeError):
+            return
+        if isinstance(usage, dict) and 'prompt_tokens' in usage:
+            record_usage(usage)
+
+
+class _UsageStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """包装 httpx 响应体流，读取时顺带扫描 usage，不改变读出的内容"""
+    
+    def __init__(self, stream, streaming: bool):
+        self._stream = stream
+        self._scanner = _UsageScanner(streaming)
+    
+    def __iter__(self):
+        for chunk in self._stream:
+            self._scanner.feed(chunk)
+            yield chunk
+        self._scanner.close()
+    
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._scanner.feed(chunk)
+            yield chunk
+        self._scanner.close()
+    
+    def close(self):
+        self._stream.close()
+    
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+def _wrap_response(response):
+    if response.request.url.path.endswith('/chat/completions'):
+        streaming = 'text/event-stream' in response.headers.get('content-type', '')
+        response.stream = _UsageStream(response.stream, streaming)
+
+
+async def _awrap_response(response):
+    _wrap_response(response)
+
+
+def usage_event_hooks(asynchronous: bool = False) -> dict:
+    """httpx 客户端的响应钩子：读取聊天补全接口响应中的 usage"""
+    return {'response': [_awrap_response if asynchronous else _wrap_response]}
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+简历上下文模式
+大多数简历只有几个文本块：低于阈值时把整份简历作为 {context} 直接放入提示词（预先拼好并缓存），
+每轮不再做查询向量化和相似度检索；超过阈值时仍按向量检索取最相关的文本块。
+检索模式下可先整理检索结果再放入提示词（pack_context）：合并相邻和重叠的文本块、去掉重复的文本块和页眉，
+按在简历中的位置排列，并控制在 Token 预算内。
+"""
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from token_counter import count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# 上下文模式
+CONTEXT_FULL = 'full'
+CONTEXT_RETRIEVAL = 'retrieval'
+
+
+def merge_chunks(chunks: List['Document']) -> str:
+    """将文本块还原为完整简历文本
+
+    按文本块的 start_index 去掉相邻块之间的重叠部分，各页之间用空行分隔；
+    没有 start_index 的文本块直接拼接。
+    """
+    pages = []
+    last_key = None
+    last_end = None
+    for chunk in chunks:
+        text = chunk.page_content
+        start = chunk.metadata.get('start_index')
+        key = (chunk.metadata.get('source'), chunk.metadata.get('page'))
+        
+        if pages and key == last_key and start is not None and last_end is not None:
+            overlap = last_end - start
+            if overlap >= 0:
+                pages[-1] += text[overlap:]
+            else:
+                pages[-1] += "\n" + text
+        else:
+            pages.append(text)
+        
+        last_key = key
+        last_end = start + len(text) if start is not None else None
+    
+    return "\n\n".join(page.strip() for page in pages if page.strip())
+
+
+# 同一页内相隔不超过该字数的文本块视为相邻（切分时去掉了块首尾的空白）
+ADJACENT_GAP_CHARS = 2
+# 每个片段开头参与页眉去重的行数
+HEADER_LINES = 3
+
+
+def _chunk_position(chunk: 'Document') -> Tuple:
+    """文本块在简历中的位置（来源、页码、起始位置），用于排序；没有 start_index 的文本块排在最后"""
+    page = chunk.metadata.get('page')
+    start = chunk.metadata.get('start_index')
+    return (
+        start is None,
+        str(chunk.metadata.get('source') or ''),
+        page if isinstance(page, int) else -1,
+        start if start is not None else 0
+    )
+
+
+def _merge_spans(docs: List['Document']) -> List[dict]:
+    """去掉内容相同的文本块，按位置排序后合并同一页内相邻或重叠的文本块
+
+    返回片段列表，每个片段记录文本和所含文本块中最靠前的检索排名
+    """
+    seen = set()
+    items = []
+    for rank, doc in enumerate(docs):
+        text = doc.page_content
+        if not text.strip() or text in seen:
+            continue
+        seen.add(text)
+        items.append((_chunk_position(doc), rank, doc))
+    items.sort(key=lambda item: (item[0], item[1]))
+    
+    spans = []
+    for _, rank, doc in items:
+        text = doc.page_content
+        start = doc.metadata.get('start_index')
+        key = (doc.metadata.get('source'), doc.metadata.get('page'))
+        last = spans[-1] if spans else None
+        
+        if last is not None and start is not None and last['end'] is not None and key == last['key'] \
+                and start <= last['end'] + ADJACENT_GAP_CHARS:
+            end = start + len(text)
+            if start >= last['end']:
+                last['text'] += "\n" + text
+            elif end > last['end']:
+                last['text'] += text[last['end'] - start:]
+            last['end'] = max(last['end'], end)
+            last['rank'] = min(last['rank'], rank)
+            continue
+        
+        spans.append({
+            'key': key,
+            'end': start + len(text) if start is not None else None,
+            'text': text,
+            'rank': rank
+        })
+    return spans
+
+
+def _strip_repeated_header(text: str, headers: set) -> str:
+    """去掉片段开头与之前片段开头重复的行（每页重复的姓名、联系方式等页眉，重复的栏目标题）
+
+    正文中的重复行保留（不同项目下相同的描述各有所指）；headers 记录已出现过的片段开头几行
+    """
+    lines = text.split("\n")
+    start = 0
+    while start < len(lines) and (not lines[start].strip() or lines[start].strip() in headers):
+        start += 1
+    kept = lines[start:]
+    headers.update(line.strip() for line in kept[:HEADER_LINES] if line.strip())
+    return "\n".join(kept).strip()
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """截取文本开头不超过 max_tokens 的部分"""
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def pack_context(docs: List['Document'], max_tokens: int = 0) -> Tuple[str, dict]:
+    """把检索到的文本块整理为提示词上下文，返回 (上下文文本, 统计)
+
+    合并相邻和重叠的文本块、去掉重复的文本块和页眉，片段按在简历中的位置排列；max_tokens 大于 0 时
+    按检索排名依次放入片段，放不下的片段跳过，排名第一的片段超出预算时截断。
+    统计给出整理前（检索结果直接拼接）和整理后的 Token 数
+    """
+    raw_tokens = count_tokens("\n\n".join(doc.page_content for doc in docs))
+    spans = _merge_spans(docs)
+    
+    if max_tokens > 0:
+        chosen = {}
+        used = 0
+        for index in sorted(range(len(spans)), key=lambda i: spans[i]['rank']):
+            span = spans[index]
+            tokens = count_tokens(span['text'])
+            if used + tokens <= max_tokens:
+                chosen[index] = span
+                used += tokens
+            elif not chosen:
+                chosen[index] = dict(span, text=_truncate_to_tokens(span['text'], max_tokens))
+                used = max_tokens
+        spans = [chosen[index] for index in sorted(chosen)]
+    
+    headers = set()
+    pieces = [_strip_repeated_header(span['text'], headers) for span in spans]
+    context = "\n\n".join(piece for piece in pieces if piece)
+    return context, {
+        'context_chunks': len(docs),
+        'context_pieces': sum(1 for piece in pieces if piece),
+        'context_tokens_raw': raw_tokens,
+        'context_tokens_packed': count_tokens(context)
+    }
+
+
+def apply_context_stats(stats: dict, docs: List['Document']):
+    """把本轮检索结果的整理统计（整理前后的 Token 数）写入 stats，未整理时不写入"""
+    for doc in docs:
+        if 'context_tokens_packed' in doc.metadata:
+            stats['context_tokens_raw'] = doc.metadata['context_tokens_raw']
+            stats['context_tokens_packed'] = doc.metadata['context_tokens_packed']
+            return
+
+
+def build_full_context(chunks: List['Document'], config) -> Optional[str]:
+    """按配置决定是否使用完整简历作为上下文，是则返回拼好的简历文本，否则返回 None
+
+    [interview] context_mode：auto 按 full_context_max_tokens 阈值自动选择，
+    full 始终使用完整简历，retrieval 始终使用向量检索（未配置时沿用此前的行为）
+    """
+    if not chunks:
+        return None
+    
+    mode = config.get('interview', 'context_mode', fallback=CONTEXT_RETRIEVAL).lower()
+    if mode == CONTEXT_RETRIEVAL:
+        return None
+    
+    text = merge_chunks(chunks)
+    if mode == CONTEXT_FULL:
+        return text
+    
+    max_tokens = config.getint('interview', 'full_context_max_tokens', fallback=3000)
+    if count_tokens(text) <= max_tokens:
+        return text
+    return None
+
+
+def is_full_context(retriever) -> bool:
+    """检索器是否为完整简历模式"""
+    from chain_components import FullContextRetriever
+    return isinstance(retriever, FullContextRetriever)
+
+
+def get_context_mode(chain) -> str:
+    """面试链当前使用的上下文模式（full 或 retrieval）"""
+    return CONTEXT_FULL if is_full_context(chain.retriever) else CONTEXT_RETRIEVAL
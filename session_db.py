@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+会话持久化
+把会话状态（对话记录、滚动摘要、面试官风格、resume_id、计数）和重建面试链所需的简历文本块
+保存到本地 SQLite：服务重启后会话不丢失，多个服务进程共享同一个数据库时任一进程都可以按需重建面试链。
+内存中只保留活跃会话的面试链，空闲会话只占一行数据库记录。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def dump_memory(memory) -> dict:
+    """导出对话记忆（消息记录和滚动摘要）"""
+    from langchain_core.messages import messages_to_dict
+    
+    return {
+        'messages': messages_to_dict(memory.chat_memory.messages),
+        'summary': getattr(memory, 'moving_summary_buffer', '')
+    }
+
+
+def restore_memory(memory, state: dict):
+    """把导出的对话记录写回新建的对话记忆"""
+    from langchain_core.messages import messages_from_dict
+    
+    memory.chat_memory.messages = messages_from_dict(state.get('messages') or [])
+    if hasattr(memory, 'moving_summary_buffer'):
+        memory.moving_summary_buffer = state.get('summary') or ''
+
+
+class SessionDatabase:
+    """基于 SQLite 的会话和简历存储（线程安全，WAL 模式下可被多个进程同时使用）"""
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " resume_id TEXT NOT NULL,"
+            " interview_style TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_activity REAL NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " state TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_resume ON sessions (resume_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resumes ("
+            " resume_id TEXT PRIMARY KEY,"
+            " content_hash TEXT,"
+            " file_name TEXT,"
+            " file_size INTEGER,"
+            " chunks TEXT NOT NULL,"
+            " full_context TEXT,"
+            " saved_at REAL NOT NULL)"
+        )
+        # 简历处理状态（多进程部署时，任一进程都能查询其他进程正在处理的简历）
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resume_status ("
+            " resume_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " progress INTEGER NOT NULL,"
+            " error TEXT,"
+            " chunk_count INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        
+        self.saves = 0
+        self.loads = 0
+    
+    # ---------- 会话 ----------
+    
+    def save_session(self, session_id: str, session: dict) -> int:
+        """保存会话状态，返回新的版本号（每次保存加一，用于发现其他进程的更新）"""
+        memory = session['chain'].memory
+        state = {
+            'message_count': session.get('message_count', 0),
+            'llm_calls': session.get('llm_calls', 0),
+            'prompt_tokens': session.get('prompt_tokens', []),
+            'memory': dump_memory(memory)
+        }
+        version = session.get('version', 0) + 1
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions "
+                "(session_id, resume_id, interview_style, created_at, last_activity, version, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session_id, session['resume_id'], session['interview_style'],
+                    session['created_at'].timestamp(), time.time(), version,
+                    json.dumps(state, ensure_ascii=False)
+                )
+            )
+            self._conn.commit()
+            self.saves += 1
+        return version
+    
+    def load_session(self, session_id: str) -> Optional[dict]:
+        """读取会话状态，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resume_id, interview_style, created_at, last_activity, version, state "
+                "FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is not None:
+                self.loads += 1
+        
+        if row is None:
+            return None
+        resume_id, interview_style, created_at, last_activity, version, state = row
+        return {
+            'resume_id': resume_id,
+            'interview_style': interview_style,
+            'created_at': created_at,
+            'last_activity': last_activity,
+            'version': version,
+            **json.loads(state)
+        }
+    
+    def get_version(self, session_id: str) -> Optional[int]:
+        """会话的当前版本号，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+    
+    def get_session_ids(self, resume_id: str) -> List[str]:
+        """使用指定简历的会话ID列表"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE resume_id = ?", (resume_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def delete_expired_sessions(self, ttl_seconds: float) -> List[str]:
+        """删除超过 ttl_seconds 无活动的会话，返回被删除的会话ID"""
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_activity < ?", (cutoff,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM sessions WHERE last_activity < ?", (cutoff,))
+            self._conn.commit()
+        return [row[0] for row in rows]
+    
+    # ---------- 简历 ----------
+    
+    def save_resume(self, resume_id: str, resume: dict):
+        """保存重建面试链所需的简历数据（文本块和完整简历上下文）"""
+        chunks = [
+            {'page_content': chunk.page_content, 'metadata': chunk.metadata}
+            for chunk in resume['chunks']
+        ]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resumes "
+                "(resume_id, content_hash, file_name, file_size, chunks, full_context, saved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    resume_id, resume.get('content_hash'), resume.get('file_name'), resume.get('file_size'),
+                    json.dumps(chunks, ensure_ascii=False), resume.get('full_context'), time.time()
+                )
+            )
+            self._conn.commit()
+    
+    def load_resume(self, resume_id: str) -> Optional[dict]:
+        """读取简历数据，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, file_name, file_size, chunks, full_context "
+                "FROM resumes WHERE resume_id = ?",
+                (resume_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        from langchain_core.documents import Document
+        
+        content_hash, file_name, file_size, chunks, full_context = row
+        return {
+            'content_hash': content_hash,
+            'file_name': file_name,
+            'file_size': file_size,
+            'chunks': [Document(**chunk) for chunk in json.loads(chunks)],
+            'full_context': full_context
+        }
+    
+    def set_resume_status(self, resume_id: str, status: str, progress: int,
+                          error: Optional[str] = None, chunk_count: int = 0):
+        """记录简历处理状态"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resume_status "
+                "(resume_id, status, progress, error, chunk_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (resume_id, status, progress, error, chunk_count, time.time())
+            )
+            self._conn.commit()
+    
+    def get_resume_status(self, resume_id: str) -> Optional[dict]:
+        """读取简历处理状态，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, progress, error, chunk_count FROM resume_status WHERE resume_id = ?",
+                (resume_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        status, progress, error, chunk_count = row
+        return {'status': status, 'progress': progress, 'error': error, 'chunk_count': chunk_count}
+    
+    def delete_resume(self, resume_id: str, with_sessions: bool = False):
+        """删除简历数据和处理状态；with_sessions 为 True 时一并删除使用该简历的会话"""
+        with self._lock:
+            if with_sessions:
+                self._conn.execute("DELETE FROM sessions WHERE resume_id = ?", (resume_id,))
+            self._conn.execute("DELETE FROM resumes WHERE resume_id = ?", (resume_id,))
+            self._conn.execute("DELETE FROM resume_status WHERE resume_id = ?", (resume_id,))
+            self._conn.commit()
+    
+    def delete_orphan_resumes(self, ttl_seconds: float, keep: List[str]) -> int:
+        """删除没有会话引用且保存超过 ttl_seconds 的简历（keep 中的简历除外），返回删除条数"""
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT resume_id FROM resume_status WHERE updated_at < ? "
+                "AND resume_id NOT IN (SELECT DISTINCT resume_id FROM sessions) "
+                "UNION SELECT resume_id FROM resumes WHERE saved_at < ? "
+                "AND resume_id NOT IN (SELECT DISTINCT resume_id FROM sessions)",
+                (cutoff, cutoff)
+            ).fetchall()
+            keep = set(keep)
+            orphans = [(row[0],) for row in rows if row[0] not in keep]
+            self._conn.executemany("DELETE FROM resumes WHERE resume_id = ?", orphans)
+            self._conn.executemany("DELETE FROM resume_status WHERE resume_id = ?", orphans)
+            self._conn.commit()
+        return len(orphans)
+    
+    def get_stats(self) -> Dict[str, object]:
+        """返回存储统计"""
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            resumes = self._conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+            saves, loads = self.saves, self.loads
+        return {
+            'path': str(self.db_path),
+            'sessions': sessions,
+            'resumes': resumes,
+            'saves': saves,
+            'loads': loads
+        }
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 微批调度检查：结果顺序、超过批量上限时拆分、并发请求合并、异常传回调用方、重新配置
+运行：python -m pytest -q test_embedding_batcher.py
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher, get_batcher
+
+
+class RecordingEmbeddings:
+    """向量为文本中的数字，记录每次批量计算的文本数"""
+    
+    def __init__(self, delay_event: threading.Event = None):
+        self.batches = []
+        self.delay_event = delay_event
+    
+    def embed_documents(self, texts):
+        if self.delay_event is not None:
+            self.delay_event.wait(5)
+        self.batches.append(len(texts))
+        return [[float(text)] for text in texts]
+
+
+def test_results_keep_order_when_split():
+    model = RecordingEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=1)
+    texts = [str(i) for i in range(10)]
+    
+    vectors = batcher.embed_documents(texts)
+    
+    assert vectors == [[float(i)] for i in range(10)]
+    assert max(model.batches) <= 4
+    assert sum(model.batches) == 10
+
+
+def test_embed_query_and_empty_input():
+    batcher = EmbeddingBatcher(RecordingEmbeddings(), max_batch_size=4, max_wait_ms=1)
+    
+    assert batcher.embed_query('7') == [7.0]
+    assert batcher.embed_documents([]) == []
+
+
+def test_concurrent_requests_get_their_own_results():
+    # 第一批计算被阻塞期间，其余线程的请求在队列中积压，放行后合并计算
+    release = threading.Event()
+    model = RecordingEmbeddings(delay_event=release)
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=20)
+    inputs = [[str(n * 10 + i) for i in range(n % 3 + 1)] for n in range(12)]
+    
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        futures = [pool.submit(batcher.embed_documents, texts) for texts in inputs]
+        release.set()
+        results = [future.result(timeout=10) for future in futures]
+    
+    for texts, vectors in zip(inputs, results):
+        assert vectors == [[float(text)] for text in texts]
+    assert max(model.batches) <= 8
+    assert batcher.get_stats()['requests'] == len(inputs)
+    assert len(model.batches) < len(inputs)
+
+
+def test_errors_are_raised_to_callers():
+    class FailingEmbeddings:
+        def embed_documents(self, texts):
+            raise RuntimeError('model failed')
+    
+    batcher = EmbeddingBatcher(FailingEmbeddings(), max_batch_size=4, max_wait_ms=1)
+    
+    with pytest.raises(RuntimeError, match='model failed'):
+        batcher.embed_documents(['1', '2'])
+
+
+def test_get_batcher_applies_new_settings():
+    model = RecordingEmbeddings()
+    key = ('test', 'reconfigure')
+    
+    batcher = get_batcher(key, model, max_batch_size=64, max_wait_ms=5)
+    again = get_batcher(key, model, max_batch_size=2, max_wait_ms=1)
+    
+    assert again is batcher
+    assert batcher.max_batch_size == 2
+    batcher.embed_documents([str(i) for i in range(5)])
+    assert max(model.batches) <= 2
+    
+    other = get_batcher(key, RecordingEmbeddings(), max_batch_size=2, max_wait_ms=1)
+    assert other is not batcher
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy 向量索引检查：余弦相似度检索、保存与加载（fingerprint 校验）、清空索引时保留持久化文件
+运行：python -m pytest -q test_numpy_vector_store.py
+"""
+
+import numpy as np
+import pytest
+
+from numpy_vector_store import NumpyVectorStore
+
+
+class KeywordEmbeddings:
+    """按关键词出现次数生成向量（维度固定，便于确定检索结果）"""
+    
+    KEYWORDS = ('redis', 'kafka', 'spark', 'flink')
+    
+    def _vector(self, text: str):
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+    
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+    
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+TEXTS = ['redis redis 缓存', 'kafka 消息队列', 'spark spark spark 离线计算', 'flink 实时计算']
+
+
+@pytest.fixture
+def store():
+    return NumpyVectorStore.from_texts(
+        TEXTS, KeywordEmbeddings(), metadatas=[{'page': i} for i in range(len(TEXTS))]
+    )
+
+
+def test_similarity_search_ranks_by_cosine(store):
+    results = store.similarity_search_with_score('spark', k=2)
+    
+    assert [doc.page_content for doc, _ in results][0] == TEXTS[2]
+    assert results[0][0].metadata == {'page': 2}
+    assert results[0][1] >= results[1][1]
+
+
+def test_similarity_search_k_larger_than_index(store):
+    assert len(store.similarity_search('redis', k=10)) == len(TEXTS)
+    assert store.similarity_search('redis', k=0) == []
+
+
+def test_as_retriever(store):
+    docs = store.as_retriever(search_kwargs={'k': 1}).invoke('kafka')
+    
+    assert [doc.page_content for doc in docs] == [TEXTS[1]]
+
+
+def test_float16_keeps_ranking(store):
+    half = NumpyVectorStore.from_texts(TEXTS, KeywordEmbeddings(), dtype='float16')
+    
+    assert half.nbytes == store.nbytes // 2
+    for query in ('redis', 'kafka', 'spark', 'flink'):
+        assert half.similarity_search(query, k=1)[0].page_content == store.similarity_search(query, k=1)[0].page_content
+
+
+def test_unsupported_dtype():
+    with pytest.raises(ValueError):
+        NumpyVectorStore(KeywordEmbeddings(), dtype='int8')
+
+
+def test_save_and_load_round_trip(store, tmp_path):
+    store.save(tmp_path / 'index', fingerprint='v1')
+    
+    loaded = NumpyVectorStore.load(tmp_path / 'index', KeywordEmbeddings(), fingerprint='v1')
+    
+    assert loaded is not None
+    assert isinstance(loaded._matrix, np.memmap)
+    assert len(loaded) == len(TEXTS)
+    for query in ('redis', 'flink'):
+        expected = store.similarity_search_with_score(query, k=2)
+        actual = loaded.similarity_search_with_score(query, k=2)
+        assert [doc.page_content for doc, _ in actual] == [doc.page_content for doc, _ in expected]
+        assert [doc.metadata for doc, _ in actual] == [doc.metadata for doc, _ in expected]
+
+
+def test_load_rejects_mismatched_or_missing_index(store, tmp_path):
+    store.save(tmp_path / 'index', fingerprint='v1')
+    
+    assert NumpyVectorStore.load(tmp_path / 'index', KeywordEmbeddings(), fingerprint='v2') is None
+    assert NumpyVectorStore.load(tmp_path / 'missing', KeywordEmbeddings()) is None
+    
+    # 向量文件与 index.json 记录的条数不一致（例如写了一半）时视为无效
+    np.save(tmp_path / 'index' / 'vectors.npy', np.zeros((1, 4), dtype=np.float32))
+    assert NumpyVectorStore.load(tmp_path / 'index', KeywordEmbeddings(), fingerprint='v1') is None
+
+
+def test_delete_collection_keeps_persisted_files(store, tmp_path):
+    store.save(tmp_path / 'index', fingerprint='v1')
+    loaded = NumpyVectorStore.load(tmp_path / 'index', KeywordEmbeddings(), fingerprint='v1')
+    
+    loaded.delete_collection()
+    
+    assert len(loaded) == 0
+    assert loaded.similarity_search('redis') == []
+    assert NumpyVectorStore.load(tmp_path / 'index', KeywordEmbeddings(), fingerprint='v1') is not None
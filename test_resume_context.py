@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+简历上下文检查：文本块还原（merge_chunks）和检索结果整理（pack_context）
+运行：python -m pytest -q test_resume_context.py
+"""
+
+from langchain_core.documents import Document
+
+from resume_context import apply_context_stats, merge_chunks, pack_context
+from token_counter import count_tokens
+
+
+HEADER = "李明 | 后端工程师 | 138-0000-0000"
+PAGE_1 = HEADER + "\n工作经历\n负责订单系统重构，支撑 2 万 QPS。\n负责线上问题排查和复盘。"
+PAGE_2 = HEADER + "\n项目经历\n搭建实时数仓，延迟降到秒级。\n负责线上问题排查和复盘。"
+
+
+def split_page(text: str, page: int, size: int, overlap: int):
+    """按固定长度切分一页文本（相邻块重叠 overlap 个字），记录 start_index"""
+    chunks = []
+    start = 0
+    while True:
+        chunks.append(Document(
+            page_content=text[start:start + size],
+            metadata={'source': 'resume.pdf', 'page': page, 'start_index': start}
+        ))
+        if start + size >= len(text):
+            return chunks
+        start += size - overlap
+
+
+def test_merge_chunks_removes_overlap():
+    chunks = split_page(PAGE_1, 0, 20, 5) + split_page(PAGE_2, 1, 20, 5)
+    
+    assert merge_chunks(chunks) == PAGE_1 + "\n\n" + PAGE_2
+
+
+def test_merge_chunks_without_start_index():
+    chunks = [Document(page_content="第一段"), Document(page_content="第二段")]
+    
+    assert merge_chunks(chunks) == "第一段\n\n第二段"
+
+
+def test_pack_context_merges_overlapping_chunks():
+    chunks = split_page(PAGE_1, 0, 20, 5)
+    
+    context, stats = pack_context(list(reversed(chunks)))
+    
+    assert context == PAGE_1
+    assert stats['context_chunks'] == len(chunks)
+    assert stats['context_pieces'] == 1
+    assert stats['context_tokens_packed'] < stats['context_tokens_raw']
+
+
+def test_pack_context_orders_by_position_and_strips_repeated_header():
+    page_1 = Document(page_content=PAGE_1, metadata={'page': 0, 'start_index': 0})
+    page_2 = Document(page_content=PAGE_2, metadata={'page': 1, 'start_index': 0})
+    
+    # 检索排名与位置相反，重复的文本块只保留一份
+    context, stats = pack_context([page_2, page_1, page_2])
+    
+    assert context.startswith(PAGE_1)
+    assert context.count(HEADER) == 1
+    assert "项目经历" in context
+    # 不同段落下相同的描述保留
+    assert context.count("负责线上问题排查和复盘。") == 2
+    assert stats['context_pieces'] == 2
+
+
+def test_pack_context_budget_keeps_top_ranked_pieces():
+    first = Document(page_content="第一名：" + "订单" * 20, metadata={'page': 0, 'start_index': 0})
+    second = Document(page_content="第二名：" + "数仓" * 200, metadata={'page': 1, 'start_index': 0})
+    third = Document(page_content="第三名：" + "缓存" * 10, metadata={'page': 2, 'start_index': 0})
+    budget = count_tokens(first.page_content) + count_tokens(third.page_content) + 5
+    
+    context, stats = pack_context([first, second, third], max_tokens=budget)
+    
+    # 放不下的第二名跳过，后面排名的片段仍可放入
+    assert context == first.page_content + "\n\n" + third.page_content
+    assert stats['context_tokens_packed'] <= budget
+
+
+def test_pack_context_truncates_oversized_top_piece():
+    doc = Document(page_content="很长的项目经历" * 100, metadata={'page': 0, 'start_index': 0})
+    
+    context, stats = pack_context([doc], max_tokens=20)
+    
+    assert context
+    assert doc.page_content.startswith(context)
+    assert stats['context_tokens_packed'] <= 20
+
+
+def test_apply_context_stats_reads_packed_metadata():
+    stats = {}
+    apply_context_stats(stats, [Document(page_content="x")])
+    assert stats == {}
+    
+    packed = Document(page_content="x", metadata={'context_tokens_raw': 30, 'context_tokens_packed': 12})
+    apply_context_stats(stats, [packed])
+    assert stats == {'context_tokens_raw': 30, 'context_tokens_packed': 12}
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+会话容量淘汰检查：会话数达到上限时淘汰空闲会话，活跃会话保留
+运行：python -m pytest -q test_session_capacity.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import api_server
+from api_server import SessionManager, session_store
+
+
+def make_session(idle_seconds: float) -> dict:
+    return {
+        'resume_id': 'resume',
+        'chain': None,
+        'interview_style': 'critical',
+        'created_at': datetime.now() - timedelta(seconds=idle_seconds),
+        'last_activity': datetime.now() - timedelta(seconds=idle_seconds),
+        'message_count': 0,
+        'llm_calls': 0,
+        'prompt_tokens': [],
+        'version': 0
+    }
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setitem(api_server.api_config, 'persist_sessions', False)
+    monkeypatch.setitem(api_server.api_config, 'max_sessions', 2)
+    monkeypatch.setitem(api_server.api_config, 'max_session_memory_mb', 0)
+    monkeypatch.setitem(api_server.api_config, 'session_idle_seconds', 120)
+    saved = list(session_store.items())
+    session_store.clear()
+    yield session_store
+    session_store.clear()
+    session_store.update(saved)
+
+
+def test_idle_session_evicted_at_capacity(sessions):
+    sessions['idle'] = make_session(600)
+    sessions['active'] = make_session(0)
+    
+    assert SessionManager.ensure_capacity()
+    assert list(sessions) == ['active']
+
+
+def test_active_sessions_kept_at_capacity(sessions):
+    sessions['first'] = make_session(10)
+    sessions['second'] = make_session(0)
+    
+    assert not SessionManager.ensure_capacity()
+    assert list(sessions) == ['first', 'second']
+    # 扫描不改变最后活动时间
+    assert (datetime.now() - sessions['first']['last_activity']).total_seconds() >= 10
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+本地 Token 计数
+优先使用 tiktoken（cl100k_base），未安装时按字符估算；只用于统计和预算控制，无需与服务商完全一致
+"""
+
+import math
+import re
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """延迟加载 tiktoken 编码器，加载失败时返回 None"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """统计文本 Token 数"""
+    if not text:
+        return 0
+    
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    
+    # 估算：中日韩字符约 1 字 1 Token，其余约 4 字符 1 Token
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def count_message_tokens(messages: List['BaseMessage']) -> int:
+    """统计消息列表的 Token 数"""
+    from langchain_core.messages import get_buffer_string
+    return count_tokens(get_buffer_string(messages))
+
+
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+向量索引后端对比测试
+为若干份 5～30 个文本块的示例简历分别用 Chroma 和 NumPy 索引（float32、float16、内存映射加载）建立索引，
+对比每份简历的构建耗时、内存占用和检索延迟（经 as_retriever() 取 top-k，与面试链的用法一致），
+以及与 Chroma 检索结果的重合率。
+向量由文本哈希生成（固定维度的随机向量），只测量索引本身的开销；每个后端在独立的子进程中运行。
+
+用法：
+    python vector_store_bench.py --resumes 200 --queries 2000
+    python vector_store_bench.py --backends chroma,numpy-float32 --dim 768 --output vector_store_bench.json
+"""
+
+import argparse
+import gc
+import hashlib
+import importlib
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from embedding_bench import PROJECTS, QUERIES, ROLES, SKILLS
+from embeddings import get_rss_bytes
+
+
+BACKENDS = ['chroma', 'numpy-float32', 'numpy-float16', 'numpy-mmap']
+
+
+class HashEmbeddings:
+    """按文本哈希生成固定的单位向量（相同文本得到相同向量）
+
+    单位向量下 Chroma 默认的 L2 距离与余弦相似度排序一致，结果重合率反映的是检索是否正确
+    """
+    
+    def __init__(self, dim: int):
+        self.dim = dim
+    
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+def sample_resumes(count: int, min_chunks: int, max_chunks: int, seed: int = 42) -> List[List[str]]:
+    """生成 count 份示例简历，每份 min_chunks～max_chunks 个文本块"""
+    rng = random.Random(seed)
+    resumes = []
+    for i in range(count):
+        chunks = [f"候选人 {i + 1}，{rng.choice(ROLES)}，技能：" + "、".join(rng.sample(SKILLS, 6))]
+        for j in range(rng.randint(min_chunks, max_chunks) - 1):
+            chunks.append(f"{rng.randint(2016, 2024)} 年第 {j + 1} 段经历：{rng.choice(PROJECTS)}")
+        resumes.append(chunks)
+    return resumes
+
+
+def build_index(backend: str, chunks: List[str], embeddings, name: str, workdir: Path):
+    from langchain_core.documents import Document
+    
+    documents = [Document(page_content=text) for text in chunks]
+    if backend == 'chroma':
+        from langchain_community.vectorstores import Chroma
+        from main import get_chroma_client
+        return Chroma.from_documents(documents, embeddings, collection_name=name, client=get_chroma_client())
+    
+    from numpy_vector_store import NumpyVectorStore
+    if backend == 'numpy-mmap':
+        return NumpyVectorStore.load(workdir / name, embeddings)
+    dtype = backend.split('-', 1)[1]
+    return NumpyVectorStore.from_documents(documents, embeddings, dtype=dtype, collection_name=name)
+
+
+def run_backend(backend: str, resumes: List[List[str]], queries: List[str], dim: int, top_k: int,
+                query_count: int) -> dict:
+    """在子进程中为全部简历建索引并检索，返回耗时、内存和检索结果"""
+    # 导入和客户端初始化耗时不计入构建
+    importlib.import_module('langchain_core.vectorstores')
+    if backend == 'chroma':
+        from main import get_chroma_client
+        get_chroma_client()
+    else:
+        importlib.import_module('numpy_vector_store')
+    
+    embeddings = HashEmbeddings(dim)
+    with tempfile.TemporaryDirectory(prefix='vector_store_bench_') as tmp:
+        workdir = Path(tmp)
+        if backend == 'numpy-mmap':
+            # 预先保存索引，只计入加载耗时
+            for i, chunks in enumerate(resumes):
+                store = build_index('numpy-float32', chunks, embeddings, f"resume_{i}", workdir)
+                store.save(workdir / f"resume_{i}")
+            del store
+        
+        gc.collect()
+        rss_before = get_rss_bytes()
+        start = time.perf_counter()
+        stores = [build_index(backend, chunks, embeddings, f"resume_{i}", workdir) for i, chunks in enumerate(resumes)]
+        build_seconds = time.perf_counter() - start
+        gc.collect()
+        rss_delta = max(get_rss_bytes() - rss_before, 0)
+        
+        retrievers = [store.as_retriever(search_kwargs={'k': top_k}) for store in stores]
+        rng = random.Random(7)
+        plan = [(rng.randrange(len(resumes)), rng.choice(queries)) for _ in range(query_count)]
+        for i, query in plan[:20]:
+            retrievers[i].invoke(query)
+        
+        latencies = []
+        results = []
+        for i, query in plan:
+            start = time.perf_counter()
+            documents = retrievers[i].invoke(query)
+            latencies.append(time.perf_counter() - start)
+            results.append([document.page_content for document in documents])
+        
+        start = time.perf_counter()
+        for store in stores:
+            store.delete_collection()
+        drop_seconds = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        'build_ms_per_resume': round(build_seconds / len(resumes) * 1000, 3),
+        'memory_kb_per_resume': round(rss_delta / len(resumes) / 1024, 1),
+        'retrieval_p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'retrieval_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        'drop_ms_per_resume': round(drop_seconds / len(resumes) * 1000, 3),
+        'results': results
+    }
+
+
+def overlap(reference: List[List[str]], candidate: List[List[str]]) -> float:
+    """两组检索结果的平均重合率"""
+    ratios = [len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(reference, candidate)]
+    return round(float(np.mean(ratios)), 4) if ratios else 0.0
+
+
+def print_report(result: dict):
+    print("\n" + "=" * 96)
+    print(f"   向量索引对比（{result['resumes']} 份简历，每份 {result['min_chunks']}～{result['max_chunks']} 个文本块，"
+          f"{result['dim']} 维，{result['queries']} 次检索 top-{result['top_k']}）")
+    print("=" * 96)
+    print(f"{'后端':<16}{'构建(ms/份)':>14}{'内存(KB/份)':>14}{'检索p50(ms)':>14}{'检索p95(ms)':>14}"
+          f"{'删除(ms/份)':>14}{'结果重合':>10}")
+    for backend, stats in result['backends'].items():
+        print(f"{backend:<16}{stats['build_ms_per_resume']:>14}{stats['memory_kb_per_resume']:>14}"
+              f"{stats['retrieval_p50_ms']:>14}{stats['retrieval_p95_ms']:>14}{stats['drop_ms_per_resume']:>14}"
+              f"{stats.get('overlap', '-'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量索引后端对比测试（Chroma 与 NumPy）")
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help=f"参与对比的后端（{', '.join(BACKENDS)}），第一个作为结果重合率的基准")
+    parser.add_argument('--resumes', type=int, default=200, help="简历份数")
+    parser.add_argument('--min-chunks', type=int, default=5, help="每份简历最少文本块数")
+    parser.add_argument('--max-chunks', type=int, default=30, help="每份简历最多文本块数")
+    parser.add_argument('--dim', type=int, default=384, help="向量维度")
+    parser.add_argument('--queries', type=int, default=2000, help="检索次数")
+    parser.add_argument('--top-k', type=int, default=3, help="每次检索返回的文本块数")
+    parser.add_argument('--output', type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    
+    resumes = sample_resumes(args.resumes, args.min_chunks, args.max_chunks)
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"未知的后端：{', '.join(unknown)}")
+    
+    result = {
+        'resumes': len(resumes),
+        'min_chunks': args.min_chunks,
+        'max_chunks': args.max_chunks,
+        'dim': args.dim,
+        'queries': args.queries,
+        'top_k': args.top_k,
+        'backends': {}
+    }
+    
+    # 每个后端使用全新的子进程（spawn），内存统计不受其他后端影响
+    context = multiprocessing.get_context('spawn')
+    outputs: Dict[str, dict] = {}
+    for backend in backends:
+        print(f"正在测试 {backend}...", flush=True)
+        with context.Pool(1) as pool:
+            outputs[backend] = pool.apply(
+                run_backend, (backend, resumes, QUERIES, args.dim, args.top_k, args.queries)
+            )
+    
+    reference = outputs[backends[0]]['results']
+    for backend, output in outputs.items():
+        stats = {key: value for key, value in output.items() if key != 'results'}
+        if backend != backends[0]:
+            stats['overlap'] = overlap(reference, output['results'])
+        result['backends'][backend] = stats
+    
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\n结果已写入：{args.output}")
+
+
+if __name__ == '__main__':
+    main()